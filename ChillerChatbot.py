@@ -1,6 +1,15 @@
 import streamlit as st
-import math
+from air_flow import convert_length, convert_velocities, calc_area
 import pandas as pd
+import time
+from logger_import import render_logger_import
+from traverse_grid import METHODS, render_grid_picker, traverse_grid
+from result_cache import cached_flow
+from compact_form import render_compact_form
+from units import convert
+from wizard_state import init_wizard, readings, reset_wizard
+from metrics import observe_calculation, start_exporter
+from tower_kpi import render_kpi_inputs, render_kpis, tower_kpi_record
 
 
 st.set_page_config(page_title="Air Flow Calculator", page_icon="💨", layout="centered")
@@ -11,51 +20,14 @@ st.write("👋 Hello! How can I help you today?")
 
 
 # Session state initialization
-if 'step' not in st.session_state:
-    st.session_state.step = "start"
-if 'equipment' not in st.session_state:
-    st.session_state.equipment = None
-if 'shape' not in st.session_state:
-    st.session_state.shape = None
-if 'unit' not in st.session_state:
-    st.session_state.unit = None
-if 'dimensions' not in st.session_state:
-    st.session_state.dimensions = {}
-if 'velocities' not in st.session_state:
-    st.session_state.velocities = []
-if 'vel_unit' not in st.session_state:
-    st.session_state.vel_unit = None
-if 'vel_count' not in st.session_state:
-    st.session_state.vel_count = 0
-if 'result' not in st.session_state:
-    st.session_state.result = None
+init_wizard()
+start_exporter()
 
 
 # Helper functions
 def parse_velocities(input_text):
     return [float(v) for v in input_text.replace(',', ' ').split() if v.replace('.', '', 1).isdigit()]
 
-def convert_length(value, from_unit):
-    conv = {"m": 1, "cm": 0.01, "foot": 0.3048, "inches": 0.0254}
-    return value * conv[from_unit]
-
-def convert_velocity(value, from_unit):
-    conv = {
-        "m/s": 1, "cm/s": 0.01, "ft/s": 0.3048, "inch/s": 0.0254,
-        "m/min": 1/60, "cm/min": 0.01/60, "ft/min": 0.3048/60, "inches/min": 0.0254/60
-    }
-    return value * conv[from_unit]
-
-def calc_area(shape, dims_m):
-    if shape == "Square":
-        return dims_m['length'] * dims_m['breadth']
-    elif shape == "Round":
-        return math.pi * (dims_m['diameter'] / 2) ** 2
-
-def calc_flow(vels_m, area_m2):
-    avg_vel = sum(vels_m) / len(vels_m)
-    flow = avg_vel * area_m2
-    return avg_vel, flow
 
 
 # ---------------------- STEP FLOW ----------------------
@@ -63,6 +35,20 @@ if st.session_state.step == "start":
     if st.button("🔹 Calculate Air Flow"):
         st.session_state.step = "choose_equipment"
         st.rerun()
+    if st.button("⚡ Quick Entry (single form)"):
+        st.session_state.step = "compact"
+        st.rerun()
+
+elif st.session_state.step == "compact":
+    # Whole measurement in one submission: no rerun per step or per reading
+    values = render_compact_form(ask_equipment_id=False)
+    if values:
+        st.session_state.update(values, velocities=readings(values["velocities"]))
+        st.session_state.step = "result"
+        st.rerun()
+    if st.button("⬅️ Go Back"):
+        st.session_state.step = "start"
+        st.rerun()
 
 elif st.session_state.step == "choose_equipment":
     st.write("For which equipment would you like to calculate flow?")
@@ -119,8 +105,9 @@ elif st.session_state.step == "enter_dimensions":
         st.rerun()
 
 elif st.session_state.step == "enter_velocity_count":
-    count = st.number_input("Enter how many velocity readings you will provide (strict limit)", min_value=1, step=1)
+    grid, count = render_grid_picker(st.session_state.shape)
     if st.button("Next ➡️"):
+        st.session_state.grid = grid
         st.session_state.vel_count = count
         st.session_state.step = "choose_velocity_unit"
         st.rerun()
@@ -133,7 +120,7 @@ elif st.session_state.step == "choose_velocity_unit":
     vel_unit = st.radio("Velocity Unit", ["m/s", "cm/s", "ft/s", "inch/s", "m/min", "cm/min", "ft/min", "inches/min"], horizontal=False)
     if st.button("Next ➡️"):
         st.session_state.vel_unit = vel_unit
-        st.session_state.velocities = []
+        st.session_state.velocities = readings()
         st.session_state.step = "enter_velocities"
         st.rerun()
     if st.button("⬅️ Go Back"):
@@ -146,7 +133,12 @@ elif st.session_state.step == "enter_velocities":
     st.write(f"Enter {count} velocity readings in **{vel_unit}**:")
     next_idx = len(st.session_state.velocities) + 1
     if next_idx <= count:
-        val = st.number_input(f"Velocity reading #{next_idx}", min_value=0.0, step=0.1)
+        label = f"Velocity reading #{next_idx}"
+        if st.session_state.grid:
+            g = st.session_state.grid
+            point = traverse_grid(st.session_state.shape, g["method"], g["points"]).iloc[next_idx - 1]
+            label += f" at {point['point']} ({point['position']})"
+        val = st.number_input(label, min_value=0.0, step=0.1)
         if st.button("Add Reading"):
             st.session_state.velocities.append(val)
             st.rerun()
@@ -155,15 +147,31 @@ elif st.session_state.step == "enter_velocities":
             st.session_state.step = "review_table"
             st.rerun()
 
+    pasted = st.text_area("…or paste all readings at once (separated by spaces or commas)")
+    if pasted and st.button("📋 Use pasted readings"):
+        st.session_state.velocities = readings(parse_velocities(pasted))
+        st.session_state.vel_count = len(st.session_state.velocities)
+        st.session_state.step = "review_table"
+        st.rerun()
+
+    with st.expander("📂 Import from anemometer logger file"):
+        g = st.session_state.grid
+        imported = render_logger_import(vel_unit, (st.session_state.shape, g["method"], g["points"]) if g else None)
+    if imported:
+        st.session_state.velocities = readings(imported)
+        st.session_state.vel_count = len(imported)
+        st.session_state.step = "review_table"
+        st.rerun()
+
     if st.button("⬅️ Go Back"):
         st.session_state.step = "choose_velocity_unit"
         st.rerun()
 
 elif st.session_state.step == "review_table":
     st.write("Review your entered velocity readings (editable):")
-    df = pd.DataFrame(st.session_state.velocities, columns=["Velocity"])
+    df = pd.DataFrame({"Velocity": st.session_state.velocities.tolist()})
     edited_df = st.data_editor(df, num_rows="dynamic", key="vel_edit")
-    st.session_state.velocities = edited_df["Velocity"].tolist()
+    st.session_state.velocities = readings(edited_df["Velocity"])
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -179,22 +187,51 @@ elif st.session_state.step == "review_table":
             st.info("You can edit values directly above.")
     with col4:
         if st.button("✅ Proceed"):
-            st.session_state.step = "result"
+            st.session_state.step = "tower_kpis" if st.session_state.equipment == "Cooling Tower" else "result"
             st.rerun()
 
+elif st.session_state.step == "tower_kpis":
+    inputs = render_kpi_inputs()
+    if st.button("Calculate ➡️"):
+        st.session_state.kpi_inputs = inputs
+        st.session_state.step = "result"
+        st.rerun()
+    if st.button("⬅️ Go Back"):
+        st.session_state.step = "review_table"
+        st.rerun()
+
 elif st.session_state.step == "result":
     #import os
     #import pandas as pd
 
     # --- Calculations ---
+    calc_start = time.perf_counter()
     dims_m = {k: convert_length(v, st.session_state.unit) for k, v in st.session_state.dimensions.items()}
     area_m2 = calc_area(st.session_state.shape, dims_m)
-    vels_m = [convert_velocity(v, st.session_state.vel_unit) for v in st.session_state.velocities]
-    avg_m, flow_m3s = calc_flow(vels_m, area_m2)
-
-    # Convert flow to m³/min and m³/hr
-    flow_m3min = flow_m3s * 60
-    flow_m3hr = flow_m3s * 3600
+    vels_m = convert_velocities(st.session_state.velocities, st.session_state.vel_unit)
+    grid = st.session_state.grid
+    avg_m = None
+    if grid:
+        try:
+            avg_m, flow_m3s = cached_flow(vels_m, area_m2, st.session_state.shape, grid["method"], grid["points"])
+            method = f"{METHODS[grid['method']]} grid, {len(vels_m)} points (area-weighted)"
+        except ValueError:
+            st.warning("⚠️ The readings no longer match the grid, so a simple average is used.")
+    if avg_m is None:
+        avg_m, flow_m3s = cached_flow(vels_m, area_m2)
+        method = f"{len(vels_m)} readings (simple average)"
+
+    # Convert flow to m³/min, m³/hr and CFM
+    flow_m3min = convert(flow_m3s, "m³/s", "m³/min")
+    flow_m3hr = convert(flow_m3s, "m³/s", "m³/hr")
+    flow_cfm = convert(flow_m3s, "m³/s", "CFM")
+
+    kpis = {}
+    if st.session_state.equipment == "Cooling Tower":
+        kpis = tower_kpi_record(flow_m3s, st.session_state.kpi_inputs)
+    if st.session_state.result is None:
+        observe_calculation("ChillerChatbot", len(vels_m), time.perf_counter() - calc_start)
+        st.session_state.result = {"flow_m3s": flow_m3s}
 
     # --- Display results ---
     st.success(f"""
@@ -202,18 +239,20 @@ elif st.session_state.step == "result":
 
     - *Equipment:* {st.session_state.equipment}  
     - Shape: {st.session_state.shape}  
+    - Traverse: {method}  
     - Surface Area: {area_m2:.3f} m²  
     - Average Velocity: {avg_m:.3f} m/s  
     - Air Flow Rate:  
         • {flow_m3s:.4f} m³/s  
         • {flow_m3min:.4f} m³/min  
         • {flow_m3hr:.4f} m³/hr
+        • {flow_cfm:,.0f} CFM
     """)
+    render_kpis(kpis)
     
     # --- Restart ---
     if st.button("🔄 Start New Calculation"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+        reset_wizard()
         st.rerun()
 
 
@@ -1,27 +1,31 @@
 # yearly_landed_rate_cleaned.py
 import streamlit as st
 import pandas as pd
-from io import BytesIO
+from datetime import datetime
+from paged_editor import paged_data_editor
+import bill_store
+from exports import PREVIEW_ROWS, XLSX_MAX_ROWS, export_files, read_reference_csv, with_keys
+from landed_rate import compute_billing
+from units import DEFAULT_PF
+from tariffs import MONTHS, TARIFF_VERSION, constants_table
+from result_cache import cached_billing
+from jobs import BACKGROUND_MIN_ROWS, billing_work, job_panel, start_job
+from rerun_timing import start_rerun
+from metrics import start_exporter, timed_calculation
 
 st.set_page_config(page_title="Yearly Landed Unit Rate Calculator", layout="wide", page_icon="⚡")
+timer = start_rerun("Landed_rateChatbot")
+start_exporter()
 st.title("⚡ Yearly Landed Unit Rate Calculator")
 st.markdown("Fill out the **Reference table** to calculate the **Landed Unit rate**.")
 
 # -----------------------------
 # Defaults (constants)
 # -----------------------------
-DEFAULT_CONSTANTS = {
-    "Parameter": ["DC_rate", "FAC_rate", "ToS_rate", "ED_percent"],
-    "Value": [600.0, 0.5, 0.2894, 7.5],
-}
+DEFAULT_CONSTANTS = constants_table(descriptions=False)
 
 DEFAULT_TOD_RATIOS = {"A": 18.86, "B": 7.35, "C": 27.95, "D": 45.83}
 
-MONTHS = [
-    "January","February","March","April","May","June",
-    "July","August","September","October","November","December"
-]
-
 const_df = pd.DataFrame(DEFAULT_CONSTANTS)
 GLOBAL_DC_rate     = float(const_df.loc[const_df["Parameter"] == "DC_rate", "Value"])
 GLOBAL_FAC_rate    = float(const_df.loc[const_df["Parameter"] == "FAC_rate", "Value"])
@@ -41,9 +45,15 @@ with col3:
     sanctioned_demand = st.number_input("Sanctioned Demand (kVA)", value= 15750, step = 150)
 with col4:
     min_bill_demand = st.number_input("Minimum Billable Demand (%)", value= 0.75, step = 0.01)
+col5, col6 = st.columns(2)
+with col5:
+    site = st.text_input("Site", value="Main Plant")
+with col6:
+    year = st.number_input("Year", value=datetime.now().year, step=1)
 # -----------------------------
 # Build Reference Table
 # -----------------------------
+timer.mark("table build")
 st.markdown("## Reference Table (editable)")
 
 def default_row(month_name):
@@ -51,7 +61,7 @@ def default_row(month_name):
     return {
         "Month": month_name,
         "Calc": False,
-        "PF": 0.997,
+        "PF": DEFAULT_PF,
         "MaxDemand_kVA": sanctioned_demand * min_bill_demand,     #13500.0,
         "kvah": 5000000.0,
         "EnergyRate_₹/kVAh": energy_rate,
@@ -76,151 +86,96 @@ def default_row(month_name):
 ref_df = pd.DataFrame([default_row(m) for m in MONTHS])
 
 # Show editable table
-ref_df_edited = st.data_editor(
+timer.mark("editor")
+ref_df_edited = paged_data_editor(
     ref_df,
+    key="pf_ref_table_editor",
+    filter_columns=["Month"],
     num_rows="fixed",
     use_container_width=True,
-    key="ref_table_editor",
 )
 
+# -----------------------------
+# Bulk reference rows (optional)
+# -----------------------------
+bulk_file = st.file_uploader(
+    f"Or upload reference rows as CSV, optionally with Site and Year columns for a portfolio "
+    f"({BACKGROUND_MIN_ROWS:,}+ rows are billed in the background)",
+    type="csv", key="bulk_reference_csv",
+)
+if bulk_file is not None:
+    try:
+        ref_df_edited = read_reference_csv(bulk_file, default_row(MONTHS[0]))
+        sites_note = (f" for {ref_df_edited['Site'].nunique():,} sites, each saved under its own site"
+                      if "Site" in ref_df_edited else f", saved under {site}")
+        st.caption(f"Billing the {len(ref_df_edited):,} uploaded rows{sites_note} instead of the table above.")
+    except ValueError as e:
+        st.error(f"⚠️ Could not read {bulk_file.name}: {e}")
+
 # -----------------------------
 # Run Calculations
 # -----------------------------
+billing_df = None
 if st.button("Run Calculations for checked months"):
-    billing_rows = []
-
-    for _, row in ref_df_edited.iterrows():
-
-        if not bool(row["Calc"]):
-            continue
-
-        month = row["Month"]
-        PF = float(row["PF"])
-        max_demand = float(row["MaxDemand_kVA"])
-        kvah = float(row["kvah"])
-        
-        kwh = kvah * PF  
-
-        energy_rate = float(row["EnergyRate_₹/kVAh"])
-        DC_rate = float(row["DC_rate"])
-        FAC_rate = float(row["FAC_rate"])
-        ToS_rate = float(row["ToS_rate"])
-        ED_percent = float(row["ED_percent"])
-
-        # ------------------------
-        # Base Charges
-        # ------------------------
-        DC = max_demand * DC_rate
-        EC = kvah * energy_rate
-        FAC = kvah * FAC_rate
-
-        # ------------------------
-        # ToD Charges
-        # ------------------------
-        ratios = {
-            "A": float(row["ToD_ratio_A"]),
-            "B": float(row["ToD_ratio_B"]),
-            "C": float(row["ToD_ratio_C"]),
-            "D": float(row["ToD_ratio_D"]),
-        }
-
-        multipliers = {
-            "A": float(row["ToD_mul_A"]),
-            "B": float(row["ToD_mul_B"]),
-            "C": float(row["ToD_mul_C"]),
-            "D": float(row["ToD_mul_D"]),
-        }
-
-        #ToD_charge = 0
-
-        slab_units_A = kvah * (ratios["A"]/100)
-        slab_units_B = kvah * (ratios["B"]/100)
-        slab_units_C = kvah * (ratios["C"]/100)
-        slab_units_D = kvah * (ratios["D"]/100)
-
-        ToD_A = slab_units_A * multipliers["A"]
-        ToD_B = slab_units_B * multipliers["B"]
-        ToD_C = slab_units_C * multipliers["C"]
-        ToD_D = slab_units_D * multipliers["D"]
-
-        ToD_charge = ToD_A + ToD_B + ToD_C + ToD_D
-        
-        #for k in ["A", "B", "C", "D"]:
-        #slab_units = kvah * ratios[k]
-        #ToD_charge += slab_units * multipliers[k]
-
-        # ------------------------
-        # ED, ToS, BCR, ICR
-        # ------------------------
-        ED = (ED_percent / 100.0) * (DC + EC + FAC + ToD_charge)
-        ToS = (kvah * PF) * ToS_rate
-
-        if kvah > 4405453:
-            ICR = (kvah - 4405453) * (-0.75)
-        else:
-            ICR = 0
-
-        def BCR_fn(units):
-            if units <= 900000:
-                return -(units * 0.07)
-            elif units <= 5000000:
-                return -(900000 * 0.07 + (units - 1000000) * 0.09)
-            else:
-                return -(900000 * 0.07 + 4000000 * 0.09 + (units - 5000000) * 0.11)
-
-        BCR = BCR_fn(kwh)
-
-        
-        PPD = (DC + EC + FAC + ToD_charge) * (-0.01)
-        Total = DC + EC + ToD_charge + FAC + ED + ToS + BCR + ICR + PPD
-        LandedRate = Total / (kvah * PF)
-
-        billing_rows.append({
-            "Month": month,
-            "kwh(kWh)": kwh,
-            "DC": DC,
-            "EC": EC,
-            "ToD_charge": ToD_charge,
-            "FAC": FAC,
-            "ED": ED,
-            "ToS": ToS,
-            "BCR": BCR,
-            "ICR": ICR,
-            "PPD": PPD,
-            "Total": Total,
-            "LandedRate": LandedRate
-        })
-
-    if billing_rows:
-        billing_df = pd.DataFrame(billing_rows).round(2)
-        st.markdown("## Billing Components")
-        st.dataframe(billing_df, use_container_width=True)
-
-        # ------------------------
-        # Export Buttons
-        # ------------------------
-        csv_ref = ref_df_edited.to_csv(index=False).encode("utf-8")
-        csv_bill = billing_df.to_csv(index=False).encode("utf-8")
-
-        def to_excel(ref_df, bill_df):
-            buffer = BytesIO()
-            with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                ref_df.to_excel(writer, index=False, sheet_name="Reference Table")
-                bill_df.to_excel(writer, index=False, sheet_name="Billing Components")
-            return buffer.getvalue()
-
-        xlsx = to_excel(ref_df_edited, billing_df)
-
-        st.download_button("Download Reference Table (CSV)", csv_ref, "reference.csv")
-        st.download_button("Download Billing Components (CSV)", csv_bill, "billing.csv")
-        st.download_button("Download Full Report (Excel)", xlsx, "Electricity_Report.xlsx")
+    timer.mark("calculation")
+    selected = ref_df_edited[ref_df_edited["Calc"].astype(bool)]
 
-    else:
+    if selected.empty:
         st.info("No months selected. Tick the 'Calc' column.")
+    elif len(selected) >= BACKGROUND_MIN_ROWS:
+        # Large tables are billed in a background job and saved once it finishes
+        def save_run(result, selected=selected, site=site, year=year):
+            bill_store.record_runs("Landed_rateChatbot", site, year, TARIFF_VERSION, selected, result.round(2))
+        def export_run(result, selected=selected):
+            return export_files(selected, result.round(2))
+        start_job("Landed rate billing", billing_work(selected, compute_billing, on_done=save_run, app="Landed_rateChatbot",
+                                                      exports=export_run), total=len(selected))
+    else:
+        with timed_calculation("Landed_rateChatbot", len(selected)):
+            billing_df = with_keys(selected, cached_billing(selected, compute_billing).round(2))
+        try:
+            bill_store.record_runs("Landed_rateChatbot", site, year, TARIFF_VERSION, selected, billing_df)
+        except Exception as e:
+            st.warning(f"⚠️ Could not save results to history: {e}")
+
+timer.mark("render")
+finished_job = job_panel()
+if finished_job is not None:
+    # Built by the worker when the job finished, so reruns only show them
+    billing_df, files = finished_job.result, finished_job.exports
+elif billing_df is not None:
+    timer.mark("export")
+    files = export_files(ref_df_edited, billing_df)
+    timer.mark("render")
+
+if billing_df is not None:
+    st.markdown("## Billing Components")
+    st.dataframe(billing_df.head(PREVIEW_ROWS).round(2), use_container_width=True)
+    if len(billing_df) > PREVIEW_ROWS:
+        st.caption(f"Showing the first {PREVIEW_ROWS:,} of {len(billing_df):,} rows; the downloads hold them all.")
+
+    # ------------------------
+    # Export Buttons
+    # ------------------------
+    st.download_button("Download Reference Table (CSV)", files["reference_csv"], "reference.csv")
+    st.download_button("Download Billing Components (CSV)", files["billing_csv"], "billing.csv")
+    if "xlsx" in files:
+        st.download_button("Download Full Report (Excel)", files["xlsx"], "Electricity_Report.xlsx")
+    else:
+        st.caption(f"The Excel report is only built up to {XLSX_MAX_ROWS:,} rows; use the CSV downloads.")
+
+# -----------------------------
+# History
+# -----------------------------
+timer.mark("history")
+with st.expander("📚 History (stored runs)"):
+    bill_store.render_history(default_site=site)
 
 # Footer
 st.markdown("---")
 
+timer.finish()
+
 
 
 
@@ -0,0 +1,164 @@
+import math
+import re
+
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from units import convert, units_of
+
+ArrayLike = Union[float, list, np.ndarray, pd.Series]
+
+SHAPES = ["Square", "Round"]
+
+# Unit -> factor to metres / metres per second, from the shared registry
+LENGTH_FACTORS = units_of("length")
+VELOCITY_FACTORS = units_of("velocity")
+
+
+# === Air-flow helpers shared by the chiller apps and the HTTP API ===
+def convert_length(value, from_unit):
+    return value * LENGTH_FACTORS[from_unit]
+
+def convert_velocity(value, from_unit):
+    return value * VELOCITY_FACTORS[from_unit]
+
+def calc_area(shape, dims_m):
+    if shape == "Square":
+        return dims_m['length'] * dims_m['breadth']
+    elif shape == "Round":
+        return math.pi * (dims_m['diameter'] / 2) ** 2
+
+def calc_flow(vels_m, area_m2):
+    avg_vel = sum(vels_m) / len(vels_m)
+    flow = avg_vel * area_m2
+    return avg_vel, flow
+
+
+# === Array helpers (whole batches of readings / traverses at once) ===
+def unit_factors(units, table: dict, strict: bool = True) -> Union[float, np.ndarray]:
+    """
+    Conversion factors for one unit or an array of units. Each distinct unit
+    is looked up once; unknown units raise ValueError, or give NaN when
+    ``strict`` is False.
+    """
+    if isinstance(units, str):
+        if units in table:
+            return table[units]
+        if strict:
+            raise ValueError(f"Unknown unit {units!r}")
+        return np.nan
+    uniques, inverse = np.unique(np.asarray(units, dtype=str), return_inverse=True)
+    unknown = [str(u) for u in uniques if u not in table]
+    if unknown and strict:
+        raise ValueError(f"Unknown unit(s) {unknown}")
+    factors = np.array([table.get(u, np.nan) for u in uniques], dtype=float)
+    return factors[inverse]
+
+def convert_lengths(values: ArrayLike, units) -> np.ndarray:
+    """Lengths in metres; ``units`` is one unit or one unit per value."""
+    return np.asarray(values, dtype=float) * unit_factors(units, LENGTH_FACTORS)
+
+def convert_velocities(values: ArrayLike, units) -> np.ndarray:
+    """Velocities in m/s; ``units`` is one unit or one unit per value."""
+    return np.asarray(values, dtype=float) * unit_factors(units, VELOCITY_FACTORS)
+
+def calc_areas(shapes, length: ArrayLike = np.nan, breadth: ArrayLike = np.nan,
+               diameter: ArrayLike = np.nan) -> np.ndarray:
+    """Areas in m² for arrays of shapes and dimensions (metres); unknown shapes give NaN."""
+    shapes = np.asarray(shapes, dtype=str)
+    length, breadth, diameter = (np.asarray(a, dtype=float) for a in (length, breadth, diameter))
+    return np.where(
+        shapes == "Square", length * breadth,
+        np.where(shapes == "Round", np.pi * (diameter / 2) ** 2, np.nan),
+    )
+
+def calc_flows(vels_m: ArrayLike, areas_m2: ArrayLike,
+               traverse_ids: Optional[ArrayLike] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Average velocity and flow for a batch of traverses.
+
+    ``vels_m`` is either a 2-D array (one row per traverse, NaN-padded) or a
+    flat array of readings with ``traverse_ids`` (0..n-1) saying which
+    traverse each reading belongs to.
+    """
+    vels_m = np.asarray(vels_m, dtype=float)
+    areas_m2 = np.asarray(areas_m2, dtype=float)
+    if traverse_ids is not None:
+        ids = np.asarray(traverse_ids, dtype=np.int64)
+        valid = ~np.isnan(vels_m)
+        n = np.bincount(ids[valid], minlength=areas_m2.size)
+        total = np.bincount(ids[valid], weights=vels_m[valid], minlength=areas_m2.size)
+    else:
+        vels_m = np.atleast_2d(vels_m)
+        n = np.sum(~np.isnan(vels_m), axis=1)
+        total = np.nansum(vels_m, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg = total / n
+    return avg, avg * areas_m2
+
+
+# === Bulk traverse tables ===
+# One row per traverse: equipment_id, equipment, shape, unit, length, breadth,
+# diameter, vel_unit, then one column per reading (reading_1, reading_2, ...)
+TRAVERSE_COLUMNS = ["equipment_id", "equipment", "shape", "unit", "length", "breadth", "diameter", "vel_unit"]
+READING_COLUMN = re.compile(r"^(reading|v)_?\d+$", re.IGNORECASE)
+
+# Optional cooling-tower operating data (see tower_kpi), example values
+TOWER_TEMPLATE = {"water_flow_m3hr": 500.0, "t_water_in_c": 35.0, "t_water_out_c": 30.0,
+                  "t_wet_bulb_c": 27.0, "fan_power_kw": 30.0}
+
+def traverse_template(n_readings: int = 6) -> pd.DataFrame:
+    return pd.DataFrame([
+        {"equipment_id": "CT-01", "equipment": "Cooling Tower", "shape": "Round", "unit": "m",
+         "length": None, "breadth": None, "diameter": 2.4, "vel_unit": "m/s",
+         **{f"reading_{i + 1}": 5.0 for i in range(n_readings)},
+         **TOWER_TEMPLATE},
+        {"equipment_id": "AHU-01", "equipment": "Ventilation Unit", "shape": "Square", "unit": "cm",
+         "length": 120, "breadth": 80, "diameter": None, "vel_unit": "ft/min",
+         **{f"reading_{i + 1}": 400.0 for i in range(n_readings)},
+         **{k: None for k in TOWER_TEMPLATE}},
+    ])
+
+def reading_columns(df: pd.DataFrame) -> list:
+    return [c for c in df.columns if READING_COLUMN.match(str(c))]
+
+def calc_traverse_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Area, average velocity and flow for every traverse in a table, computed
+    column-wise. Raises ValueError listing the rows that cannot be computed.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    missing = [c for c in TRAVERSE_COLUMNS if c not in df.columns]
+    vel_cols = reading_columns(df)
+    if missing or not vel_cols:
+        raise ValueError(f"Missing columns: {missing or ['reading_1, reading_2, ...']}")
+
+    shape = df["shape"].astype(str).str.strip().str.title().to_numpy()
+    length_factor = unit_factors(df["unit"].astype(str).str.strip(), LENGTH_FACTORS, strict=False)
+    vel_factor = unit_factors(df["vel_unit"].astype(str).str.strip(), VELOCITY_FACTORS, strict=False)
+    dims = df[["length", "breadth", "diameter"]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    vels = df[vel_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+    dims_m = dims * length_factor[:, None]
+    area_m2 = calc_areas(shape, dims_m[:, 0], dims_m[:, 1], dims_m[:, 2])
+    n_readings = np.sum(~np.isnan(vels), axis=1)
+    avg_m, flow_m3s = calc_flows(vels * vel_factor[:, None], area_m2)
+
+    bad = np.isnan(area_m2) | np.isnan(avg_m) | (n_readings == 0)
+    if bad.any():
+        rows = ", ".join(str(i + 2) for i in np.flatnonzero(bad)[:20])
+        raise ValueError(f"Check shape, units, dimensions and readings on CSV line(s) {rows}")
+
+    return pd.DataFrame({
+        "equipment_id": df["equipment_id"].astype(str).to_numpy(),
+        "equipment": df["equipment"].astype(str).to_numpy(),
+        "shape": shape,
+        "readings": n_readings,
+        "area_m2": area_m2,
+        "avg_velocity_ms": avg_m,
+        "flow_m3s": flow_m3s,
+        "flow_m3min": convert(flow_m3s, "m³/s", "m³/min"),
+        "flow_m3hr": convert(flow_m3s, "m³/s", "m³/hr"),
+    })
@@ -0,0 +1,43 @@
+"""
+Single entry point for every calculator:
+
+    streamlit run app.py
+
+All pages run in one server process, so the heavy imports (pandas, NumPy,
+openpyxl) and the module-level shared resources are loaded once and shared
+by every page and user. These include the tariff registry, unit tables,
+per-database schema setup, the write-behind writer and the job manager.
+"""
+import streamlit as st
+
+# Load the shared modules once per process, before the first page renders
+import bill_store  # noqa: F401
+import measurement_store  # noqa: F401
+import tariffs  # noqa: F401
+import units  # noqa: F401
+from metrics import start_exporter
+from wizard_state import reset_wizard
+
+start_exporter()
+
+CHILLER_PAGES = ("Air Flow Calculator", "Air Flow (classic)")
+
+page = st.navigation({
+    "Air flow": [
+        st.Page("chiller_flow_chatbot.py", title=CHILLER_PAGES[0], icon="💨", default=True),
+        st.Page("ChillerChatbot.py", title=CHILLER_PAGES[1], icon="🌀"),
+    ],
+    "Landed rate": [
+        st.Page("Landed_rateChatbot.py", title="Yearly Landed Rate (PF)", icon="⚡"),
+        st.Page("electricity_landed_rate_chatbot.py", title="Yearly Landed Rate (ToD)", icon="🕒"),
+        st.Page("new_electricity_landed_rate_chatbot.py", title="Monthly Landed Rate", icon="🧾"),
+    ],
+})
+
+# Both chiller pages use the same wizard keys; start fresh when switching between them
+if page.title in CHILLER_PAGES:
+    if st.session_state.get("_chiller_page", page.title) != page.title:
+        reset_wizard()
+    st.session_state["_chiller_page"] = page.title
+
+page.run()
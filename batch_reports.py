@@ -0,0 +1,263 @@
+"""
+Month-end landed-rate reports for many sites at once.
+
+    python batch_reports.py sites.csv --out reports --workers 8
+    python batch_reports.py --demo 500 --out reports --format html
+
+The input (CSV or XLSX) holds reference rows as in
+electricity_landed_rate_chatbot.py plus a Site column; rate, ToD and slab
+columns that are missing take the page defaults. Each site gets an HTML
+report and an XLSX workbook with the reference table, the billing
+components, the ToD slab table of the new_electricity page's breakdown and
+charts of the landed rate and the bill components.
+
+Sites are billed and rendered in a process pool. Each worker writes its
+files as soon as its site is done (as .part files until complete), so a
+long batch can be followed or stopped on disk. The run ends with the
+number of reports and bytes written per second.
+"""
+import argparse
+import hashlib
+import html
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from landed_rate import SLABS, compute_billing_tod, new_slab_units
+from tariffs import MONTHS, TARIFF_VERSION, rates
+
+FORMATS = ("html", "xlsx")
+DEFAULT_WORKERS = int(os.environ.get("LANDED_RATE_WORKERS", os.cpu_count() or 1))
+
+# Page defaults for the columns an input file may leave out
+DEFAULTS = {
+    **rates(),
+    "ToD_ratio_A": 33.541412, "ToD_ratio_B": 34.476496, "ToD_ratio_C": 6.837052, "ToD_ratio_D": 25.14506,
+    "ToD_mul_A": 0.0, "ToD_mul_B": 0.0, "ToD_mul_C": -2.17, "ToD_mul_D": 2.17,
+    "NewRange_A": "00:00-06:00", "NewRange_B": "06:00-09:00", "NewRange_C": "09:00-17:00", "NewRange_D": "17:00-00:00",
+}
+REQUIRED = ["Site", "Month", "MaxDemand_kVA", "Units_kVAh", "EnergyRate_₹/kVAh"]
+
+# Bill components charted in the reports, in bill order
+COMPONENTS = ["DC", "EC", "ToD_charge", "FAC", "ED", "ToS", "BCR", "ICR", "PromptPaymentDisc"]
+
+
+# -----------------------------
+# Inputs
+# -----------------------------
+def load_sites(path: str) -> pd.DataFrame:
+    """Reference rows of every site, with the page defaults filled in."""
+    df = pd.read_excel(path) if path.lower().endswith((".xlsx", ".xls")) else pd.read_csv(path)
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+    for col, value in DEFAULTS.items():
+        df[col] = df[col].fillna(value) if col in df.columns else value
+    df["Site"] = df["Site"].astype(str)
+    return df
+
+def demo_sites(n: int, seed: int = 0) -> pd.DataFrame:
+    """Twelve months of synthetic reference rows for n sites."""
+    rng = np.random.default_rng(seed)
+    rows = n * len(MONTHS)
+    return pd.DataFrame({
+        "Site": np.repeat([f"Site {i + 1:04d}" for i in range(n)], len(MONTHS)),
+        "Month": np.tile(MONTHS, n),
+        "MaxDemand_kVA": rng.normal(13500, 1500, rows).round(2),
+        "Units_kVAh": rng.lognormal(np.log(2_000_000), 0.6, rows).round(2),
+        "EnergyRate_₹/kVAh": np.tile([8.68] * 3 + [8.90] * 9, n),
+        **DEFAULTS,
+    })
+
+def split_sites(df: pd.DataFrame) -> Iterator[Tuple[str, pd.DataFrame]]:
+    for site, rows in df.groupby("Site", sort=True):
+        yield str(site), rows.drop(columns=["Site"]).reset_index(drop=True)
+
+
+# -----------------------------
+# Report tables
+# -----------------------------
+def tod_slab_table(ref_df: pd.DataFrame) -> pd.DataFrame:
+    """New slab units and ToD charges over the site's months, as in the breakdown expander."""
+    units = new_slab_units(ref_df)
+    charges = units * np.column_stack([ref_df[f"ToD_mul_{k}"].to_numpy(dtype=float) for k in SLABS])
+    return pd.DataFrame({
+        "New Slab": list(SLABS),
+        "New Time Range": [", ".join(ref_df[f"NewRange_{k}"].astype(str).unique()) for k in SLABS],
+        "New Units (kVAh)": units.sum(axis=0).round(2),
+        "Multiplier (%)": [", ".join(f"{m:g}" for m in ref_df[f"ToD_mul_{k}"].unique()) for k in SLABS],
+        "ToD Charge (₹)": charges.sum(axis=0).round(2),
+    })
+
+def site_tables(ref_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    return {
+        "Reference Table": ref_df,
+        "Billing Components": compute_billing_tod(ref_df).round(2),
+        "ToD Slabs": tod_slab_table(ref_df),
+    }
+
+
+# -----------------------------
+# HTML
+# -----------------------------
+CSS = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; font-size: 0.85em; margin-bottom: 1.5em; }
+th, td { border: 1px solid #ccc; padding: 0.25em 0.5em; text-align: right; }
+th { background: #f0f2f6; }
+.charts { display: flex; flex-wrap: wrap; gap: 2em; }
+"""
+
+def svg_bars(labels: Sequence[str], values: Sequence[float], title: str,
+             width: int = 560, height: int = 260) -> str:
+    """Inline SVG bar chart; negative values hang below the zero line."""
+    values = [float(v) if np.isfinite(v) else 0.0 for v in values]
+    top, bottom, left = 28, 48, 8
+    lo, hi = min(0.0, *values), max(0.0, *values)
+    span = (hi - lo) or 1.0
+    plot_h = height - top - bottom
+    zero_y = top + plot_h * hi / span
+    slot = (width - 2 * left) / max(len(values), 1)
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" role="img">',
+             f'<text x="{width / 2}" y="18" text-anchor="middle" font-size="14">{html.escape(title)}</text>',
+             f'<line x1="{left}" y1="{zero_y:.1f}" x2="{width - left}" y2="{zero_y:.1f}" stroke="#888"/>']
+    for i, (label, v) in enumerate(zip(labels, values)):
+        x = left + i * slot + slot * 0.1
+        h = plot_h * abs(v) / span
+        y = zero_y - h if v >= 0 else zero_y
+        parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{slot * 0.8:.1f}" height="{h:.1f}" '
+                     f'fill="{"#1f77b4" if v >= 0 else "#d62728"}"><title>{html.escape(str(label))}: {v:,.4g}</title></rect>')
+        parts.append(f'<text x="{x + slot * 0.4:.1f}" y="{height - bottom + 14}" font-size="10" text-anchor="end" '
+                     f'transform="rotate(-40 {x + slot * 0.4:.1f} {height - bottom + 14})">{html.escape(str(label)[:12])}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+def render_html(site: str, tables: Dict[str, pd.DataFrame]) -> str:
+    bill = tables["Billing Components"]
+    charts = [
+        svg_bars(bill["Month"], bill["LandedRate"], "Landed Unit Rate (₹ / kWh)"),
+        svg_bars(COMPONENTS, [bill[c].sum() for c in COMPONENTS], "Bill components over the year (₹)"),
+    ]
+    body = [f"<h1>⚡ Landed Unit Rate: {html.escape(site)}</h1>",
+            f"<p>Tariff version {html.escape(TARIFF_VERSION)}. Total bill ₹ {bill['Total'].sum():,.2f}, "
+            f"average landed rate ₹ {bill['LandedRate'].mean():,.4f} / kWh.</p>",
+            f'<div class="charts">{"".join(charts)}</div>']
+    for name, df in tables.items():
+        body.append(f"<h2>{html.escape(name)}</h2>")
+        body.append(df.to_html(index=False, float_format=lambda v: f"{v:,.2f}", border=0))
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(site)}</title>'
+            f"<style>{CSS}</style></head><body>{''.join(body)}</body></html>")
+
+
+# -----------------------------
+# XLSX
+# -----------------------------
+def write_xlsx(path: str, tables: Dict[str, pd.DataFrame]) -> None:
+    """Workbook with one sheet per table and a landed-rate chart next to the billing components."""
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        for name, df in tables.items():
+            df.to_excel(writer, index=False, sheet_name=name)
+        bill = tables["Billing Components"]
+        sheet = "Billing Components"
+        col = bill.columns.get_loc("LandedRate")
+        chart = writer.book.add_chart({"type": "column"})
+        chart.add_series({
+            "name": "Landed Unit Rate (₹ / kWh)",
+            "categories": [sheet, 1, 0, len(bill), 0],
+            "values": [sheet, 1, col, len(bill), col],
+        })
+        chart.set_legend({"none": True})
+        chart.set_title({"name": "Landed Unit Rate (₹ / kWh)"})
+        writer.sheets[sheet].insert_chart(len(bill) + 3, 0, chart)
+
+
+# -----------------------------
+# Batch
+# -----------------------------
+def safe_name(site: str) -> str:
+    """File name for a site; a short hash keeps names that lost characters apart ("Plant <A>" vs "Plant A")."""
+    name = re.sub(r"[^\w.-]+", "_", site).strip("._") or "site"
+    if name != re.sub(r"\s+", "_", site):
+        name += "_" + hashlib.blake2b(site.encode("utf-8"), digest_size=3).hexdigest()
+    return name
+
+def build_report(site: str, ref_df: pd.DataFrame, out_dir: str, formats: Sequence[str]) -> Tuple[str, int]:
+    """Bill one site and write its reports; returns the site and the bytes written."""
+    tables = site_tables(ref_df)
+    base = os.path.join(out_dir, safe_name(site))
+    written = 0
+    for fmt in formats:
+        path, tmp_path = f"{base}.{fmt}", f"{base}.part.{fmt}"     # a report appears only once complete
+        if fmt == "html":
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(render_html(site, tables))
+        else:
+            write_xlsx(tmp_path, tables)
+        os.replace(tmp_path, path)
+        written += os.path.getsize(path)
+    return site, written
+
+def run_batch(df: pd.DataFrame, out_dir: str, formats: Sequence[str] = FORMATS,
+              workers: int = DEFAULT_WORKERS) -> Dict[str, float]:
+    """Write the reports of every site in df; prints one line per finished site."""
+    os.makedirs(out_dir, exist_ok=True)
+    sites = list(split_sites(df))
+    failed: List[str] = []
+    written = 0
+    start = time.perf_counter()
+
+    def finished(i: int, site: str, result) -> None:
+        nonlocal written
+        try:
+            size = result()[1]
+        except Exception as e:
+            failed.append(site)
+            print(f"[{i}/{len(sites)}] {site}: failed ({e})", file=sys.stderr)
+            return
+        written += size
+        print(f"[{i}/{len(sites)}] {site}: {size / 1024:,.1f} KiB")
+
+    if workers <= 1:
+        for i, (site, ref_df) in enumerate(sites, 1):
+            finished(i, site, lambda: build_report(site, ref_df, out_dir, formats))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(build_report, site, ref_df, out_dir, formats): site for site, ref_df in sites}
+            for i, fut in enumerate(as_completed(futures), 1):
+                finished(i, futures[fut], fut.result)
+
+    seconds = time.perf_counter() - start
+    ok = len(sites) - len(failed)
+    summary = {"sites": ok, "failed": len(failed), "seconds": seconds, "bytes": written,
+               "sites_per_s": ok / seconds if seconds else 0.0, "mb_per_s": written / 2**20 / seconds if seconds else 0.0}
+    print(f"\n{ok} site report(s) ({', '.join(formats)}) in {seconds:.2f} s with {workers} worker(s): "
+          f"{summary['sites_per_s']:,.1f} sites/s, {summary['mb_per_s']:,.2f} MB/s written to {out_dir}"
+          + (f"; {len(failed)} failed" if failed else ""))
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", help="CSV / XLSX of reference rows with a Site column")
+    parser.add_argument("--demo", type=int, default=0, help="report on this many synthetic sites instead")
+    parser.add_argument("--out", default="reports", help="output directory")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+    if not args.input and not args.demo:
+        parser.error("give an input file or --demo N")
+
+    df = demo_sites(args.demo) if args.demo else load_sites(args.input)
+    summary = run_batch(df, args.out, args.format, args.workers)
+    if summary["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
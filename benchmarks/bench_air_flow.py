@@ -0,0 +1,82 @@
+"""
+Throughput of the air-flow calculation: per-value scalar helpers versus the
+array API, on 10^6 velocity readings spread over many traverses, plus
+area-weighted scoring of the same readings on a standard traverse grid.
+
+    python benchmarks/bench_air_flow.py --readings 1000000 --per-traverse 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from air_flow import (  # noqa: E402
+    calc_area, calc_areas, calc_flow, calc_flows, convert_length, convert_lengths,
+    convert_velocity, convert_velocities,
+)
+from traverse_grid import grid_average, grid_weights  # noqa: E402
+
+VEL_UNITS = ["m/s", "ft/min", "m/min", "ft/s"]
+
+
+def make_batch(n_readings: int, per_traverse: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n_traverses = n_readings // per_traverse
+    shapes = rng.choice(["Square", "Round"], n_traverses)
+    length = rng.uniform(1, 10, n_traverses)
+    breadth = rng.uniform(1, 10, n_traverses)
+    diameter = rng.uniform(1, 10, n_traverses)
+    vel_units = rng.choice(VEL_UNITS, n_traverses)
+    readings = rng.uniform(1, 10, (n_traverses, per_traverse))
+    return shapes, length, breadth, diameter, vel_units, readings
+
+
+def scalar_path(shapes, length, breadth, diameter, vel_units, readings):
+    flows = []
+    for i in range(len(shapes)):
+        if shapes[i] == "Square":
+            dims = {"length": convert_length(length[i], "m"), "breadth": convert_length(breadth[i], "m")}
+        else:
+            dims = {"diameter": convert_length(diameter[i], "m")}
+        area = calc_area(shapes[i], dims)
+        vels = [convert_velocity(v, vel_units[i]) for v in readings[i]]
+        flows.append(calc_flow(vels, area)[1])
+    return np.array(flows)
+
+
+def array_path(shapes, length, breadth, diameter, vel_units, readings):
+    areas = calc_areas(shapes, convert_lengths(length, "m"), convert_lengths(breadth, "m"), convert_lengths(diameter, "m"))
+    vels = convert_velocities(readings, vel_units[:, None].repeat(readings.shape[1], axis=1))
+    return calc_flows(vels, areas)[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=1_000_000)
+    parser.add_argument("--per-traverse", type=int, default=10)
+    args = parser.parse_args()
+
+    batch = make_batch(args.readings, args.per_traverse)
+    n = batch[-1].size
+    results = {}
+    for name, fn in [("scalar", scalar_path), ("array", array_path)]:
+        t0 = time.perf_counter()
+        results[name] = fn(*batch)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>7}: {elapsed:8.3f} s  {n / elapsed:14,.0f} readings/s")
+    assert np.allclose(results["scalar"], results["array"])
+
+    # Round equal-area grid, 20 points per diameter (40 readings per traverse)
+    weights = grid_weights("Round", "equal_area", 20)
+    readings = batch[-1].ravel()[: n // weights.size * weights.size].reshape(-1, weights.size)
+    t0 = time.perf_counter()
+    grid_average(readings, weights)
+    elapsed = time.perf_counter() - t0
+    print(f"{'grid':>7}: {elapsed:8.3f} s  {readings.size / elapsed:14,.0f} readings/s")
+
+
+if __name__ == "__main__":
+    main()
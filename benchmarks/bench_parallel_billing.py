@@ -0,0 +1,73 @@
+"""
+Scaling benchmark for the process-pool billing path.
+
+    python benchmarks/bench_parallel_billing.py --sites 200 --years 10 --samples 50 --max-workers 8
+
+Builds a multi-site, multi-year Monte Carlo portfolio table, bills it
+in-process once, then through parallel_billing with 1..N workers.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from landed_rate import compute_billing_tod  # noqa: E402
+from parallel_billing import parallel_billing  # noqa: E402
+
+MONTHS = [
+    "January","February","March","April","May","June",
+    "July","August","September","October","November","December"
+]
+
+
+def portfolio_table(sites: int, years: int, samples: int, seed: int = 0) -> pd.DataFrame:
+    """Sites x years x months x Monte Carlo samples, with sampled demand and consumption."""
+    rng = np.random.default_rng(seed)
+    n = sites * years * 12 * samples
+    df = pd.DataFrame({
+        "Site": np.repeat([f"Site {i:03d}" for i in range(sites)], years * 12 * samples),
+        "Year": np.tile(np.repeat(2025 + np.arange(years), 12 * samples), sites),
+        "Month": np.tile(np.repeat(MONTHS, samples), sites * years),
+        "MaxDemand_kVA": rng.normal(13500, 1500, n),
+        "Units_kVAh": rng.lognormal(np.log(2_000_000), 0.6, n),
+        "EnergyRate_₹/kVAh": rng.normal(8.8, 0.2, n),
+        "DC_rate": 600.0, "FAC_rate": 0.5, "ToS_rate": 0.2894, "ED_percent": 7.5,
+        "ToD_ratio_A": 33.541412, "ToD_ratio_B": 34.476496, "ToD_ratio_C": 6.837052, "ToD_ratio_D": 25.14506,
+        "ToD_mul_A": 0.0, "ToD_mul_B": 0.0, "ToD_mul_C": -2.17, "ToD_mul_D": 2.17,
+        "NewRange_A": "00:00-06:00", "NewRange_B": "06:00-09:00",
+        "NewRange_C": "09:00-17:00", "NewRange_D": "17:00-00:00",
+    })
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sites", type=int, default=100)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    df = portfolio_table(args.sites, args.years, args.samples)
+    print(f"Portfolio rows: {len(df):,}")
+
+    t0 = time.perf_counter()
+    serial = compute_billing_tod(df)
+    base = time.perf_counter() - t0
+    print(f"{'in-process':>12}: {base:8.3f} s  {len(df) / base:12,.0f} rows/s")
+
+    counts = sorted({2 ** i for i in range(args.max_workers.bit_length()) if 2 ** i <= args.max_workers} | {args.max_workers})
+    for workers in counts:
+        t0 = time.perf_counter()
+        result = parallel_billing(df, compute_billing_tod, workers=workers)
+        elapsed = time.perf_counter() - t0
+        assert np.allclose(result["LandedRate"].to_numpy(), serial["LandedRate"].to_numpy())
+        print(f"{workers:>4} workers: {elapsed:8.3f} s  {len(df) / elapsed:12,.0f} rows/s  speed-up x{base / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
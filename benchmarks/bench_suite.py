@@ -0,0 +1,223 @@
+"""
+Benchmark suite for the calculation hot paths, with a regression gate.
+
+    python benchmarks/bench_suite.py --out bench.json
+    python benchmarks/bench_suite.py --baseline bench.json --threshold 0.25
+    python benchmarks/bench_suite.py --only billing --quick
+
+Covers the landed-rate billing (12 rows up to 1M rows, and cache hits),
+the ToD overlap helpers, the CSV / Excel exports, the air-flow / unit
+conversions and the chart downsampling. Each case is timed several times.
+The median is reported, and regressions are judged on the fastest run,
+which is the least noisy figure. Results are
+written as JSON, one entry per case plus the machine and library versions.
+With --baseline, each case is compared to an earlier run and the exit
+status is 1 if any case is slower than baseline x (1 + threshold).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from air_flow import calc_area, calc_flow, calc_flows, convert_velocities  # noqa: E402
+from downsample import lttb, min_max  # noqa: E402
+from exports import to_csv, to_excel  # noqa: E402
+from landed_rate import (  # noqa: E402
+    compute_billing, compute_billing_tod, parse_multi_ranges_input, redistribution_matrix,
+    total_overlap_hours_multi,
+)
+from result_cache import cached_billing  # noqa: E402
+from tariffs import MONTHS, rates  # noqa: E402
+from units import convert  # noqa: E402
+
+# Slowdowns smaller than this are timer noise, whatever the ratio
+MIN_DELTA_S = 0.001
+
+TOD_RANGES = ["00:00-06:00", "06:00-09:00", "09:00-17:00", "17:00-00:00"]
+RANGE_INPUTS = ["22:00-06:00", "06:00-09:00, 12:00-18:00", "09:00-12:00", "18:00-22:00 | 23:00-01:00", "bad, 01:00-02:00"]
+
+
+# -----------------------------
+# Inputs
+# -----------------------------
+def pf_table(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Month": np.resize(MONTHS, n),
+        "PF": rng.uniform(0.95, 1.0, n),
+        "MaxDemand_kVA": rng.normal(13500, 1500, n),
+        "kvah": rng.lognormal(np.log(2_000_000), 0.6, n),
+        "EnergyRate_₹/kVAh": rng.normal(8.8, 0.2, n),
+        **rates(),
+        "ToD_ratio_A": 33.541412, "ToD_ratio_B": 34.476496, "ToD_ratio_C": 6.837052, "ToD_ratio_D": 25.14506,
+        "ToD_mul_A": 0.0, "ToD_mul_B": 0.0, "ToD_mul_C": -2.17, "ToD_mul_D": 2.17,
+    })
+
+def tod_table(n: int, seed: int = 0) -> pd.DataFrame:
+    df = pf_table(n, seed).drop(columns=["PF"]).rename(columns={"kvah": "Units_kVAh"})
+    for k, r in zip("ABCD", TOD_RANGES):
+        df[f"NewRange_{k}"] = r
+    return df
+
+
+# -----------------------------
+# Cases
+# -----------------------------
+# name -> (setup, items per call); setup returns the zero-argument callable to time
+Case = Tuple[Callable[[], Callable[[], object]], int]
+
+def _overlaps(calls: int):
+    old = [parse_multi_ranges_input(r) for r in RANGE_INPUTS]
+    new = [parse_multi_ranges_input(r) for r in TOD_RANGES]
+    pairs = [(o, n) for o in old for n in new] * (calls // (len(old) * len(new)))
+    return lambda: [total_overlap_hours_multi(o, n) for o, n in pairs]
+
+def _parse(calls: int):
+    inputs = RANGE_INPUTS * (calls // len(RANGE_INPUTS))
+    return lambda: [parse_multi_ranges_input(s) for s in inputs]
+
+def _excel(n: int):
+    ref = pf_table(n)
+    bill = compute_billing(ref).round(2)
+    return lambda: to_excel(ref, bill)
+
+def _csv(n: int):
+    bill = compute_billing(pf_table(n)).round(2)
+    return lambda: to_csv(bill)
+
+def _calc_flow(calls: int):
+    rng = np.random.default_rng(0)
+    traverses = [list(v) for v in rng.uniform(1, 10, (calls, 10))]
+    area = calc_area("Round", {"diameter": 2.4})
+    return lambda: [calc_flow(v, area) for v in traverses]
+
+def _calc_flows(n: int):
+    rng = np.random.default_rng(0)
+    vels = rng.uniform(1, 10, (n // 10, 10))
+    units = np.resize(["m/s", "ft/min", "m/min", "ft/s"], vels.shape)
+    areas = rng.uniform(1, 50, n // 10)
+    return lambda: calc_flows(convert_velocities(vels, units), areas)
+
+def _series(n: int, method: str):
+    x = np.arange(n, dtype=np.float64)
+    y = np.sin(x / 5000) + np.random.default_rng(0).normal(0, 0.1, n)
+    return (lambda: lttb(x, y, 2_000)) if method == "lttb" else (lambda: min_max(y, 2_000))
+
+def _convert(n: int):
+    values = np.random.default_rng(0).uniform(0, 1e6, n)
+    pf = np.random.default_rng(1).uniform(0.95, 1.0, n)
+    return lambda: convert(values, "MVAh", "kWh", pf)
+
+CASES: Dict[str, Case] = {
+    **{f"billing_pf[{n}]": ((lambda n=n: (lambda df=pf_table(n): compute_billing(df))), n)
+       for n in (12, 10_000, 1_000_000)},
+    **{f"billing_tod[{n}]": ((lambda n=n: (lambda df=tod_table(n): compute_billing_tod(df))), n)
+       for n in (12, 10_000, 1_000_000)},
+    **{f"billing_tod_cached[{n}]": ((lambda n=n: (lambda df=tod_table(n): cached_billing(df, compute_billing_tod))), n)
+       for n in (12, 10_000)},
+    "tod_overlap[10000]": (lambda: _overlaps(10_000), 10_000),
+    "tod_parse_ranges[10000]": (lambda: _parse(10_000), 10_000),
+    "tod_redistribution_matrix": (lambda: (lambda: redistribution_matrix.__wrapped__(tuple(TOD_RANGES))), 1),
+    "export_excel[12]": (lambda: _excel(12), 12),
+    "export_excel[2000]": (lambda: _excel(2_000), 2_000),
+    "export_csv[20000]": (lambda: _csv(20_000), 20_000),
+    "calc_flow[10000]": (lambda: _calc_flow(10_000), 10_000),
+    "calc_flows[1000000]": (lambda: _calc_flows(1_000_000), 1_000_000),
+    "convert_energy[1000000]": (lambda: _convert(1_000_000), 1_000_000),
+    "downsample_lttb[1000000]": (lambda: _series(1_000_000, "lttb"), 1_000_000),
+    "downsample_min_max[1000000]": (lambda: _series(1_000_000, "min_max"), 1_000_000),
+}
+
+
+def time_case(fn: Callable[[], object], repeats: int, min_time: float) -> List[float]:
+    """Wall time of ``repeats`` calls, after one warm-up; repeats more until min_time has passed."""
+    fn()
+    times: List[float] = []
+    start = time.perf_counter()
+    while len(times) < repeats or (time.perf_counter() - start < min_time and len(times) < 100):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Names of the cases whose fastest run is slower than baseline x (1 + threshold)."""
+    slower = []
+    print(f"\n{'case':<28} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["min_s"], r["min_s"]
+        change = new / old - 1 if old else 0.0
+        regressed = change > threshold and new - old > MIN_DELTA_S
+        print(f"{name:<28} {old * 1000:10.2f}ms {new * 1000:10.2f}ms {change:+8.1%}" + ("  REGRESSION" if regressed else ""))
+        if regressed:
+            slower.append(name)
+    return slower
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--only", default="", help="run only the cases whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="skip the 1M-row cases")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict] = {}
+    print(f"{'case':<28} {'median':>12} {'min':>12} {'items/s':>14}")
+    for name, (setup, items) in CASES.items():
+        if args.only not in name or (args.quick and items >= 1_000_000):
+            continue
+        times = time_case(setup(), args.repeats, min_time=0.2)
+        median = float(np.median(times))
+        results[name] = {"median_s": median, "min_s": min(times), "repeats": len(times), "items": items,
+                         "items_per_s": items / median if median else None}
+        print(f"{name:<28} {median * 1000:10.2f}ms {min(times) * 1000:10.2f}ms {items / median:14,.0f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump({"environment": environment(), "threshold": args.threshold, "results": results}, fh, indent=2)
+        print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(f"\n{len(slower)} case(s) slower than the baseline by more than {args.threshold:.0%}: {', '.join(slower)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Load test for calc_api.py.
+
+    python calc_api.py &
+    python benchmarks/load_api.py --endpoint /air-flow --connections 64 --duration 10 --batch 1
+
+Opens N keep-alive connections, each sending requests back to back, and
+reports throughput and latency percentiles.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+AIR_FLOW_ROW = {"shape": "Round", "unit": "m", "dimensions": {"diameter": 2.4},
+                "vel_unit": "m/s", "velocities": [5.1, 5.4, 4.9, 5.2, 5.0, 5.3]}
+
+TOD_ROW = {
+    "Month": "January", "MaxDemand_kVA": 13500.0, "Units_kVAh": 500000.0, "EnergyRate_₹/kVAh": 8.68,
+    "DC_rate": 600.0, "FAC_rate": 0.5, "ToS_rate": 0.2894, "ED_percent": 7.5,
+    "ToD_ratio_A": 33.541412, "ToD_ratio_B": 34.476496, "ToD_ratio_C": 6.837052, "ToD_ratio_D": 25.14506,
+    "ToD_mul_A": 0.0, "ToD_mul_B": 0.0, "ToD_mul_C": -2.17, "ToD_mul_D": 2.17,
+    "NewRange_A": "00:00-06:00", "NewRange_B": "06:00-09:00", "NewRange_C": "09:00-17:00", "NewRange_D": "17:00-00:00",
+}
+
+ROWS = {"/air-flow": AIR_FLOW_ROW, "/landed-rate/tod": TOD_ROW}
+
+
+async def _client(host, port, request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - t0)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors.append(head.split(b"\r\n", 1)[0])
+    finally:
+        writer.close()
+
+
+async def run(args) -> None:
+    body = json.dumps({"rows": [ROWS[args.endpoint]] * args.batch}).encode("utf-8")
+    request = (
+        f"POST {args.endpoint} HTTP/1.1\r\nHost: {args.host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[
+        _client(args.host, args.port, request, deadline, latencies, errors) for _ in range(args.connections)
+    ])
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    print(f"{args.endpoint}: {len(lat_ms):,} requests, {args.connections} connections, batch {args.batch}")
+    print(f"  throughput: {len(lat_ms) / elapsed:,.0f} req/s, {len(lat_ms) * args.batch / elapsed:,.0f} rows/s")
+    print(f"  latency ms: p50 {np.percentile(lat_ms, 50):.2f}  p95 {np.percentile(lat_ms, 95):.2f}  "
+          f"p99 {np.percentile(lat_ms, 99):.2f}  max {lat_ms.max():.2f}")
+    print(f"  errors: {len(errors)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--endpoint", choices=sorted(ROWS), default="/air-flow")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,276 @@
+"""
+Concurrent-session load test for the Streamlit apps.
+
+    python benchmarks/load_sessions.py --scenario chiller --sessions 16 --iterations 3
+    python benchmarks/load_sessions.py --scenario landed --sessions 8
+    streamlit run app.py --server.port 8501 &
+    python benchmarks/load_sessions.py --scenario compact --port 8501 --page chiller_flow_chatbot
+
+Starts ``streamlit run`` headless on a free port (unless --port points at a
+running server) and drives it over the same websocket protocol the browser
+uses. Each session is a scripted user:
+
+    chiller   technician walking the step-by-step air-flow wizard end to end
+    compact   technician using the single-form quick entry
+    landed    analyst ticking every month in the PF reference table and running the yearly calculation
+
+All sessions run at once. Every interaction is timed from the request until
+the script run finishes (including any st.rerun it triggers), and the report
+lists rerun latency percentiles, throughput and the server memory added per
+live session. A server started here writes its databases and Excel export to
+a temporary directory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMEOUT = 120
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident set size of a process (Linux /proc; 0 where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+class Session:
+    """One scripted browser session; records the wall time of every rerun."""
+
+    def __init__(self, url: str, page: str, latencies: List[float]):
+        self.url = url
+        self.page = page
+        self.latencies = latencies
+        self.values: Dict[str, WidgetState] = {}
+        self.elements: List = []
+        self.ws = None
+
+    async def open(self) -> None:
+        self.ws = await websocket_connect(self.url, max_message_size=256 * 2**20)
+        await self.rerun()
+
+    def close(self) -> None:
+        self.ws.close()
+
+    async def rerun(self, triggers: Iterable[WidgetState] = ()) -> None:
+        msg = BackMsg()
+        msg.rerun_script.page_name = self.page
+        msg.rerun_script.widget_states.widgets.extend([*self.values.values(), *triggers])
+        t0 = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        elements, errors = [], []
+        while True:
+            raw = await asyncio.wait_for(self.ws.read_message(), TIMEOUT)
+            if raw is None:
+                raise ConnectionError("server closed the session")
+            fm = ForwardMsg()
+            fm.ParseFromString(raw)
+            kind = fm.WhichOneof("type")
+            if kind == "new_session":
+                elements, errors = [], []
+            elif kind == "delta" and fm.delta.WhichOneof("type") == "new_element":
+                el = fm.delta.new_element
+                t = el.WhichOneof("type")
+                if t == "exception":
+                    errors.append(el.exception.message)
+                elements.append((t, getattr(el, t)))
+            elif kind == "script_finished":
+                if fm.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+                elements, errors = [], []        # st.rerun(): the next run follows on its own
+        self.latencies.append(time.perf_counter() - t0)
+        self.elements = elements
+        if errors:
+            raise RuntimeError(errors[0])
+
+    def find(self, kind: str, match: str):
+        for t, el in self.elements:
+            if t == kind and (match in getattr(el, "label", "") or match in el.id):
+                return el
+        raise LookupError(f"no {kind} matching {match!r} on {self.page or 'the page'}")
+
+    def set(self, kind: str, match: str, value) -> None:
+        el = self.find(kind, match)
+        state = WidgetState(id=el.id)
+        if kind in ("radio", "selectbox"):
+            state.int_value = list(el.options).index(value)
+        elif kind == "number_input":
+            if el.data_type == el.INT:
+                state.int_value = int(value)
+            else:
+                state.double_value = float(value)
+        elif kind in ("text_input", "text_area"):
+            state.string_value = value
+        elif kind == "arrow_data_frame":
+            state.string_value = json.dumps(value)
+        else:
+            raise ValueError(f"unsupported widget type {kind}")
+        self.values[el.id] = state
+
+    async def click(self, label: str) -> None:
+        await self.rerun([WidgetState(id=self.find("button", label).id, trigger_value=True)])
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+async def chiller(s: Session) -> None:
+    await s.click("Calculate Air Flow")
+    s.set("text_input", "Equipment ID", "CT-LOAD")
+    await s.click("Next")                     # equipment
+    await s.click("Next")                     # shape (Square)
+    await s.click("Next")                     # unit (m)
+    s.set("number_input", "Length", 2.0)
+    s.set("number_input", "Breadth", 3.0)
+    await s.click("Next")                     # dimensions
+    s.set("number_input", "how many velocity readings", 4)
+    await s.click("Next")                     # reading count
+    await s.click("Next")                     # velocity unit
+    for i, v in enumerate((5.0, 5.4, 4.8, 5.1), start=1):
+        s.set("number_input", f"Velocity reading #{i}", v)
+        await s.click("Add Reading")
+    await s.click("Review")
+    await s.click("Proceed")
+    if any(t == "button" and "Calculate" in el.label for t, el in s.elements):
+        await s.click("Calculate")            # cooling-tower KPI step
+    await s.click("Start New Calculation")
+
+async def compact(s: Session) -> None:
+    await s.click("Quick Entry")
+    s.set("radio", "Shape", "Round")
+    s.set("number_input", "Diameter", 2.4)
+    s.set("text_area", "Velocity readings", "5.0 5.4 4.8 5.1 5.3 4.9")
+    await s.click("Calculate")
+    await s.click("Start New Calculation")
+
+async def landed(s: Session) -> None:
+    s.set("number_input", "Jan–Mar", 8.70)
+    await s.rerun()
+    s.set("arrow_data_frame", "pf_ref_table_editor__editor",
+          {"edited_rows": {str(i): {"Calc": True} for i in range(12)}, "added_rows": [], "deleted_rows": []})
+    await s.rerun()
+    await s.click("Run Calculations")
+
+SCRIPTS = {"chiller": "chiller_flow_chatbot.py", "compact": "chiller_flow_chatbot.py", "landed": "Landed_rateChatbot.py"}
+STEPS = {"chiller": chiller, "compact": compact, "landed": landed}
+
+
+# -----------------------------
+# Server
+# -----------------------------
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(script: str, port: int) -> subprocess.Popen:
+    tmp = tempfile.mkdtemp(prefix="load_sessions_")
+    env = dict(os.environ)
+    env.setdefault("MEASUREMENT_DB", os.path.join(tmp, "measurements.db"))
+    env.setdefault("LANDED_RATE_DB", os.path.join(tmp, "landed_rate_history.db"))
+    env.setdefault("SMART_CHILLER_EXCEL", os.path.join(tmp, "SmartChillerChatbotExcel.xlsx"))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, script),
+         "--server.headless", "true", "--server.port", str(port),
+         "--browser.gatherUsageStats", "false", "--logger.level", "error"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"streamlit exited with code {proc.returncode}")
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("streamlit did not start within 60 s")
+
+
+async def run_session(url: str, page: str, scenario: str, iterations: int, latencies: List[float],
+                      live: List[Session]) -> None:
+    s = Session(url, page, latencies)
+    await s.open()
+    live.append(s)                          # kept open for the memory reading
+    for _ in range(iterations):
+        await STEPS[scenario](s)
+
+
+async def load(url: str, page: str, args, pid: Optional[int]) -> None:
+    # Warm-up: imports and first-run caches should not count against the sessions
+    warm: List[Session] = []
+    await run_session(url, page, args.scenario, 1, [], warm)
+    warm[0].close()
+
+    latencies: List[float] = []
+    live: List[Session] = []
+    rss_before = rss_bytes(pid) if pid else 0
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(run_session(url, page, args.scenario, args.iterations, latencies, live) for _ in range(args.sessions)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - start
+    rss_after = rss_bytes(pid) if pid else 0
+    for s in live:
+        s.close()
+    errors = [r for r in results if isinstance(r, BaseException)]
+
+    lat_ms = np.array(latencies) * 1000
+    print(f"{args.scenario}: {args.sessions} concurrent sessions x {args.iterations} walks, "
+          f"{len(lat_ms):,} reruns in {elapsed:.1f} s")
+    print(f"  throughput: {len(lat_ms) / elapsed:,.1f} reruns/s, "
+          f"{(args.sessions - len(errors)) * args.iterations / elapsed:,.2f} walks/s")
+    if len(lat_ms):
+        print(f"  rerun latency ms: p50 {np.percentile(lat_ms, 50):.1f}  p95 {np.percentile(lat_ms, 95):.1f}  "
+              f"p99 {np.percentile(lat_ms, 99):.1f}  max {lat_ms.max():.1f}")
+    if rss_before and rss_after:
+        added = rss_after - rss_before
+        print(f"  server memory: +{added / 2**20:,.1f} MiB RSS for {len(live)} live sessions "
+              f"({added / max(len(live), 1) / 2**20:,.2f} MiB/session)")
+    print(f"  failed sessions: {len(errors)}" + (f" (first: {errors[0]!r})" if errors else ""))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(STEPS), default="chiller")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=2, help="scripted walks per session")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="drive an already running server instead of starting one")
+    parser.add_argument("--page", default="", help="page name when the server runs the multipage app.py")
+    args = parser.parse_args()
+
+    proc = None
+    port = args.port
+    if port is None:
+        port = _free_port()
+        proc = start_server(SCRIPTS[args.scenario], port)
+    try:
+        url = f"ws://{args.host}:{port}/_stcore/stream"
+        asyncio.run(load(url, args.page, args, proc.pid if proc else None))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
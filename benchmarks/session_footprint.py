@@ -0,0 +1,85 @@
+"""
+Per-session memory of the state the pages keep, in the old and the compact
+forms, measured with session_memory.deep_size.
+
+    python benchmarks/session_footprint.py --readings 2000 --sessions 200
+
+Compares velocity readings as a list of floats against a typed array, the
+rerun-timing history as dicts against __slots__ records, and a kept cProfile
+profile raw against zlib-compressed.
+"""
+import argparse
+import cProfile
+import marshal
+import os
+import sys
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_suite import pf_table  # noqa: E402
+from landed_rate import compute_billing  # noqa: E402
+from rerun_timing import HISTORY, KEEP_PROFILES, Profile, Rerun  # noqa: E402
+from session_memory import deep_size  # noqa: E402
+from wizard_state import readings  # noqa: E402
+
+PHASES = ["state init", "table build", "editor", "calculation", "render", "export", "history"]
+
+
+def velocity_forms(n: int):
+    values = np.random.default_rng(0).uniform(1, 10, n)
+    return [float(v) for v in values], readings(values)
+
+def history_forms():
+    old, new = [], []
+    for i in range(HISTORY):
+        phases = {p: round(1.5 * (j + 1) + i, 3) for j, p in enumerate(PHASES)}
+        total = round(sum(phases.values()), 3)
+        now = 1_700_000_000.0 + i
+        old.append({"time": datetime.fromtimestamp(now).isoformat(timespec="milliseconds"), "page": "Landed_rateChatbot",
+                    "session": "0f1e2d3c-4b5a-6978-8796-a5b4c3d2e1f0", "total_ms": total, "phases_ms": phases})
+        new.append(Rerun(now, "Landed_rateChatbot", total, phases))
+    return old, new
+
+def profile_forms():
+    old, new = [], []
+    for i in range(KEEP_PROFILES):
+        df = pf_table(12, seed=i)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        for _ in range(20):
+            compute_billing(df)
+        profiler.disable()
+        profiler.create_stats()
+        raw = marshal.dumps(profiler.stats)
+        old.append({"record": {}, "stats": raw})
+        new.append(Profile(Rerun(0.0, "Landed_rateChatbot", 0.0, {}), zlib.compress(raw)))
+    return old, new
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=2_000, help="velocity readings held by the session")
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent sessions to scale the totals to")
+    args = parser.parse_args()
+
+    rows = [
+        (f"velocities ({args.readings:,} readings)", *velocity_forms(args.readings)),
+        (f"rerun history ({HISTORY} reruns)", *history_forms()),
+        (f"kept profiles ({KEEP_PROFILES})", *profile_forms()),
+    ]
+    total_old = total_new = 0
+    print(f"{'state':<34} {'old':>12} {'compact':>12} {'saved':>8}")
+    for name, old, new in rows:
+        a, b = deep_size(old), deep_size(new)
+        total_old, total_new = total_old + a, total_new + b
+        print(f"{name:<34} {a / 1024:10.1f}KiB {b / 1024:10.1f}KiB {1 - b / a:8.0%}")
+    print(f"{'per session':<34} {total_old / 1024:10.1f}KiB {total_new / 1024:10.1f}KiB {1 - total_new / total_old:8.0%}")
+    print(f"{f'{args.sessions} sessions':<34} {total_old * args.sessions / 2**20:10.1f}MiB "
+          f"{total_new * args.sessions / 2**20:10.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from tariffs import MONTHS
+
+# Local history of every landed-rate run (override with LANDED_RATE_DB)
+DB_PATH = os.environ.get(
+    "LANDED_RATE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "landed_rate_history.db"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    app             TEXT NOT NULL,
+    site            TEXT NOT NULL,
+    year            INTEGER NOT NULL,
+    tariff_version  TEXT NOT NULL,
+    created_at      TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bills (
+    bill_id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id          INTEGER NOT NULL REFERENCES runs(run_id),
+    site            TEXT NOT NULL,
+    year            INTEGER NOT NULL,
+    month           INTEGER NOT NULL,
+    tariff_version  TEXT NOT NULL,
+    inputs          TEXT NOT NULL,
+    components      TEXT NOT NULL,
+    total           REAL,
+    landed_rate     REAL
+);
+CREATE INDEX IF NOT EXISTS idx_bills_site_year_month ON bills(site, year, month);
+"""
+
+
+# -----------------------------
+# Connection
+# -----------------------------
+# Databases whose schema this process has already set up (shared by all pages/sessions)
+_ready = set()
+_ready_lock = threading.Lock()
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    # Checked before connecting, which would create an empty file for a deleted database
+    ready = path in _ready and os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=30)
+    if ready:
+        return conn
+    with _ready_lock:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _ready.add(path)
+    return conn
+
+@contextmanager
+def _session(path: str = DB_PATH):
+    """Connection that commits on success and is always closed."""
+    conn = connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def _month_number(name: str) -> int:
+    return MONTHS.index(name) + 1
+
+def _json_row(row) -> str:
+    return json.dumps({k: (v.item() if hasattr(v, "item") else v) for k, v in row.items()})
+
+
+# -----------------------------
+# Writes
+# -----------------------------
+def _records(ref_df: pd.DataFrame, billing_df: pd.DataFrame) -> Tuple[List[dict], List[dict]]:
+    # Bills come back in the order of the reference rows, so inputs are matched by position
+    if len(ref_df) != len(billing_df):
+        raise ValueError(f"{len(ref_df)} reference rows but {len(billing_df)} bills")
+    return ref_df.to_dict(orient="records"), billing_df.to_dict(orient="records")
+
+def _insert_run(conn: sqlite3.Connection, app: str, site: str, year: int, tariff_version: str,
+                inputs: List[dict], bills: List[dict]) -> int:
+    cur = conn.execute(
+        "INSERT INTO runs (app, site, year, tariff_version, created_at) VALUES (?, ?, ?, ?, ?)",
+        (app, site, int(year), tariff_version, datetime.now().isoformat(timespec="seconds")),
+    )
+    run_id = cur.lastrowid
+    conn.executemany(
+        "INSERT INTO bills (run_id, site, year, month, tariff_version, inputs, components, total, landed_rate) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (
+                run_id, site, int(year), _month_number(bill["Month"]), tariff_version,
+                _json_row(row), _json_row(bill),
+                float(bill["Total"]), float(bill["LandedRate"]),
+            )
+            for row, bill in zip(inputs, bills)
+        ],
+    )
+    return run_id
+
+def record_run(app: str, site: str, year: int, tariff_version: str,
+               ref_df: pd.DataFrame, billing_df: pd.DataFrame,
+               path: str = DB_PATH) -> int:
+    """Store one calculation run: the inputs and billing components of every computed row."""
+    inputs, bills = _records(ref_df, billing_df)
+    with _session(path) as conn:
+        return _insert_run(conn, app, site, year, tariff_version, inputs, bills)
+
+def record_runs(app: str, site: str, year: int, tariff_version: str,
+                ref_df: pd.DataFrame, billing_df: pd.DataFrame,
+                path: str = DB_PATH) -> List[int]:
+    """
+    Store a calculation as one run per (Site, Year) of the reference rows, in
+    one transaction. Without Site / Year columns every row is filed under
+    ``site`` and ``year``.
+    """
+    inputs, bills = _records(ref_df, billing_df)
+    ref_df = ref_df.reset_index(drop=True)
+    sites = ref_df["Site"].astype(str) if "Site" in ref_df else pd.Series(site, index=ref_df.index)
+    years = ref_df["Year"].astype(int) if "Year" in ref_df else pd.Series(int(year), index=ref_df.index)
+    groups = ref_df.groupby([sites.rename("site"), years.rename("year")], sort=False).indices
+    with _session(path) as conn:
+        return [
+            _insert_run(conn, app, s, y, tariff_version, [inputs[i] for i in idx], [bills[i] for i in idx])
+            for (s, y), idx in groups.items()
+        ]
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def list_sites(path: str = DB_PATH) -> List[str]:
+    with _session(path) as conn:
+        return [r[0] for r in conn.execute("SELECT DISTINCT site FROM bills ORDER BY site")]
+
+def landed_rate_history(site: str, years: Optional[List[int]] = None, path: str = DB_PATH) -> pd.DataFrame:
+    """Latest stored bill per (year, month) for a site."""
+    sql = """
+        SELECT b.year, b.month, b.total, b.landed_rate, b.tariff_version, r.app, r.created_at
+        FROM bills b JOIN runs r ON r.run_id = b.run_id
+        WHERE b.bill_id IN (
+            SELECT MAX(bill_id) FROM bills WHERE site = ? GROUP BY year, month
+        )
+    """
+    params: list = [site]
+    if years:
+        sql += f" AND b.year IN ({','.join('?' * len(years))})"
+        params += [int(y) for y in years]
+    sql += " ORDER BY b.year, b.month"
+    with _session(path) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+def landed_rate_series(sites: Optional[List[str]] = None, path: str = DB_PATH) -> pd.DataFrame:
+    """
+    Latest stored landed rate per (site, year, month), dated to the first of
+    the month. Every site when ``sites`` is None, none for an empty list.
+    """
+    sql = """
+        SELECT site, year, month, landed_rate FROM bills
+        WHERE bill_id IN (SELECT MAX(bill_id) FROM bills GROUP BY site, year, month)
+    """
+    params: list = []
+    if sites is not None:
+        sql += f" AND site IN ({','.join('?' * len(sites))})"
+        params += list(sites)
+    with _session(path) as conn:
+        df = pd.read_sql_query(sql, conn, params=params)
+    df.insert(1, "date", pd.to_datetime(dict(year=df.pop("year"), month=df.pop("month"), day=1)))
+    return df.sort_values(["site", "date"], ignore_index=True)
+
+def year_over_year(site: str, path: str = DB_PATH) -> pd.DataFrame:
+    """Landed rate per month (rows) and year (columns) for a site."""
+    hist = landed_rate_history(site, path=path)
+    if hist.empty:
+        return hist
+    yoy = hist.pivot(index="month", columns="year", values="landed_rate")
+    yoy.index = [MONTHS[m - 1] for m in yoy.index]
+    return yoy
+
+
+# -----------------------------
+# Streamlit history view
+# -----------------------------
+def render_history(default_site: Optional[str] = None) -> None:
+    import streamlit as st
+    from downsample import downsample_frame
+
+    sites = list_sites()
+    if not sites:
+        st.info("No stored runs yet. Results are saved here every time you run a calculation.")
+        return
+    index = sites.index(default_site) if default_site in sites else 0
+    site = st.selectbox("Site", sites, index=index, key="history_site")
+    yoy = year_over_year(site)
+    st.markdown("**Landed Rate (₹/kWh) — year over year**")
+    st.dataframe(yoy.round(4), use_container_width=True)
+    st.markdown("**Stored bills**")
+    st.dataframe(landed_rate_history(site), use_container_width=True)
+
+    chart_sites = st.multiselect("Sites to chart", sites, default=[site], key="history_chart_sites")
+    st.markdown("**Landed Rate (₹/kWh) over time**")
+    if not chart_sites:
+        st.info("Select at least one site to chart.")
+        return
+    series = landed_rate_series(chart_sites)
+    points = downsample_frame(series, "date", "landed_rate", by="site")
+    st.line_chart(points, x="date", y="landed_rate", color="site")
+    if len(points) < len(series):
+        st.caption(f"{len(points):,} of {len(series):,} months plotted (downsampled).")
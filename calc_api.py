@@ -0,0 +1,223 @@
+"""
+Local HTTP/JSON API for the landed-rate and air-flow calculators.
+
+    python calc_api.py --host 127.0.0.1 --port 8600
+
+Endpoints (all accept a batch of rows per call):
+
+    GET  /health
+    GET  /metrics         Prometheus text format (see metrics.py)
+    POST /landed-rate/pf    {"rows": [{<Landed_rateChatbot reference row>}, ...]}
+    POST /landed-rate/tod   {"rows": [{<electricity_landed_rate_chatbot reference row>}, ...]}
+    POST /air-flow          {"rows": [{"shape": "Round", "unit": "m", "dimensions": {"diameter": 2.0},
+                                       "vel_unit": "m/s", "velocities": [5.1, 5.3]}, ...]}
+
+Connections are kept alive, so one client can pipeline many requests over a
+single socket. Batches larger than OFFLOAD_ROWS are computed in a worker
+thread so the event loop keeps serving other callers. Results are shared
+with the Streamlit pages through result_cache.py.
+"""
+import argparse
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple, Union
+
+import pandas as pd
+
+from air_flow import SHAPES, calc_area, convert_length, convert_velocity
+from landed_rate import compute_billing, compute_billing_tod
+from metrics import CONTENT_TYPE, render, timed_calculation
+from result_cache import cached_billing, cached_flow
+
+OFFLOAD_ROWS = 1_000
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="calc-api")
+
+
+class BadRequest(Exception):
+    pass
+
+
+# -----------------------------
+# Handlers
+# -----------------------------
+def _rows(payload: dict) -> list:
+    rows = payload.get("rows") if isinstance(payload, dict) else None
+    if not isinstance(rows, list) or not rows:
+        raise BadRequest('Body must be a JSON object with a non-empty "rows" list')
+    return rows
+
+def _billing(fn: Callable[[pd.DataFrame], pd.DataFrame]) -> Callable[[dict], dict]:
+    def handler(payload: dict) -> dict:
+        ref_df = pd.DataFrame(_rows(payload))
+        missing = [c for c in ref_df.columns if c != "Calc" and ref_df[c].isna().any()]
+        if missing:
+            raise BadRequest(f"Missing or null values in: {', '.join(map(str, missing))}")
+        try:
+            result = cached_billing(ref_df, fn)
+        except KeyError as e:
+            raise BadRequest(f"Missing column: {e}")
+        except (TypeError, ValueError) as e:
+            raise BadRequest(f"Invalid row values ({e})")
+        return {"rows": result.to_dict(orient="records")}
+    return handler
+
+def _air_flow(payload: dict) -> dict:
+    results = []
+    for i, row in enumerate(_rows(payload)):
+        shape = row.get("shape") if isinstance(row, dict) else None
+        if shape not in SHAPES:
+            raise BadRequest(f"Row {i}: shape must be one of {SHAPES}, not {shape!r}")
+        try:
+            dims_m = {k: convert_length(float(v), row["unit"]) for k, v in row["dimensions"].items()}
+            area_m2 = calc_area(shape, dims_m)
+            vels_m = [convert_velocity(float(v), row["vel_unit"]) for v in row["velocities"]]
+            avg_m, flow_m3s = cached_flow(vels_m, area_m2)
+        except (AttributeError, KeyError, TypeError, ValueError, ZeroDivisionError) as e:
+            raise BadRequest(f"Row {i}: invalid air-flow input ({e!r})")
+        results.append({
+            "area_m2": area_m2,
+            "avg_velocity_ms": avg_m,
+            "flow_m3s": flow_m3s,
+            "flow_m3min": flow_m3s * 60,
+            "flow_m3hr": flow_m3s * 3600,
+        })
+    return {"rows": results}
+
+ROUTES: Dict[str, Callable[[dict], dict]] = {
+    "/landed-rate/pf": _billing(compute_billing),
+    "/landed-rate/tod": _billing(compute_billing_tod),
+    "/air-flow": _air_flow,
+}
+
+
+# -----------------------------
+# HTTP plumbing
+# -----------------------------
+async def _dispatch(method: str, path: str, body: bytes) -> Tuple[int, Union[dict, str]]:
+    if path == "/health":
+        return 200, {"status": "ok"}
+    if path == "/metrics":
+        return 200, render()
+    handler = ROUTES.get(path)
+    if handler is None:
+        return 404, {"error": f"Unknown path {path}"}
+    if method != "POST":
+        return 405, {"error": "Use POST"}
+    try:
+        payload = json.loads(body or b"{}")
+        rows = payload.get("rows") if isinstance(payload, dict) else None
+        with timed_calculation(f"calc_api{path}", len(rows) if isinstance(rows, list) else 0):
+            if isinstance(rows, list) and len(rows) > OFFLOAD_ROWS:
+                result = await asyncio.get_running_loop().run_in_executor(_executor, handler, payload)
+            else:
+                result = handler(payload)
+        return 200, result
+    except (BadRequest, json.JSONDecodeError) as e:
+        return 400, {"error": str(e)}
+    except Exception as e:
+        return 500, {"error": str(e)}
+
+def _finite(value):
+    """value with NaN and infinities replaced by None, which JSON can carry."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_finite(v) for v in value]
+    return value
+
+def _json(payload: dict) -> bytes:
+    try:
+        text = json.dumps(payload, allow_nan=False)
+    except ValueError:
+        # Only walk the payload when it actually holds a non-finite number
+        text = json.dumps(_finite(payload), allow_nan=False)
+    return text.encode("utf-8")
+
+def _response(status: int, payload: Union[dict, str], keep_alive: bool) -> bytes:
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), CONTENT_TYPE
+    else:
+        body, content_type = _json(payload), "application/json"
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+async def _reject(writer: asyncio.StreamWriter, status: int, error: str) -> None:
+    """Answer a request that cannot be framed; the caller then closes the connection."""
+    writer.write(_response(status, {"error": error}, False))
+    await writer.drain()
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.LimitOverrunError:
+                await _reject(writer, 431, "Request headers too large")
+                break
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            parts = lines[0].split(" ")
+            if len(parts) != 3:
+                break
+            method, path, version = parts
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    k, v = line.split(":", 1)
+                    headers[k.strip().lower()] = v.strip()
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                await _reject(writer, 400, "Invalid Content-Length")
+                break
+            if length > MAX_BODY_BYTES:
+                await _reject(writer, 413, "Body too large")
+                break
+            try:
+                body = await reader.readexactly(length) if length else b""
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+
+            status, payload = await _dispatch(method, path.split("?", 1)[0], body)
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+async def serve(host: str, port: int) -> None:
+    server = await asyncio.start_server(handle_connection, host, port, backlog=1024)
+    print(f"Serving calculator API on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP API for the landed-rate and air-flow calculators")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
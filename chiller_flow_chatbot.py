@@ -1,12 +1,19 @@
 import streamlit as st
-import math
+from air_flow import convert_length, convert_velocities, calc_area, calc_traverse_table, traverse_template
 import pandas as pd
-import os
-from openpyxl import load_workbook
-from datetime import datetime
-
-# === OneDrive Excel File Path ===
-EXCEL_PATH = r"C:\Users\tsvaevq\OneDrive - Volkswagen AG\SmartChillerChatbotExcel.xlsx"
+from logger_import import render_logger_import
+from traverse_grid import METHODS, render_grid_picker, traverse_grid
+from result_cache import cached_flow
+from compact_form import render_compact_form
+from units import convert
+from wizard_state import init_wizard, readings, reset_wizard
+from metrics import observe_calculation, start_exporter
+from tower_kpi import render_kpi_inputs, render_kpis, tower_kpi_record, tower_kpi_table
+import hashlib
+import time
+from io import BytesIO
+import measurement_store
+from write_behind import get_writer
 
 # === Streamlit Config ===
 st.set_page_config(page_title="Air Flow Calculator", page_icon="💨", layout="centered")
@@ -14,56 +21,8 @@ st.title("🤖 Smart Chiller Air Flow Assistant")
 st.write("👋 Hello! How can I help you today?")
 
 # === Session State Initialization ===
-default_keys = {
-    'step': "start", 'equipment': None, 'shape': None, 'unit': None,
-    'dimensions': {}, 'velocities': [], 'vel_unit': None, 'vel_count': 0, 'result': None
-}
-for k, v in default_keys.items():
-    if k not in st.session_state:
-        st.session_state[k] = v
-
-
-# === Helper Functions ===
-def convert_length(value, from_unit):
-    conv = {"m": 1, "cm": 0.01, "foot": 0.3048, "inches": 0.0254}
-    return value * conv[from_unit]
-
-def convert_velocity(value, from_unit):
-    conv = {
-        "m/s": 1, "cm/s": 0.01, "ft/s": 0.3048, "inch/s": 0.0254,
-        "m/min": 1/60, "cm/min": 0.01/60, "ft/min": 0.3048/60, "inches/min": 0.0254/60
-    }
-    return value * conv[from_unit]
-
-def calc_area(shape, dims_m):
-    if shape == "Square":
-        return dims_m['length'] * dims_m['breadth']
-    elif shape == "Round":
-        return math.pi * (dims_m['diameter'] / 2) ** 2
-
-def calc_flow(vels_m, area_m2):
-    avg_vel = sum(vels_m) / len(vels_m)
-    flow = avg_vel * area_m2
-    return avg_vel, flow
-
-def append_to_excel(data_dict):
-    """Append the results to shared Excel file (create if missing)."""
-    df_new = pd.DataFrame([data_dict])
-
-    if os.path.exists(EXCEL_PATH):
-        try:
-            book = load_workbook(EXCEL_PATH)
-            writer = pd.ExcelWriter(EXCEL_PATH, engine='openpyxl')
-            writer.book = book
-            writer.sheets = {ws.title: ws for ws in book.worksheets}
-            start_row = writer.sheets['Sheet1'].max_row
-            df_new.to_excel(writer, index=False, header=False, startrow=start_row, sheet_name='Sheet1')
-            writer.close()
-        except Exception as e:
-            st.error(f"⚠️ Error updating Excel file: {e}")
-    else:
-        df_new.to_excel(EXCEL_PATH, index=False)
-        st.info("📘 Excel file created successfully!")
+init_wizard()
+start_exporter()
 
 
 # === Step Flow ===
@@ -71,12 +30,74 @@ if st.session_state.step == "start":
     if st.button("🔹 Calculate Air Flow"):
         st.session_state.step = "choose_equipment"
         st.rerun()
+    if st.button("⚡ Quick Entry (single form)"):
+        st.session_state.step = "compact"
+        st.rerun()
+    if st.button("📤 Bulk Upload (CSV)"):
+        st.session_state.step = "bulk_upload"
+        st.rerun()
+    if st.button("📈 View Measurement History"):
+        st.session_state.step = "history"
+        st.rerun()
+
+elif st.session_state.step == "bulk_upload":
+    st.write("Upload a CSV with one row per traverse (equipment, shape, dimensions, units and readings; "
+             "cooling towers may add water flow, temperatures and fan power for KPIs):")
+    st.download_button(
+        "⬇️ Download CSV template",
+        traverse_template().to_csv(index=False).encode("utf-8"),
+        "traverse_template.csv",
+        mime="text/csv",
+    )
+    upload = st.file_uploader("Traverse CSV", type=["csv"])
+    if upload is not None:
+        data = upload.getvalue()
+        try:
+            raw = pd.read_csv(BytesIO(data))
+            results = calc_traverse_table(raw)
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+        else:
+            # Tower KPIs for rows that carry operating data; columns nobody filled in are dropped
+            kpis = tower_kpi_table(raw.drop(columns=["flow_m3s"], errors="ignore").assign(flow_m3s=results["flow_m3s"]))
+            results = results.join(kpis.dropna(axis=1, how="all")).round(4)
+            st.success(f"✅ Calculated air flow for {len(results)} traverses.")
+            st.dataframe(results, use_container_width=True, hide_index=True)
+            if st.button("💾 Save all results"):
+                # Keys derive from the file, so saving the same upload twice adds nothing
+                digest = hashlib.sha1(data).hexdigest()[:16]
+                writer = get_writer()
+                for i, record in enumerate(results.to_dict(orient="records")):
+                    writer.submit({**record, "calc_key": f"{digest}-{i}"})
+                st.info(f"💾 {len(results)} results queued for saving.")
+    if st.button("⬅️ Go Back"):
+        st.session_state.step = "start"
+        st.rerun()
+
+elif st.session_state.step == "history":
+    measurement_store.render_history()
+    if st.button("⬅️ Go Back"):
+        st.session_state.step = "start"
+        st.rerun()
+
+elif st.session_state.step == "compact":
+    # Whole measurement in one submission: no rerun per step or per reading
+    values = render_compact_form(ask_equipment_id=True)
+    if values:
+        st.session_state.update(values, velocities=readings(values["velocities"]))
+        st.session_state.step = "result"
+        st.rerun()
+    if st.button("⬅️ Go Back"):
+        st.session_state.step = "start"
+        st.rerun()
 
 elif st.session_state.step == "choose_equipment":
     st.write("For which equipment would you like to calculate flow?")
     equipment = st.radio("Select Equipment", ["Cooling Tower", "Ventilation Unit"], horizontal=True)
+    equipment_id = st.text_input("Equipment ID / tag (e.g. CT-01)")
     if st.button("Next ➡️"):
         st.session_state.equipment = equipment
+        st.session_state.equipment_id = equipment_id.strip() or equipment
         st.session_state.step = "choose_shape"
         st.rerun()
     if st.button("⬅️ Go Back"):
@@ -127,8 +148,9 @@ elif st.session_state.step == "enter_dimensions":
         st.rerun()
 
 elif st.session_state.step == "enter_velocity_count":
-    count = st.number_input("Enter how many velocity readings you will provide", min_value=1, step=1)
+    grid, count = render_grid_picker(st.session_state.shape)
     if st.button("Next ➡️"):
+        st.session_state.grid = grid
         st.session_state.vel_count = count
         st.session_state.step = "choose_velocity_unit"
         st.rerun()
@@ -145,7 +167,7 @@ elif st.session_state.step == "choose_velocity_unit":
     )
     if st.button("Next ➡️"):
         st.session_state.vel_unit = vel_unit
-        st.session_state.velocities = []
+        st.session_state.velocities = readings()
         st.session_state.step = "enter_velocities"
         st.rerun()
     if st.button("⬅️ Go Back"):
@@ -158,7 +180,12 @@ elif st.session_state.step == "enter_velocities":
     st.write(f"Enter {count} velocity readings in **{vel_unit}**:")
     next_idx = len(st.session_state.velocities) + 1
     if next_idx <= count:
-        val = st.number_input(f"Velocity reading #{next_idx}", min_value=0.0, step=0.1)
+        label = f"Velocity reading #{next_idx}"
+        if st.session_state.grid:
+            g = st.session_state.grid
+            point = traverse_grid(st.session_state.shape, g["method"], g["points"]).iloc[next_idx - 1]
+            label += f" at {point['point']} ({point['position']})"
+        val = st.number_input(label, min_value=0.0, step=0.1)
         if st.button("Add Reading"):
             st.session_state.velocities.append(val)
             st.rerun()
@@ -166,15 +193,24 @@ elif st.session_state.step == "enter_velocities":
         if st.button("Review ➡️"):
             st.session_state.step = "review_table"
             st.rerun()
+
+    with st.expander("📂 Import from anemometer logger file"):
+        g = st.session_state.grid
+        imported = render_logger_import(vel_unit, (st.session_state.shape, g["method"], g["points"]) if g else None)
+    if imported:
+        st.session_state.velocities = readings(imported)
+        st.session_state.vel_count = len(imported)
+        st.session_state.step = "review_table"
+        st.rerun()
     if st.button("⬅️ Go Back"):
         st.session_state.step = "choose_velocity_unit"
         st.rerun()
 
 elif st.session_state.step == "review_table":
     st.write("Review your entered velocity readings:")
-    df = pd.DataFrame(st.session_state.velocities, columns=["Velocity"])
+    df = pd.DataFrame({"Velocity": st.session_state.velocities.tolist()})
     edited_df = st.data_editor(df, num_rows="dynamic", key="vel_edit")
-    st.session_state.velocities = edited_df["Velocity"].tolist()
+    st.session_state.velocities = readings(edited_df["Velocity"])
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -187,62 +223,104 @@ elif st.session_state.step == "review_table":
             st.rerun()
     with col4:
         if st.button("✅ Proceed"):
-            st.session_state.step = "result"
+            st.session_state.step = "tower_kpis" if st.session_state.equipment == "Cooling Tower" else "result"
             st.rerun()
 
-elif st.session_state.step == "result":
-    import os
-    import pandas as pd
-
-    path = r"C:\Users\tsvaevq\OneDrive - Volkswagen AG\SmartChillerChatbotExcel.xlsx"
+elif st.session_state.step == "tower_kpis":
+    inputs = render_kpi_inputs()
+    if st.button("Calculate ➡️"):
+        st.session_state.kpi_inputs = inputs
+        st.session_state.step = "result"
+        st.rerun()
+    if st.button("⬅️ Go Back"):
+        st.session_state.step = "review_table"
+        st.rerun()
 
+elif st.session_state.step == "result":
     # --- Calculations ---
+    calc_start = time.perf_counter()
     dims_m = {k: convert_length(v, st.session_state.unit) for k, v in st.session_state.dimensions.items()}
     area_m2 = calc_area(st.session_state.shape, dims_m)
-    vels_m = [convert_velocity(v, st.session_state.vel_unit) for v in st.session_state.velocities]
-    avg_m, flow_m3s = calc_flow(vels_m, area_m2)
-
-    # Convert flow to m³/min and m³/hr
-    flow_m3min = flow_m3s * 60
-    flow_m3hr = flow_m3s * 3600
+    vels_m = convert_velocities(st.session_state.velocities, st.session_state.vel_unit)
+    grid = st.session_state.grid
+    avg_m = None
+    if grid:
+        try:
+            avg_m, flow_m3s = cached_flow(vels_m, area_m2, st.session_state.shape, grid["method"], grid["points"])
+            method = f"{METHODS[grid['method']]} grid, {len(vels_m)} points (area-weighted)"
+        except ValueError:
+            st.warning("⚠️ The readings no longer match the grid, so a simple average is used.")
+    if avg_m is None:
+        avg_m, flow_m3s = cached_flow(vels_m, area_m2)
+        method = f"{len(vels_m)} readings (simple average)"
+
+    # Convert flow to m³/min, m³/hr and CFM
+    flow_m3min = convert(flow_m3s, "m³/s", "m³/min")
+    flow_m3hr = convert(flow_m3s, "m³/s", "m³/hr")
+    flow_cfm = convert(flow_m3s, "m³/s", "CFM")
+
+    kpis = {}
+    if st.session_state.equipment == "Cooling Tower":
+        kpis = tower_kpi_record(flow_m3s, st.session_state.kpi_inputs)
+    if st.session_state.result is None:
+        observe_calculation("chiller_flow_chatbot", len(vels_m), time.perf_counter() - calc_start)
 
     # --- Display results ---
     st.success(f"""
     ✅ **Calculation Complete!**
 
-    - *Equipment:* {st.session_state.equipment}  
+    - *Equipment:* {st.session_state.equipment} ({st.session_state.equipment_id})  
     - Shape: {st.session_state.shape}  
+    - Traverse: {method}  
     - Surface Area: {area_m2:.3f} m²  
     - Average Velocity: {avg_m:.3f} m/s  
     - Air Flow Rate:  
         • {flow_m3s:.4f} m³/s  
         • {flow_m3min:.4f} m³/min  
         • {flow_m3hr:.4f} m³/hr
+        • {flow_cfm:,.0f} CFM
     """)
-
-    # --- Save results to Excel ---
-    new_data = pd.DataFrame([{
-        "Equipment": st.session_state.equipment,
-        "Shape": st.session_state.shape,
-        "Surface Area (m²)": round(area_m2, 4),
-        "Average Velocity (m/s)": round(avg_m, 4),
-        "Flow (m³/s)": round(flow_m3s, 4),
-        "Flow (m³/min)": round(flow_m3min, 4),
-        "Flow (m³/hr)": round(flow_m3hr, 4)
-    }])
-
-    # Check if Excel exists and append or create
-    if os.path.exists(path):
-        existing = pd.read_excel(path)
-        updated = pd.concat([existing, new_data], ignore_index=True)
-        updated.to_excel(path, index=False)
-    else:
-        new_data.to_excel(path, index=False)
-
-    st.info("📊 Result successfully saved to Excel!")
+    render_kpis(kpis)
+
+    # --- Queue result for the measurement log (once per calculation) ---
+    if st.session_state.result is None:
+        record = {
+            "equipment_id": st.session_state.equipment_id,
+            "equipment": st.session_state.equipment,
+            "shape": st.session_state.shape,
+            "area_m2": round(area_m2, 4),
+            "avg_velocity_ms": round(avg_m, 4),
+            "flow_m3s": round(flow_m3s, 4),
+            "flow_m3min": round(flow_m3min, 4),
+            "flow_m3hr": round(flow_m3hr, 4),
+            **kpis,
+        }
+        record["calc_key"] = get_writer().submit(record)
+        st.session_state.result = record
+
+    save_status = get_writer().status(st.session_state.result["calc_key"])
+    if save_status == "saved":
+        st.info("📊 Result successfully saved!")
+        alert = measurement_store.anomaly_for(st.session_state.result["calc_key"])
+        if alert:
+            st.warning(
+                f"⚠️ Air flow is {alert['deviation_pct']:+.1f}% off the rolling baseline for "
+                f"{alert['equipment_id']} ({alert['baseline_mean']:.3f} m³/s, z = {alert['z']:+.1f}). "
+                "Check for fouled fill, a slipping belt or damper changes."
+            )
+    elif save_status == "queued":
+        st.info("💾 Saving result in the background…")
+    elif save_status == "spooled":
+        st.warning("⚠️ Storage is busy; the result is kept locally and will be saved automatically.")
+
+    if st.button("📘 Update shared Excel workbook"):
+        try:
+            rows = measurement_store.export_excel()
+            st.info(f"📘 Excel workbook updated with {rows} results.")
+        except Exception as e:
+            st.error(f"⚠️ Error updating Excel file: {e}")
 
     # --- Restart ---
     if st.button("🔄 Start New Calculation"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
+        reset_wizard()
         st.rerun()
@@ -0,0 +1,118 @@
+"""
+Single-form entry for the chiller air-flow apps.
+
+Every input of the step-by-step wizard (equipment, shape, units,
+dimensions, reading positions, velocity readings and tower operating data)
+sits in one ``st.form``, so a measurement costs one submission instead of
+one round trip per step and per reading. Inputs are validated together and
+all problems are reported at once.
+"""
+import math
+import re
+from typing import List, Optional, Tuple
+
+from air_flow import LENGTH_FACTORS, SHAPES, VELOCITY_FACTORS
+from tower_kpi import render_kpi_inputs
+from traverse_grid import METHODS, grid_sizes, traverse_grid
+
+EQUIPMENT = ["Cooling Tower", "Ventilation Unit"]
+
+
+def parse_readings(text: str) -> Tuple[List[float], List[str]]:
+    """Readings separated by spaces, commas, semicolons or new lines; returns (values, rejected tokens)."""
+    values, rejected = [], []
+    for token in re.split(r"[\s,;]+", text.strip()):
+        if not token:
+            continue
+        try:
+            v = float(token)
+        except ValueError:
+            rejected.append(token)
+            continue
+        if not math.isfinite(v) or v < 0:
+            rejected.append(token)
+        else:
+            values.append(v)
+    return values, rejected
+
+def validate(shape: str, length: float, breadth: float, diameter: float,
+             method: str, points: int, readings_text: str) -> Tuple[dict, List[str]]:
+    """Check the form in one pass; returns the parsed values and a list of problems."""
+    errors = []
+    if shape == "Square":
+        dimensions = {"length": length, "breadth": breadth}
+    else:
+        dimensions = {"diameter": diameter}
+    for name, v in dimensions.items():
+        if not v or v <= 0:
+            errors.append(f"{name.title()} must be greater than zero.")
+
+    velocities, rejected = parse_readings(readings_text or "")
+    if rejected:
+        errors.append(f"Not valid velocity readings: {', '.join(rejected[:10])}")
+    if not velocities:
+        errors.append("Enter at least one velocity reading.")
+
+    grid = None
+    if method != "free":
+        sizes = grid_sizes(shape, method)
+        if points not in sizes:
+            errors.append(f"{METHODS[method]} grid for {shape} takes {', '.join(map(str, sizes))} points.")
+        else:
+            grid = {"method": method, "points": points}
+            expected = len(traverse_grid(shape, method, points))
+            if velocities and len(velocities) != expected:
+                errors.append(f"The grid has {expected} positions but {len(velocities)} readings were entered.")
+    return {"dimensions": dimensions, "velocities": velocities, "vel_count": len(velocities), "grid": grid}, errors
+
+def render_compact_form(ask_equipment_id: bool = False) -> Optional[dict]:
+    """
+    Draw the form. Returns the session-state values for the result step
+    once a submission passes validation, otherwise None.
+    """
+    import streamlit as st
+
+    with st.form("compact_entry"):
+        c1, c2 = st.columns(2)
+        with c1:
+            equipment = st.radio("Equipment", EQUIPMENT, horizontal=True)
+        with c2:
+            equipment_id = st.text_input("Equipment ID / tag (e.g. CT-01)") if ask_equipment_id else ""
+        c1, c2 = st.columns(2)
+        with c1:
+            shape = st.radio("Shape", SHAPES, horizontal=True)
+        with c2:
+            unit = st.selectbox("Dimension unit", list(LENGTH_FACTORS))
+        c1, c2, c3 = st.columns(3)
+        length = c1.number_input("Length (Square)", min_value=0.0, step=0.1)
+        breadth = c2.number_input("Breadth (Square)", min_value=0.0, step=0.1)
+        diameter = c3.number_input("Diameter (Round)", min_value=0.0, step=0.1)
+        c1, c2, c3 = st.columns(3)
+        method = c1.selectbox(
+            "Reading positions", ["free"] + list(METHODS),
+            format_func=lambda m: "Free readings" if m == "free" else f"{METHODS[m]} grid",
+        )
+        points = c2.number_input("Grid points per diameter / side", min_value=1, value=6, step=1)
+        vel_unit = c3.selectbox("Velocity unit", list(VELOCITY_FACTORS))
+        readings_text = st.text_area(
+            "Velocity readings (separated by spaces, commas or new lines; grid readings in grid order)"
+        )
+        with st.expander("🌡️ Cooling-tower operating data (optional)"):
+            kpi_inputs = render_kpi_inputs()
+        submitted = st.form_submit_button("🧮 Calculate")
+
+    if not submitted:
+        return None
+    values, errors = validate(shape, length, breadth, diameter, method, int(points), readings_text)
+    if errors:
+        st.error("⚠️ Please fix the following:\n\n" + "\n".join(f"- {e}" for e in errors))
+        return None
+    values.update({
+        "equipment": equipment,
+        "equipment_id": equipment_id.strip() or equipment,
+        "shape": shape,
+        "unit": unit,
+        "vel_unit": vel_unit,
+        "kpi_inputs": kpi_inputs if equipment == "Cooling Tower" else {},
+    })
+    return values
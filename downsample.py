@@ -0,0 +1,83 @@
+"""
+Server-side downsampling for the history charts, so the points sent to the
+browser stay bounded however long the history gets.
+
+    idx = lttb(x, y, 1000)                  # indices of the points to plot
+    small = downsample_frame(df, "day", "mean_flow_m3s", by="equipment_id")
+
+lttb() (Largest-Triangle-Three-Buckets) keeps the points that preserve the
+visual shape of a line; min_max() keeps each bucket's extremes, so spikes
+are never lost. Both always keep the first and last point and return
+indices in order, so any other column of the rows can be plotted alongside.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Points per chart (shared by all the series of the chart)
+MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "2000"))
+
+
+def _numeric(x) -> np.ndarray:
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+def _edges(start: int, stop: int, buckets: int) -> np.ndarray:
+    return np.linspace(start, stop, buckets + 1).astype(np.int64)
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """Indices of the n_out points chosen by Largest-Triangle-Three-Buckets."""
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+    x, y = _numeric(x), np.asarray(y, dtype=np.float64)
+    edges = _edges(1, n - 1, n_out - 2)         # the points between the first and the last
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nx, ny = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            nx, ny = x[-1], y[-1]
+        # Twice the area of the triangle (previous pick, candidate, next bucket's mean)
+        area = np.abs((x[a] - nx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (ny - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def min_max(y, n_out: int) -> np.ndarray:
+    """Indices of the first and last point and of the minimum and maximum of each bucket, in order."""
+    n = len(y)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = _edges(0, n, max((n_out - 2) // 2, 1))
+    picks = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            picks += [lo + int(np.argmin(y[lo:hi])), lo + int(np.argmax(y[lo:hi]))]
+    return np.unique(picks)
+
+def downsample_frame(df: pd.DataFrame, x: str, y: str, max_points: int = MAX_POINTS,
+                     method: str = "lttb", by: Optional[str] = None) -> pd.DataFrame:
+    """
+    Rows of df (sorted by x) reduced to about max_points in total, split
+    evenly over the groups of ``by``. Rows with a missing y are dropped.
+    """
+    df = df.dropna(subset=[y])
+    if by is not None and len(df):
+        budget = max(max_points // df[by].nunique(), 3)
+        parts = [downsample_frame(g, x, y, budget, method) for _, g in df.groupby(by, sort=False)]
+        return pd.concat(parts, ignore_index=True)
+    df = df.sort_values(x, kind="stable")
+    if len(df) <= max_points:
+        return df.reset_index(drop=True)
+    idx = lttb(df[x], df[y], max_points) if method == "lttb" else min_max(df[y], max_points)
+    return df.iloc[idx].reset_index(drop=True)
@@ -1,40 +1,30 @@
 # yearly_landed_rate.py
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-from typing import List, Tuple
+from datetime import datetime
+from paged_editor import paged_data_editor
+import bill_store
+from exports import PREVIEW_ROWS, XLSX_MAX_ROWS, export_files, read_reference_csv, with_keys
+from tariffs import MONTHS, TARIFF_VERSION, constants_table
+from landed_rate import compute_billing_tod
+from result_cache import cached_billing
+from jobs import BACKGROUND_MIN_ROWS, billing_work, job_panel, start_job
+from rerun_timing import start_rerun
+from metrics import start_exporter, timed_calculation
 
 st.set_page_config(page_title="Yearly Landed Unit Rate Calculator2", layout="wide", page_icon="⚡")
+timer = start_rerun("electricity_landed_rate_chatbot")
+start_exporter()
 st.title("⚡ Yearly Landed Unit Rate Calculator2")
 st.markdown("Fill out the **Reference table** to calculate the **Landed Unit rate**. Click checkbox and select appropriate month before calculation")
 
 # -----------------------------
 # Defaults and old slab timings
 # -----------------------------
-DEFAULT_CONSTANTS = {
-    "Parameter": ["DC_rate", "FAC_rate", "ToS_rate", "ED_percent"],
-    "Description": [
-        "Demand charge rate (₹ per kVA)",
-        "Fuel Adjustment Charge (₹ per kVAh)",
-        "Tax on Sale rate (₹ per kWh)",
-        "Electricity Duty (percentage %)"
-    ],
-    "Value": [600.0, 0.5, 0.2894, 7.5],
-}
-
-OLD_SLAB_TIMINGS = {
-    "A": [("22:00", "06:00")],
-    "B": [("06:00", "09:00"), ("12:00", "18:00")],
-    "C": [("09:00", "12:00")],
-    "D": [("18:00", "22:00")],
-}
+DEFAULT_CONSTANTS = constants_table()
 
 DEFAULT_TOD_RATIOS = {"A": 33.541412, "B": 34.476496, "C": 6.837052, "D": 25.14506}
 
-MONTHS = [
-    "January","February","March","April","May","June",
-    "July","August","September","October","November","December"
-]
 
 # -----------------------------
 # Global constants (hidden defaults)
@@ -45,55 +35,6 @@ GLOBAL_FAC_rate = float(const_df.loc[const_df["Parameter"] == "FAC_rate", "Value
 GLOBAL_ToS_rate = float(const_df.loc[const_df["Parameter"] == "ToS_rate", "Value"].values[0])
 GLOBAL_ED_percent = float(const_df.loc[const_df["Parameter"] == "ED_percent", "Value"].values[0])
 
-# -----------------------------
-# Helper functions for overlap
-# -----------------------------
-def parse_time(t: str) -> float:
-    hh, mm = t.split(":")
-    return int(hh) + int(mm) / 60.0
-
-def parse_range_str(r: str) -> Tuple[float, float]:
-    a, b = r.split("-")
-    return parse_time(a.strip()), parse_time(b.strip())
-
-def split_range_if_wrap(start: float, end: float) -> List[Tuple[float, float]]:
-    if start < end:
-        return [(start, end)]
-    else:
-        return [(start, 24.0), (0.0, end)]
-
-def overlap_between_segments(seg1: Tuple[float, float], seg2: Tuple[float, float]) -> float:
-    s1, e1 = seg1; s2, e2 = seg2
-    start = max(s1, s2); end = min(e1, e2)
-    return max(0.0, end - start)
-
-def total_overlap_hours_multi(old_segments: List[Tuple[float, float]], new_segments: List[Tuple[float, float]]) -> float:
-    total_overlap = 0.0
-    for old_seg in old_segments:
-        for new_seg in new_segments:
-            for osub in split_range_if_wrap(*old_seg):
-                for nsub in split_range_if_wrap(*new_seg):
-                    total_overlap += overlap_between_segments(osub, nsub)
-    return total_overlap
-
-def parse_multi_ranges_input(s: str) -> List[Tuple[float,float]]:
-    if not isinstance(s, str) or not s.strip():
-        return []
-    for sep in [",", "|", ";"]:
-        if sep in s:
-            parts = [p.strip() for p in s.split(sep) if p.strip()]
-            break
-    else:
-        parts = [s.strip()]
-    parsed = []
-    for p in parts:
-        try:
-            parsed.append(parse_range_str(p))
-        except Exception:
-            pass
-    return parsed
-
-
 # -----------------------------
 # Energy Rate Settings Section
 # -----------------------------
@@ -103,11 +44,17 @@ with col1:
     energy_rate_1 = st.number_input("Energy Rate (₹/kVAh) for **Jan–Mar**", value=8.68, step=0.01)
 with col2:
     energy_rate_2 = st.number_input("Energy Rate (₹/kVAh) for **Apr–Dec**", value=8.90, step=0.01)
+col3, col4 = st.columns(2)
+with col3:
+    site = st.text_input("Site", value="Main Plant")
+with col4:
+    year = st.number_input("Year", value=datetime.now().year, step=1)
 
 
 # -----------------------------
 # Reference Table
 # -----------------------------
+timer.mark("table build")
 st.markdown("## Reference Table")
 def default_row(month_name):
     # pick which energy rate to use automatically
@@ -143,153 +90,119 @@ hidden_cols = [f"ToD_ratio_{k}" for k in "ABCD"]
 ref_df_display = ref_df.drop(columns=hidden_cols)
 
 # Show editable version (horizontal layout)
-ref_df_display_edited = st.data_editor(
+timer.mark("editor")
+ref_df_display_edited = paged_data_editor(
     ref_df_display,
+    key="tod_ref_table_editor",
+    filter_columns=["Month"],
     num_rows="fixed",
     use_container_width=True,
-    key="ref_table_editor",
 )
 
 # Restore hidden columns (unchanged)
-ref_df_edited = ref_df_display_edited.copy()
-for col in hidden_cols:
-    ref_df_edited[col] = ref_df[col]
+timer.mark("table build")
+ref_df_edited = ref_df_display_edited.join(ref_df[hidden_cols])
+
+# -----------------------------
+# Bulk reference rows (optional)
+# -----------------------------
+bulk_file = st.file_uploader(
+    f"Or upload reference rows as CSV, optionally with Site and Year columns for a portfolio "
+    f"({BACKGROUND_MIN_ROWS:,}+ rows are billed in the background)",
+    type="csv", key="bulk_reference_csv",
+)
+if bulk_file is not None:
+    try:
+        ref_df_edited = read_reference_csv(bulk_file, default_row(MONTHS[0]))
+        sites_note = (f" for {ref_df_edited['Site'].nunique():,} sites, each saved under its own site"
+                      if "Site" in ref_df_edited else f", saved under {site}")
+        st.caption(f"Billing the {len(ref_df_edited):,} uploaded rows{sites_note} instead of the table above.")
+    except ValueError as e:
+        st.error(f"⚠️ Could not read {bulk_file.name}: {e}")
 
 
 # -----------------------------
 # Run calculations
 # -----------------------------
+billing_df = None
 if st.button("Run Calculations for checked months"):
-    billing_rows = []
-
-    for _, row in ref_df_edited.iterrows():
-        if not bool(row["Calc"]):
-            continue
-
-        month_name = row["Month"]
-        max_demand = float(row["MaxDemand_kVA"])
-        units = float(row["Units_kVAh"])
-        energy_rate = float(row["EnergyRate_₹/kVAh"])
-        DC_rate = float(row["DC_rate"])
-        FAC_rate = float(row["FAC_rate"])
-        ToS_rate = float(row["ToS_rate"])
-        ED_percent = float(row["ED_percent"])
-
-        ratios = {k: float(row[f"ToD_ratio_{k}"]) for k in "ABCD"}
-        tod_multipliers = {k: float(row[f"ToD_mul_{k}"]) for k in "ABCD"}
-        new_ranges = {k: parse_multi_ranges_input(row[f"NewRange_{k}"]) for k in "ABCD"}
-
-        # 1️⃣ Base Charges
-        DC = max_demand * DC_rate
-        EC = units * energy_rate
-
-        # 2️⃣ Old ToD Units
-        OldUnits = {k: units * (ratios[k] / 100.0) for k in "ABCD"}
-
-        # 3️⃣ Redistribute based on overlaps
-        NewUnits = {k: 0.0 for k in "ABCD"}
-        for old_k, old_segments in OLD_SLAB_TIMINGS.items():
-            old_dur = sum(
-                (parse_time(e) - parse_time(s)) % 24 for s, e in old_segments
-            )
-            for new_k, new_segs in new_ranges.items():
-                overlap = total_overlap_hours_multi(
-                    [parse_range_str(f"{s}-{e}") for s, e in old_segments], new_segs
-                )
-                NewUnits[new_k] += OldUnits[old_k] * (overlap / old_dur if old_dur > 0 else 0)
-
-        # 4️⃣ ToD Charges
-        ToD_charge = sum(NewUnits[k] * tod_multipliers[k] for k in "ABCD")
-
-        # 5️⃣ Other Charges
-        FAC = units * FAC_rate
-        ED = (ED_percent / 100.0) * (DC + EC + FAC + ToD_charge)
-        ToS = (units * 0.997) * ToS_rate
-
-        kWh = units * 0.997
-       
-        if units > 4044267:
-            ICR = ((kWh -4044267) * (-0.75))
-        else: 
-            ICR = 0
-
-        def BCR_fn(units):
-            if units <= 900000:
-                return -(units * 0.07)
-            elif units <= 5000000:
-                return -(900000 * 0.07 + (units - 900000) * 0.09)
-            else:
-                return -(900000 * 0.07 + 4100000 * 0.09 + (units - 5000000) * 0.11)
-
-        BCR = BCR_fn(units)
-        Total = DC + EC + ToD_charge + FAC + ED + ToS + BCR - ICR
-        PPD = (DC + EC + FAC + ToD_charge) * (-0.01)
-        LandedRate = (Total + PPD) / (units*0.997) 
-
-        billing_rows.append({
-            "Month": month_name,
-            "DC": DC,
-            "EC": EC,
-            "ToD_charge": ToD_charge,
-            "FAC": FAC,
-            "ED": ED,
-            "ToS": ToS,
-            "BCR": BCR,
-            "ICR": ICR,
-            "PromptPaymentDisc": PPD,
-            "Total": Total,
-            "LandedRate": LandedRate
-        })
-
-    if billing_rows:
-        billing_df = pd.DataFrame(billing_rows)
-        billing_df = billing_df.round(2)
-        st.markdown("## Billing Components")
-        st.dataframe(billing_df, use_container_width=True)
-
-        # -----------------------------
-        # Export Buttons
-        # -----------------------------
-        st.markdown("### 📤 Export Results")
-
-        csv_ref = ref_df_edited.to_csv(index=False).encode('utf-8')
-        csv_bill = billing_df.to_csv(index=False).encode('utf-8')
-
-        def to_excel(ref_df, bill_df):
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                ref_df.to_excel(writer, index=False, sheet_name='Reference Table')
-                bill_df.to_excel(writer, index=False, sheet_name='Billing Components')
-            return output.getvalue()
-
-        xlsx_data = to_excel(ref_df_edited, billing_df)
+    timer.mark("calculation")
+    selected = ref_df_edited[ref_df_edited["Calc"].astype(bool)]
 
-        st.download_button(
-            label="⬇️ Download Reference Table (CSV)",
-            data=csv_ref,
-            file_name="reference_table.csv",
-            mime="text/csv"
-        )
-        st.download_button(
-            label="⬇️ Download Billing Components (CSV)",
-            data=csv_bill,
-            file_name="billing_components.csv",
-            mime="text/csv"
-        )
+    if selected.empty:
+        st.info("No months selected. Tick the 'Calc' column before running.")
+    elif len(selected) >= BACKGROUND_MIN_ROWS:
+        # Large tables are billed in a background job and saved once it finishes
+        def save_run(result, selected=selected, site=site, year=year):
+            bill_store.record_runs("electricity_landed_rate_chatbot", site, year, TARIFF_VERSION, selected, result.round(2))
+        def export_run(result, selected=selected):
+            return export_files(selected, result.round(2))
+        start_job("Landed rate billing", billing_work(selected, compute_billing_tod, on_done=save_run, app="electricity_landed_rate_chatbot",
+                                                      exports=export_run), total=len(selected))
+    else:
+        with timed_calculation("electricity_landed_rate_chatbot", len(selected)):
+            billing_df = with_keys(selected, cached_billing(selected, compute_billing_tod).round(2))
+        try:
+            bill_store.record_runs("electricity_landed_rate_chatbot", site, year, TARIFF_VERSION, selected, billing_df)
+        except Exception as e:
+            st.warning(f"⚠️ Could not save results to history: {e}")
+
+timer.mark("render")
+finished_job = job_panel()
+if finished_job is not None:
+    # Built by the worker when the job finished, so reruns only show them
+    billing_df, files = finished_job.result, finished_job.exports
+elif billing_df is not None:
+    timer.mark("export")
+    files = export_files(ref_df_edited, billing_df)
+    timer.mark("render")
+
+if billing_df is not None:
+    st.markdown("## Billing Components")
+    st.dataframe(billing_df.head(PREVIEW_ROWS).round(2), use_container_width=True)
+    if len(billing_df) > PREVIEW_ROWS:
+        st.caption(f"Showing the first {PREVIEW_ROWS:,} of {len(billing_df):,} rows; the downloads hold them all.")
+
+    # -----------------------------
+    # Export Buttons
+    # -----------------------------
+    st.markdown("### 📤 Export Results")
+
+    st.download_button(
+        label="⬇️ Download Reference Table (CSV)",
+        data=files["reference_csv"],
+        file_name="reference_table.csv",
+        mime="text/csv"
+    )
+    st.download_button(
+        label="⬇️ Download Billing Components (CSV)",
+        data=files["billing_csv"],
+        file_name="billing_components.csv",
+        mime="text/csv"
+    )
+    if "xlsx" in files:
         st.download_button(
             label="⬇️ Download All (Excel)",
-            data=xlsx_data,
+            data=files["xlsx"],
             file_name="Electricity_LandedRate_Report.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
-
     else:
-        st.info("No months selected. Tick the 'Calc' column before running.")
+        st.caption(f"The Excel report is only built up to {XLSX_MAX_ROWS:,} rows; use the CSV downloads.")
+
+# -----------------------------
+# History
+# -----------------------------
+timer.mark("history")
+with st.expander("📚 History (stored runs)"):
+    bill_store.render_history(default_site=site)
 
 # Footer
 st.markdown("---")
 st.caption("Export buttons support CSV & Excel formats.")
 
+timer.finish()
+
 
 
 
@@ -0,0 +1,90 @@
+"""
+CSV / Excel downloads for the landed-rate calculators, and the bulk CSV
+upload of reference rows.
+"""
+import time
+from io import BytesIO
+from typing import Dict
+
+import pandas as pd
+
+from metrics import EXPORT_SECONDS
+from tariffs import MONTHS
+
+# Optional columns of an upload that say which site and year a row bills
+KEY_COLUMNS = ["Site", "Year"]
+
+# Rows shown in the on-page table; the downloads always hold every row
+PREVIEW_ROWS = 1_000
+
+# Larger results are offered as CSV only: the workbook gets slow to write
+# long before Excel's limit of 1,048,576 rows per sheet
+XLSX_MAX_ROWS = 100_000
+
+
+def to_csv(df: pd.DataFrame) -> bytes:
+    start = time.perf_counter()
+    data = df.to_csv(index=False).encode("utf-8")
+    EXPORT_SECONDS.labels("csv").observe(time.perf_counter() - start)
+    return data
+
+def to_excel(ref_df: pd.DataFrame, bill_df: pd.DataFrame) -> bytes:
+    """Workbook with the reference table and the billing components on separate sheets."""
+    start = time.perf_counter()
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
+        ref_df.to_excel(writer, index=False, sheet_name="Reference Table")
+        bill_df.to_excel(writer, index=False, sheet_name="Billing Components")
+    EXPORT_SECONDS.labels("xlsx").observe(time.perf_counter() - start)
+    return buffer.getvalue()
+
+def export_files(ref_df: pd.DataFrame, bill_df: pd.DataFrame) -> Dict[str, bytes]:
+    """
+    Download contents, built once per result: "reference_csv", "billing_csv"
+    and, up to XLSX_MAX_ROWS rows, the "xlsx" workbook.
+    """
+    files = {"reference_csv": to_csv(ref_df), "billing_csv": to_csv(bill_df)}
+    if max(len(ref_df), len(bill_df)) <= XLSX_MAX_ROWS:
+        files["xlsx"] = to_excel(ref_df, bill_df)
+    return files
+
+def with_keys(ref_df: pd.DataFrame, bill_df: pd.DataFrame) -> pd.DataFrame:
+    """bill_df with the Site / Year columns of ref_df (matched by position) in front."""
+    keys = [c for c in KEY_COLUMNS if c in ref_df.columns and c not in bill_df.columns]
+    if not keys:
+        return bill_df
+    return pd.concat([ref_df[keys].reset_index(drop=True), bill_df.reset_index(drop=True)], axis=1)
+
+def read_reference_csv(data, defaults: dict) -> pd.DataFrame:
+    """
+    Reference rows uploaded as CSV, with the Site / Year columns (when given)
+    and the columns of ``defaults``. Missing columns take the default value,
+    except "Calc": uploaded rows are ticked. Raises ValueError on an
+    unreadable file, an unknown month or a missing or non-numeric value.
+    """
+    df = pd.read_csv(data)
+    if df.empty:
+        raise ValueError("the file has no rows")
+    if "Month" not in df.columns:
+        raise ValueError("the file needs a 'Month' column")
+    unknown = sorted(set(df["Month"].astype(str)) - set(MONTHS))
+    if unknown:
+        raise ValueError(f"unknown month(s): {', '.join(unknown[:5])}")
+    if "Site" in df.columns:
+        if df["Site"].isna().any():
+            raise ValueError("column 'Site' has missing values")
+        df["Site"] = df["Site"].astype(str)
+    if "Year" in df.columns:
+        years = pd.to_numeric(df["Year"], errors="coerce")
+        if years.isna().any() or (years % 1 != 0).any():
+            raise ValueError("column 'Year' has missing or non-integer values")
+        df["Year"] = years.astype(int)
+    for col, value in defaults.items():
+        if col not in df.columns:
+            df[col] = True if col == "Calc" else value
+        elif isinstance(value, float):
+            numeric = pd.to_numeric(df[col], errors="coerce")
+            if numeric.isna().any():
+                raise ValueError(f"column '{col}' has missing or non-numeric values")
+            df[col] = numeric
+    return df[[c for c in KEY_COLUMNS if c in df.columns] + list(defaults)]
@@ -0,0 +1,44 @@
+import os
+import time
+from contextlib import contextmanager
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _try_lock(fh) -> None:
+    if os.name == "nt":
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+def _unlock(fh) -> None:
+    if os.name == "nt":
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def exclusive_lock(path: str, timeout: float = 30.0, poll: float = 0.05):
+    """Hold an exclusive, cross-process lock on ``path + '.lock'``."""
+    fh = open(path + ".lock", "a+")
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                _try_lock(fh)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not lock {path} within {timeout:.0f} s")
+                time.sleep(poll)
+        try:
+            yield
+        finally:
+            _unlock(fh)
+    finally:
+        fh.close()
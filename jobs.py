@@ -0,0 +1,206 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+import streamlit as st
+
+from exports import with_keys
+from metrics import observe_calculation
+from parallel_billing import BillingFn, DEFAULT_WORKERS, PARALLEL_MIN_ROWS, chunk_bounds, parallel_billing
+
+# Tables at least this large are billed in the background
+BACKGROUND_MIN_ROWS = 20_000
+
+# Finished jobs are kept this long so a refreshed browser can still fetch them
+KEEP_SECONDS = 3600
+
+QUERY_PARAM = "job"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """A unit of background work with chunk-based progress and cooperative cancellation."""
+
+    def __init__(self, label: str, total: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.total = max(int(total), 1)
+        self.done = 0
+        self.status = "queued"      # queued -> running -> done | failed | cancelled
+        self.result = None
+        self.exports: Dict[str, bytes] = {}       # download contents, built by the worker
+        self.error: Optional[str] = None
+        self.save_error: Optional[str] = None     # the result was computed but could not be stored
+        self.created = time.time()
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def progress(self) -> float:
+        return min(self.done / self.total, 1.0)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def advance(self, n: int) -> None:
+        """Record n finished units; raises JobCancelled once cancellation was requested."""
+        self.done += n
+        if self.cancel_requested:
+            raise JobCancelled()
+
+
+class JobManager:
+    def __init__(self, max_workers: int = 2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, label: str, work: Callable[[Job], object], total: int) -> Job:
+        job = Job(label, total)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def _run(self, job: Job, work: Callable[[Job], object]) -> None:
+        if job.cancel_requested:
+            self._finish(job, "cancelled")
+            return
+        job.status = "running"
+        try:
+            job.result = work(job)
+            self._finish(job, "done")
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, "failed")
+
+    def _finish(self, job: Job, status: str) -> None:
+        # finished_at is set before the status is published, so a finished job always has it
+        with self._lock:
+            job.finished_at = time.time()
+            job.status = status
+
+    def _prune(self) -> None:
+        cutoff = time.time() - KEEP_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+def get_manager() -> JobManager:
+    """Process-wide job manager shared by every session."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+
+# -----------------------------
+# Billing jobs
+# -----------------------------
+def billing_work(df: pd.DataFrame, fn: BillingFn, workers: Optional[int] = None,
+                 chunk_rows: int = 20_000, on_done: Optional[Callable[[pd.DataFrame], None]] = None,
+                 app: str = "", exports: Optional[Callable[[pd.DataFrame], Dict[str, bytes]]] = None):
+    """
+    Job body that bills df chunk by chunk, reporting progress per chunk. The
+    result carries df's Site / Year columns; ``exports`` builds the download
+    contents in the worker, so reruns of the page only show them.
+    """
+    workers = workers or DEFAULT_WORKERS
+
+    def work(job: Job) -> pd.DataFrame:
+        t0 = time.perf_counter()
+        if workers > 1 and len(df) >= PARALLEL_MIN_ROWS:
+            result = parallel_billing(df, fn, workers=workers, on_chunk=job.advance)
+        else:
+            parts = []
+            for start, stop in chunk_bounds(len(df), -(-len(df) // chunk_rows)):
+                parts.append(fn(df.iloc[start:stop]))
+                job.advance(stop - start)
+            result = pd.concat(parts, ignore_index=True)
+        observe_calculation(app or fn.__name__, len(df), time.perf_counter() - t0)
+        result = with_keys(df, result)
+        if exports:
+            job.exports = exports(result)
+        if on_done:
+            try:
+                on_done(result)
+            except Exception as e:
+                job.save_error = str(e)
+        return result
+
+    return work
+
+
+# -----------------------------
+# Streamlit helpers
+# -----------------------------
+def start_job(label: str, work: Callable[[Job], object], total: int) -> Job:
+    """Submit a job and pin its id in the URL so it survives a browser refresh."""
+    job = get_manager().submit(label, work, total)
+    st.query_params[QUERY_PARAM] = job.id
+    return job
+
+def clear_job() -> None:
+    if QUERY_PARAM in st.query_params:
+        del st.query_params[QUERY_PARAM]
+
+@st.fragment(run_every=1.0)
+def _progress_panel(job_id: str) -> None:
+    job = get_manager().get(job_id)
+    if job is None:
+        return
+    if job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"⏳ {job.label}: {job.done:,} / {job.total:,} rows")
+    if st.button("✖️ Cancel", key=f"cancel_{job_id}"):
+        job.cancel()
+
+def job_panel() -> Optional[Job]:
+    """
+    Show the job referenced in the URL. Returns the job once it has finished
+    successfully; while it is running only a self-refreshing progress panel
+    reruns, so the rest of the page stays responsive.
+    """
+    job = get_manager().get(st.query_params.get(QUERY_PARAM))
+    if job is None:
+        return None
+    if not job.finished:
+        _progress_panel(job.id)
+        return None
+    if job.status == "done":
+        st.success(f"✅ {job.label} finished in {job.finished_at - job.created:.1f} s")
+        if job.save_error:
+            st.warning(f"⚠️ Could not save results to history: {job.save_error}")
+    elif job.status == "cancelled":
+        st.warning(f"⚠️ {job.label} was cancelled.")
+    else:
+        st.error(f"⚠️ {job.label} failed: {job.error}")
+    if st.button("Dismiss", key=f"dismiss_{job.id}"):
+        clear_job()
+        st.rerun()
+    return job if job.status == "done" else None
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from typing import List, Tuple
+
+from metrics import register_cache
+from units import kvah_to_kwh
+
+SLABS = "ABCD"
+
+# Old slab timings used to redistribute ToD units onto new slab ranges
+OLD_SLAB_TIMINGS = {
+    "A": [("22:00", "06:00")],
+    "B": [("06:00", "09:00"), ("12:00", "18:00")],
+    "C": [("09:00", "12:00")],
+    "D": [("18:00", "22:00")],
+}
+
+# -----------------------------
+# Helper functions for overlap
+# -----------------------------
+def parse_time(t: str) -> float:
+    hh, mm = t.split(":")
+    return int(hh) + int(mm) / 60.0
+
+def parse_range_str(r: str) -> Tuple[float, float]:
+    a, b = r.split("-")
+    return parse_time(a.strip()), parse_time(b.strip())
+
+def split_range_if_wrap(start: float, end: float) -> List[Tuple[float, float]]:
+    if start < end:
+        return [(start, end)]
+    else:
+        return [(start, 24.0), (0.0, end)]
+
+def overlap_between_segments(seg1: Tuple[float, float], seg2: Tuple[float, float]) -> float:
+    s1, e1 = seg1; s2, e2 = seg2
+    start = max(s1, s2); end = min(e1, e2)
+    return max(0.0, end - start)
+
+def total_overlap_hours_multi(old_segments: List[Tuple[float, float]], new_segments: List[Tuple[float, float]]) -> float:
+    total_overlap = 0.0
+    for old_seg in old_segments:
+        for new_seg in new_segments:
+            for osub in split_range_if_wrap(*old_seg):
+                for nsub in split_range_if_wrap(*new_seg):
+                    total_overlap += overlap_between_segments(osub, nsub)
+    return total_overlap
+
+def parse_multi_ranges_input(s: str) -> List[Tuple[float,float]]:
+    if not isinstance(s, str) or not s.strip():
+        return []
+    for sep in [",", "|", ";"]:
+        if sep in s:
+            parts = [p.strip() for p in s.split(sep) if p.strip()]
+            break
+    else:
+        parts = [s.strip()]
+    parsed = []
+    for p in parts:
+        try:
+            parsed.append(parse_range_str(p))
+        except Exception:
+            pass
+    return parsed
+
+@lru_cache(maxsize=1024)
+def redistribution_matrix(new_ranges: Tuple[str, str, str, str]) -> np.ndarray:
+    """
+    4x4 matrix M where M[old, new] is the share of an old slab's units that
+    falls into a new slab, given the new slab range strings for A-D.
+    """
+    matrix = np.zeros((4, 4))
+    parsed_new = [parse_multi_ranges_input(r) for r in new_ranges]
+    for i, old_k in enumerate(SLABS):
+        old_segments = OLD_SLAB_TIMINGS[old_k]
+        old_dur = sum((parse_time(e) - parse_time(s)) % 24 for s, e in old_segments)
+        old_parsed = [parse_range_str(f"{s}-{e}") for s, e in old_segments]
+        for j, new_segs in enumerate(parsed_new):
+            overlap = total_overlap_hours_multi(old_parsed, new_segs)
+            matrix[i, j] = overlap / old_dur if old_dur > 0 else 0
+    return matrix
+
+register_cache("redistribution_matrix", redistribution_matrix)
+
+
+# -----------------------------
+# Batched billing
+# -----------------------------
+def _col(df: pd.DataFrame, name: str) -> np.ndarray:
+    return df[name].to_numpy(dtype=float)
+
+def bcr_pf(units: np.ndarray) -> np.ndarray:
+    """Bulk Consumption Rebate as used by the PF-based yearly calculator."""
+    return np.where(
+        units <= 900000, -(units * 0.07),
+        np.where(
+            units <= 5000000, -(900000 * 0.07 + (units - 1000000) * 0.09),
+            -(900000 * 0.07 + 4000000 * 0.09 + (units - 5000000) * 0.11),
+        ),
+    )
+
+def bcr_tod(units: np.ndarray) -> np.ndarray:
+    """Bulk Consumption Rebate as used by the ToD-redistribution calculator."""
+    return np.where(
+        units <= 900000, -(units * 0.07),
+        np.where(
+            units <= 5000000, -(900000 * 0.07 + (units - 900000) * 0.09),
+            -(900000 * 0.07 + 4100000 * 0.09 + (units - 5000000) * 0.11),
+        ),
+    )
+
+def compute_billing(ref_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Billing components for every row of a PF-based reference table
+    (columns as in Landed_rateChatbot.py), computed column-wise.
+    """
+    PF = _col(ref_df, "PF")
+    max_demand = _col(ref_df, "MaxDemand_kVA")
+    kvah = _col(ref_df, "kvah")
+    kwh = kvah_to_kwh(kvah, PF)
+
+    DC = max_demand * _col(ref_df, "DC_rate")
+    EC = kvah * _col(ref_df, "EnergyRate_₹/kVAh")
+    FAC = kvah * _col(ref_df, "FAC_rate")
+
+    ToD_charge = np.zeros(len(ref_df))
+    for k in SLABS:
+        ToD_charge = ToD_charge + (kvah * (_col(ref_df, f"ToD_ratio_{k}") / 100)) * _col(ref_df, f"ToD_mul_{k}")
+
+    ED = (_col(ref_df, "ED_percent") / 100.0) * (DC + EC + FAC + ToD_charge)
+    ToS = kwh * _col(ref_df, "ToS_rate")
+    ICR = np.where(kvah > 4405453, (kvah - 4405453) * (-0.75), 0.0)
+    BCR = bcr_pf(kwh)
+    PPD = (DC + EC + FAC + ToD_charge) * (-0.01)
+    Total = DC + EC + ToD_charge + FAC + ED + ToS + BCR + ICR + PPD
+    LandedRate = Total / kwh
+
+    return pd.DataFrame({
+        "Month": ref_df["Month"].to_numpy(),
+        "kwh(kWh)": kwh,
+        "DC": DC,
+        "EC": EC,
+        "ToD_charge": ToD_charge,
+        "FAC": FAC,
+        "ED": ED,
+        "ToS": ToS,
+        "BCR": BCR,
+        "ICR": ICR,
+        "PPD": PPD,
+        "Total": Total,
+        "LandedRate": LandedRate,
+    })
+
+def new_slab_units(ref_df: pd.DataFrame) -> np.ndarray:
+    """(n, 4) units per new ToD slab, redistributed from the old slab ratios by time overlap."""
+    units = _col(ref_df, "Units_kVAh")
+    old_units = np.column_stack([units * (_col(ref_df, f"ToD_ratio_{k}") / 100.0) for k in SLABS])
+    range_cols = [f"NewRange_{k}" for k in SLABS]
+    codes, uniques = pd.MultiIndex.from_frame(ref_df[range_cols].astype(str)).factorize()
+    new_units = np.zeros((len(ref_df), 4))
+    for code, ranges in enumerate(uniques):
+        rows = codes == code
+        matrix = redistribution_matrix(tuple(ranges))
+        for i in range(4):
+            new_units[rows] += old_units[rows, i:i + 1] * matrix[i]
+    return new_units
+
+def compute_billing_tod(ref_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Billing components for every row of a ToD-redistribution reference table
+    (columns as in electricity_landed_rate_chatbot.py), computed column-wise.
+    """
+    max_demand = _col(ref_df, "MaxDemand_kVA")
+    units = _col(ref_df, "Units_kVAh")
+
+    DC = max_demand * _col(ref_df, "DC_rate")
+    EC = units * _col(ref_df, "EnergyRate_₹/kVAh")
+
+    NewUnits = new_slab_units(ref_df)
+    ToD_charge = np.zeros(len(ref_df))
+    for i, k in enumerate(SLABS):
+        ToD_charge = ToD_charge + NewUnits[:, i] * _col(ref_df, f"ToD_mul_{k}")
+
+    FAC = units * _col(ref_df, "FAC_rate")
+    ED = (_col(ref_df, "ED_percent") / 100.0) * (DC + EC + FAC + ToD_charge)
+    kWh = kvah_to_kwh(units)
+    ToS = kWh * _col(ref_df, "ToS_rate")
+    ICR = np.where(units > 4044267, (kWh - 4044267) * (-0.75), 0.0)
+    BCR = bcr_tod(units)
+    Total = DC + EC + ToD_charge + FAC + ED + ToS + BCR - ICR
+    PPD = (DC + EC + FAC + ToD_charge) * (-0.01)
+    LandedRate = (Total + PPD) / kWh
+
+    return pd.DataFrame({
+        "Month": ref_df["Month"].to_numpy(),
+        "DC": DC,
+        "EC": EC,
+        "ToD_charge": ToD_charge,
+        "FAC": FAC,
+        "ED": ED,
+        "ToS": ToS,
+        "BCR": BCR,
+        "ICR": ICR,
+        "PromptPaymentDisc": PPD,
+        "Total": Total,
+        "LandedRate": LandedRate,
+    })
@@ -0,0 +1,210 @@
+"""
+Streaming import of vane-anemometer logger files.
+
+Logger exports are read in fixed-size chunks; each chunk is folded into
+running statistics (Welford/Chan mean and variance, P² percentiles) and then
+dropped, so memory use does not grow with the length of the log. Readings
+further than ``SPIKE_Z`` standard deviations from the running mean are
+rejected as spikes.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from traverse_grid import align_readings
+
+CHUNK_ROWS = 10_000
+SPIKE_Z = 4.0
+WARMUP_SAMPLES = 30
+PERCENTILES = (0.05, 0.5, 0.95)
+
+POINT_COLUMN = re.compile(r"^(point|position|pos|station|traverse[_ ]?point)$", re.IGNORECASE)
+VELOCITY_COLUMN = re.compile(r"vel|speed|air", re.IGNORECASE)
+
+
+class P2Quantile:
+    """Jain & Chlamtac P² estimator: one quantile in O(1) memory."""
+
+    def __init__(self, p: float):
+        self.p = p
+        self.q: List[float] = []
+        self.n = [0, 1, 2, 3, 4]
+        self.np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.dn = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float) -> None:
+        q = self.q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        n = self.n
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+        for i in (1, 2, 3):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < qp < q[i + 1]:
+                    j = i + d
+                    qp = q[i] + d * (q[j] - q[i]) / (n[j] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self) -> float:
+        if not self.q:
+            return float("nan")
+        if len(self.q) < 5:
+            return float(np.quantile(self.q, self.p))
+        return self.q[2]
+
+
+class RunningStats:
+    """Count, mean, variance, min, max and percentiles of a stream, with spike rejection."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.rejected = 0
+        self.quantiles = [P2Quantile(p) for p in PERCENTILES]
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else 0.0
+
+    def _accept_mask(self, x: np.ndarray) -> np.ndarray:
+        ok = np.isfinite(x) & (x >= 0)
+        if self.count >= WARMUP_SAMPLES and self.std > 0:
+            centre, spread = self.mean, self.std
+        else:
+            # Not enough history yet: judge the chunk against its own median/MAD
+            valid = x[ok]
+            if valid.size < 3:
+                return ok
+            centre = float(np.median(valid))
+            spread = 1.4826 * float(np.median(np.abs(valid - centre)))
+            if spread == 0:
+                return ok
+        return ok & (np.abs(x - centre) <= SPIKE_Z * spread)
+
+    def update(self, x: np.ndarray) -> None:
+        x = np.asarray(x, dtype=float)
+        mask = self._accept_mask(x)
+        self.rejected += int(x.size - mask.sum())
+        x = x[mask]
+        if not x.size:
+            return
+        # Chan et al. merge of the chunk's moments into the running ones
+        n_b = x.size
+        mean_b = float(x.mean())
+        m2_b = float(((x - mean_b) ** 2).sum())
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        for est in self.quantiles:
+            for v in x:
+                est.add(float(v))
+
+    def summary(self) -> dict:
+        out = {
+            "samples": self.count,
+            "rejected": self.rejected,
+            "mean": self.mean if self.count else float("nan"),
+            "std": self.std,
+            "min": self.min if self.count else float("nan"),
+            "max": self.max if self.count else float("nan"),
+        }
+        for p, est in zip(PERCENTILES, self.quantiles):
+            out[f"p{int(p * 100):02d}"] = est.value()
+        return out
+
+
+def _pick_columns(columns: List[str], sample: pd.DataFrame):
+    point_col = next((c for c in columns if POINT_COLUMN.match(str(c).strip())), None)
+    vel_col = next((c for c in columns if c != point_col and VELOCITY_COLUMN.search(str(c))), None)
+    if vel_col is None:
+        numeric = [c for c in columns if c != point_col and pd.to_numeric(sample[c], errors="coerce").notna().any()]
+        if not numeric:
+            raise ValueError("No numeric velocity column found in logger file")
+        vel_col = numeric[-1]
+    return point_col, vel_col
+
+def summarize_logger(source, chunk_rows: int = CHUNK_ROWS, sep: Optional[str] = None) -> pd.DataFrame:
+    """
+    Stream a logger export (path or file object) and return one row of
+    statistics per traverse point. Files without a point/position column are
+    treated as a single point.
+    """
+    stats: Dict[object, RunningStats] = {}
+    point_col = vel_col = None
+    reader = pd.read_csv(source, chunksize=chunk_rows, sep=sep, engine="python" if sep is None else "c")
+    for chunk in reader:
+        if vel_col is None:
+            point_col, vel_col = _pick_columns(list(chunk.columns), chunk)
+        values = pd.to_numeric(chunk[vel_col], errors="coerce").to_numpy(dtype=float)
+        if point_col is None:
+            stats.setdefault(1, RunningStats()).update(values)
+            continue
+        points = chunk[point_col].to_numpy()
+        for point in pd.unique(points):
+            stats.setdefault(point, RunningStats()).update(values[points == point])
+
+    rows = [{"point": point, **s.summary()} for point, s in stats.items()]
+    return pd.DataFrame(rows)
+
+
+def render_logger_import(vel_unit: str, grid: Optional[Tuple[str, str, int]] = None) -> Optional[List[float]]:
+    """
+    Streamlit uploader; returns the per-point mean velocities once the user
+    accepts them. With a (shape, method, points) traverse grid the averages
+    are returned in grid order, NaN where the log has no reading.
+    """
+    import streamlit as st
+
+    upload = st.file_uploader(
+        f"Anemometer logger file (CSV/TXT, readings in {vel_unit})", type=["csv", "txt"], key="logger_file"
+    )
+    if upload is None:
+        return None
+    try:
+        summary = summarize_logger(upload)
+    except Exception as e:
+        st.error(f"⚠️ Could not read logger file: {e}")
+        return None
+    st.dataframe(summary.round(3), use_container_width=True, hide_index=True)
+    if summary["samples"].eq(0).any():
+        st.warning("⚠️ Some points have no valid readings and will be skipped.")
+    if st.button("📥 Use point averages as readings"):
+        valid = summary[summary["samples"] > 0]
+        if grid is None:
+            return valid["mean"].astype(float).tolist()
+        try:
+            return align_readings(valid["point"], valid["mean"].astype(float), *grid).tolist()
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+    return None
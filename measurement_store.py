@@ -0,0 +1,481 @@
+"""
+Append-only log of air-flow measurements.
+
+Saving a result is a single INSERT, independent of how many results are
+already stored. The shared Excel workbook is produced from the log on
+demand (compaction):
+
+    python measurement_store.py export [workbook.xlsx]
+"""
+import os
+import sqlite3
+import threading
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from file_lock import exclusive_lock
+from metrics import EXCEL_SAVE_FAILURES, EXCEL_SAVE_SECONDS
+from tower_kpi import KPI_INPUTS, KPI_OUTPUTS
+
+DB_PATH = os.environ.get(
+    "MEASUREMENT_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "measurements.db"),
+)
+
+# === OneDrive Excel File Path ===
+EXCEL_PATH = os.environ.get(
+    "SMART_CHILLER_EXCEL",
+    r"C:\Users\tsvaevq\OneDrive - Volkswagen AG\SmartChillerChatbotExcel.xlsx",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at      TEXT NOT NULL,
+    equipment        TEXT,
+    shape            TEXT,
+    area_m2          REAL,
+    avg_velocity_ms  REAL,
+    flow_m3s         REAL,
+    flow_m3min       REAL,
+    flow_m3hr        REAL,
+    calc_key         TEXT,
+    equipment_id     TEXT
+);
+"""
+
+# Cooling-tower operating data and KPIs, stored on the flow record (NULL when not given)
+KPI_COLUMNS = list(KPI_INPUTS) + list(KPI_OUTPUTS)
+
+# Columns added after the first release of the log, with their SQL types
+ADDED_COLUMNS = {"calc_key": "TEXT", "equipment_id": "TEXT", **{c: "REAL" for c in KPI_COLUMNS}}
+
+# How a reading is attributed to an equipment (matches the index below and the triggers)
+EQUIPMENT_KEY = "COALESCE(equipment_id, equipment)"
+
+# Per-equipment daily aggregates, maintained by a trigger on every insert
+SUMMARY_SCHEMA = """
+-- Rows logged before equipment ids existed are keyed by their equipment name, as in the triggers
+DROP INDEX IF EXISTS idx_measurements_equipment_time;
+CREATE INDEX IF NOT EXISTS idx_measurements_equipment_key_time
+    ON measurements(COALESCE(equipment_id, equipment), recorded_at);
+CREATE INDEX IF NOT EXISTS idx_measurements_time ON measurements(recorded_at);
+CREATE TABLE IF NOT EXISTS daily_summary (
+    equipment_id     TEXT NOT NULL,
+    day              TEXT NOT NULL,
+    equipment        TEXT,
+    n                INTEGER NOT NULL,
+    sum_flow         REAL NOT NULL,
+    sum_flow_sq      REAL NOT NULL,
+    min_flow         REAL,
+    max_flow         REAL,
+    sum_velocity     REAL NOT NULL,
+    PRIMARY KEY (equipment_id, day)
+);
+CREATE TRIGGER IF NOT EXISTS trg_measurements_summary AFTER INSERT ON measurements
+BEGIN
+    INSERT INTO daily_summary
+        (equipment_id, day, equipment, n, sum_flow, sum_flow_sq, min_flow, max_flow, sum_velocity)
+    VALUES (
+        COALESCE(NEW.equipment_id, NEW.equipment), substr(NEW.recorded_at, 1, 10), NEW.equipment, 1,
+        COALESCE(NEW.flow_m3s, 0), COALESCE(NEW.flow_m3s, 0) * COALESCE(NEW.flow_m3s, 0),
+        NEW.flow_m3s, NEW.flow_m3s, COALESCE(NEW.avg_velocity_ms, 0)
+    )
+    ON CONFLICT (equipment_id, day) DO UPDATE SET
+        equipment    = excluded.equipment,
+        n            = n + 1,
+        sum_flow     = sum_flow + excluded.sum_flow,
+        sum_flow_sq  = sum_flow_sq + excluded.sum_flow_sq,
+        min_flow     = MIN(min_flow, excluded.min_flow),
+        max_flow     = MAX(max_flow, excluded.max_flow),
+        sum_velocity = sum_velocity + excluded.sum_velocity;
+END;
+"""
+
+# Rolling per-equipment flow baseline (exponentially weighted mean/variance) and the
+# readings that deviated from it. Both are updated by a trigger in O(1) per insert:
+# the new reading is compared with the baseline *before* it is folded in. Flagged
+# readings move the mean but not the variance, so a sustained drift keeps alerting
+# until the baseline has caught up with it.
+EWMA_ALPHA = 0.1
+ANOMALY_Z = 3.0
+WARMUP_SAMPLES = 5
+MIN_REL_STD = 0.02      # floor on the baseline spread, as a fraction of the mean
+
+BASELINE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS flow_baseline (
+    equipment_id     TEXT PRIMARY KEY,
+    n                INTEGER NOT NULL,
+    mean_flow        REAL NOT NULL,
+    var_flow         REAL NOT NULL,
+    last_recorded_at TEXT
+);
+CREATE TABLE IF NOT EXISTS flow_anomalies (
+    measurement_id   INTEGER PRIMARY KEY,
+    calc_key         TEXT,
+    equipment_id     TEXT NOT NULL,
+    recorded_at      TEXT NOT NULL,
+    flow_m3s         REAL NOT NULL,
+    baseline_mean    REAL NOT NULL,
+    baseline_var     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_anomalies_equipment_time ON flow_anomalies(equipment_id, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_anomalies_key ON flow_anomalies(calc_key);
+CREATE TRIGGER IF NOT EXISTS trg_measurements_baseline AFTER INSERT ON measurements
+WHEN NEW.flow_m3s IS NOT NULL
+BEGIN
+    INSERT INTO flow_anomalies
+        (measurement_id, calc_key, equipment_id, recorded_at, flow_m3s, baseline_mean, baseline_var)
+    SELECT NEW.id, NEW.calc_key, b.equipment_id, NEW.recorded_at, NEW.flow_m3s, b.mean_flow,
+           MAX(b.var_flow, ({MIN_REL_STD} * b.mean_flow) * ({MIN_REL_STD} * b.mean_flow))
+    FROM flow_baseline b
+    WHERE b.equipment_id = COALESCE(NEW.equipment_id, NEW.equipment)
+      AND b.n >= {WARMUP_SAMPLES}
+      AND (NEW.flow_m3s - b.mean_flow) * (NEW.flow_m3s - b.mean_flow)
+          > {ANOMALY_Z * ANOMALY_Z} * MAX(b.var_flow, ({MIN_REL_STD} * b.mean_flow) * ({MIN_REL_STD} * b.mean_flow));
+
+    INSERT INTO flow_baseline (equipment_id, n, mean_flow, var_flow, last_recorded_at)
+    VALUES (COALESCE(NEW.equipment_id, NEW.equipment), 1, NEW.flow_m3s, 0, NEW.recorded_at)
+    ON CONFLICT (equipment_id) DO UPDATE SET
+        n                = n + 1,
+        var_flow         = CASE WHEN EXISTS (SELECT 1 FROM flow_anomalies WHERE measurement_id = NEW.id) THEN var_flow
+                           ELSE {1 - EWMA_ALPHA} * (var_flow + {EWMA_ALPHA} * (excluded.mean_flow - mean_flow) * (excluded.mean_flow - mean_flow)) END,
+        mean_flow        = mean_flow + {EWMA_ALPHA} * (excluded.mean_flow - mean_flow),
+        last_recorded_at = excluded.last_recorded_at;
+END;
+"""
+
+COLUMNS = ["equipment_id", "equipment", "shape", "area_m2", "avg_velocity_ms", "flow_m3s", "flow_m3min", "flow_m3hr"] + KPI_COLUMNS
+
+# Workbook headers, as written by the original Excel save
+EXCEL_HEADERS = {
+    "recorded_at": "Recorded At",
+    "equipment_id": "Equipment ID",
+    "equipment": "Equipment",
+    "shape": "Shape",
+    "area_m2": "Surface Area (m²)",
+    "avg_velocity_ms": "Average Velocity (m/s)",
+    "flow_m3s": "Flow (m³/s)",
+    "flow_m3min": "Flow (m³/min)",
+    "flow_m3hr": "Flow (m³/hr)",
+    **KPI_INPUTS,
+    **KPI_OUTPUTS,
+}
+
+
+# === Connection ===
+# Databases whose schema/migrations this process has already run (shared by all pages/sessions)
+_ready = set()
+_ready_lock = threading.Lock()
+
+def connect(path: str = DB_PATH) -> sqlite3.Connection:
+    # Checked before connecting, which would create an empty file for a deleted database
+    ready = path in _ready and os.path.exists(path)
+    conn = sqlite3.connect(path, timeout=30)
+    if ready:
+        return conn
+    with _ready_lock:
+        _prepare(conn)
+        _ready.add(path)
+    return conn
+
+def _prepare(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(measurements)")}
+    for col, sql_type in ADDED_COLUMNS.items():
+        if col not in existing:
+            conn.execute(f"ALTER TABLE measurements ADD COLUMN {col} {sql_type}")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_measurements_key ON measurements(calc_key)")
+    has_summary = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_summary'"
+    ).fetchone()
+    has_baseline = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flow_baseline'"
+    ).fetchone()
+    conn.executescript(SUMMARY_SCHEMA)
+    conn.executescript(BASELINE_SCHEMA)
+    if not has_summary:
+        rebuild_summary(conn)
+    if not has_baseline:
+        rebuild_baselines(conn)
+
+def rebuild_summary(conn: sqlite3.Connection) -> None:
+    """Recompute daily_summary from the full log (only needed for logs created before it existed)."""
+    with conn:
+        conn.execute("DELETE FROM daily_summary")
+        conn.execute("""
+            INSERT INTO daily_summary
+                (equipment_id, day, equipment, n, sum_flow, sum_flow_sq, min_flow, max_flow, sum_velocity)
+            SELECT COALESCE(equipment_id, equipment), substr(recorded_at, 1, 10), MAX(equipment), COUNT(*),
+                   TOTAL(flow_m3s), TOTAL(flow_m3s * flow_m3s), MIN(flow_m3s), MAX(flow_m3s), TOTAL(avg_velocity_ms)
+            FROM measurements
+            GROUP BY COALESCE(equipment_id, equipment), substr(recorded_at, 1, 10)
+        """)
+
+def rebuild_baselines(conn: sqlite3.Connection) -> None:
+    """
+    Replay the full log through the baseline update (only needed for logs
+    created before flow_baseline existed); new rows are handled by the trigger.
+    """
+    baselines = {}
+    anomalies = []
+    rows = conn.execute(
+        "SELECT id, calc_key, COALESCE(equipment_id, equipment), recorded_at, flow_m3s "
+        "FROM measurements WHERE flow_m3s IS NOT NULL ORDER BY id"
+    )
+    for mid, key, eq, recorded_at, x in rows:
+        b = baselines.get(eq)
+        if b is None:
+            baselines[eq] = [1, x, 0.0, recorded_at]
+            continue
+        n, mean, var, _ = b
+        var_eff = max(var, (MIN_REL_STD * mean) ** 2)
+        diff = x - mean
+        if n >= WARMUP_SAMPLES and diff * diff > ANOMALY_Z ** 2 * var_eff:
+            anomalies.append((mid, key, eq, recorded_at, x, mean, var_eff))
+        else:
+            var = (1 - EWMA_ALPHA) * (var + EWMA_ALPHA * diff * diff)
+        baselines[eq] = [n + 1, mean + EWMA_ALPHA * diff, var, recorded_at]
+    with conn:
+        conn.execute("DELETE FROM flow_baseline")
+        conn.execute("DELETE FROM flow_anomalies")
+        conn.executemany("INSERT INTO flow_baseline VALUES (?, ?, ?, ?, ?)", [(eq, *b) for eq, b in baselines.items()])
+        conn.executemany("INSERT INTO flow_anomalies VALUES (?, ?, ?, ?, ?, ?, ?)", anomalies)
+
+@contextmanager
+def _session(path: str = DB_PATH):
+    conn = connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# === Log ===
+def _row(record: dict) -> list:
+    recorded_at = record.get("recorded_at") or datetime.now().isoformat(timespec="seconds")
+    return [recorded_at, record.get("calc_key")] + [record.get(c) for c in COLUMNS]
+
+_INSERT = (
+    f"INSERT OR IGNORE INTO measurements (recorded_at, calc_key, {', '.join(COLUMNS)}) "
+    f"VALUES (?, ?, {', '.join('?' * len(COLUMNS))})"
+)
+
+def append_measurement(record: dict, path: str = DB_PATH) -> int:
+    """Append one result to the log and return its id."""
+    with _session(path) as conn:
+        return conn.execute(_INSERT, _row(record)).lastrowid
+
+def append_measurements(records: Iterable[dict], path: str = DB_PATH) -> int:
+    """
+    Append a batch of results in one transaction. Records carrying a
+    ``calc_key`` that is already stored are skipped; returns the number of
+    rows actually inserted.
+    """
+    with _session(path) as conn:
+        return conn.executemany(_INSERT, [_row(r) for r in records]).rowcount
+
+def load_measurements(path: str = DB_PATH) -> pd.DataFrame:
+    with _session(path) as conn:
+        return pd.read_sql_query(
+            f"SELECT recorded_at, {', '.join(COLUMNS)} FROM measurements ORDER BY id", conn
+        )
+
+
+# === History queries (served from the indexed log and daily_summary) ===
+def equipment_ids(path: str = DB_PATH) -> List[str]:
+    with _session(path) as conn:
+        return [r[0] for r in conn.execute("SELECT DISTINCT equipment_id FROM daily_summary ORDER BY equipment_id")]
+
+def _summary_filter(start: Optional[str], end: Optional[str], equipment: Optional[List[str]]) -> Tuple[str, list]:
+    clauses, params = [], []
+    if start:
+        clauses.append("day >= ?"); params.append(start)
+    if end:
+        clauses.append("day <= ?"); params.append(end)
+    if equipment:
+        clauses.append(f"equipment IN ({','.join('?' * len(equipment))})"); params += list(equipment)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def fleet_summary(start: Optional[str] = None, end: Optional[str] = None,
+                  equipment: Optional[List[str]] = None, path: str = DB_PATH) -> pd.DataFrame:
+    """One row per equipment id: reading count, flow statistics and last reading day."""
+    where, params = _summary_filter(start, end, equipment)
+    sql = f"""
+        SELECT equipment_id, MAX(equipment) AS equipment, SUM(n) AS readings,
+               SUM(sum_flow) / SUM(n) AS mean_flow_m3s,
+               MIN(min_flow) AS min_flow_m3s, MAX(max_flow) AS max_flow_m3s,
+               SUM(sum_velocity) / SUM(n) AS mean_velocity_ms,
+               MAX(day) AS last_day
+        FROM daily_summary{where}
+        GROUP BY equipment_id ORDER BY equipment_id
+    """
+    with _session(path) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+def tower_trend(equipment_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                path: str = DB_PATH) -> pd.DataFrame:
+    """Daily flow statistics for one equipment id."""
+    where, params = _summary_filter(start, end, None)
+    where = (where + " AND" if where else " WHERE") + " equipment_id = ?"
+    sql = f"""
+        SELECT day, n AS readings, sum_flow / n AS mean_flow_m3s, min_flow AS min_flow_m3s,
+               max_flow AS max_flow_m3s,
+               CASE WHEN n > 1 THEN (sum_flow_sq - sum_flow * sum_flow / n) / (n - 1) END AS var_flow
+        FROM daily_summary{where} ORDER BY day
+    """
+    with _session(path) as conn:
+        return pd.read_sql_query(sql, conn, params=params + [equipment_id])
+
+def readings(equipment_id: str, start: Optional[str] = None, end: Optional[str] = None,
+             limit: int = 500, path: str = DB_PATH) -> pd.DataFrame:
+    """Most recent raw readings for one equipment id (uses the (equipment key, recorded_at) index)."""
+    sql = f"SELECT recorded_at, {', '.join(COLUMNS)} FROM measurements WHERE {EQUIPMENT_KEY} = ?"
+    params: list = [equipment_id]
+    if start:
+        sql += " AND recorded_at >= ?"; params.append(start)
+    if end:
+        sql += " AND recorded_at < date(?, '+1 day')"; params.append(end)
+    sql += " ORDER BY recorded_at DESC LIMIT ?"
+    params.append(limit)
+    with _session(path) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def flow_series(equipment_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                path: str = DB_PATH) -> pd.DataFrame:
+    """Every reading's flow for one equipment id, oldest first (for the downsampled chart)."""
+    sql = f"SELECT recorded_at, flow_m3s FROM measurements WHERE {EQUIPMENT_KEY} = ?"
+    params: list = [equipment_id]
+    if start:
+        sql += " AND recorded_at >= ?"; params.append(start)
+    if end:
+        sql += " AND recorded_at < date(?, '+1 day')"; params.append(end)
+    with _session(path) as conn:
+        df = pd.read_sql_query(sql + " ORDER BY recorded_at", conn, params=params)
+    df["recorded_at"] = pd.to_datetime(df["recorded_at"], format="ISO8601")
+    return df
+
+
+# === Drift / anomaly detection ===
+def _with_deviation(df: pd.DataFrame) -> pd.DataFrame:
+    df["baseline_std"] = df.pop("baseline_var") ** 0.5
+    df["deviation_pct"] = 100 * (df["flow_m3s"] - df["baseline_mean"]) / df["baseline_mean"]
+    df["z"] = (df["flow_m3s"] - df["baseline_mean"]) / df["baseline_std"]
+    return df
+
+def flow_baselines(path: str = DB_PATH) -> pd.DataFrame:
+    """Current EWMA flow baseline per equipment id."""
+    with _session(path) as conn:
+        df = pd.read_sql_query(
+            "SELECT equipment_id, n AS readings, mean_flow AS baseline_flow_m3s, var_flow, last_recorded_at "
+            "FROM flow_baseline ORDER BY equipment_id", conn
+        )
+    df.insert(3, "baseline_std_m3s", df.pop("var_flow") ** 0.5)
+    return df
+
+def flow_anomalies(equipment_id: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                   limit: int = 200, path: str = DB_PATH) -> pd.DataFrame:
+    """Most recent readings that deviated from their equipment's baseline by more than ANOMALY_Z."""
+    sql = "SELECT recorded_at, equipment_id, flow_m3s, baseline_mean, baseline_var FROM flow_anomalies WHERE 1 = 1"
+    params: list = []
+    if equipment_id:
+        sql += " AND equipment_id = ?"; params.append(equipment_id)
+    if start:
+        sql += " AND recorded_at >= ?"; params.append(start)
+    if end:
+        sql += " AND recorded_at < date(?, '+1 day')"; params.append(end)
+    sql += " ORDER BY recorded_at DESC LIMIT ?"
+    params.append(limit)
+    with _session(path) as conn:
+        return _with_deviation(pd.read_sql_query(sql, conn, params=params))
+
+def anomaly_for(calc_key: str, path: str = DB_PATH) -> Optional[dict]:
+    """The anomaly raised by one saved result, or None if it was within its baseline."""
+    with _session(path) as conn:
+        df = pd.read_sql_query(
+            "SELECT recorded_at, equipment_id, flow_m3s, baseline_mean, baseline_var FROM flow_anomalies "
+            "WHERE calc_key = ?", conn, params=[calc_key]
+        )
+    return _with_deviation(df).iloc[0].to_dict() if len(df) else None
+
+
+# === Streamlit history view ===
+def render_history() -> None:
+    import streamlit as st
+    from downsample import downsample_frame
+
+    ids = equipment_ids()
+    if not ids:
+        st.info("No measurements stored yet.")
+        return
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        kinds = st.multiselect("Equipment type", ["Cooling Tower", "Ventilation Unit"])
+    with c2:
+        start = st.date_input("From", value=None)
+    with c3:
+        end = st.date_input("To", value=None)
+    start_s = start.isoformat() if start else None
+    end_s = end.isoformat() if end else None
+
+    st.markdown("**Fleet summary**")
+    fleet = fleet_summary(start_s, end_s, kinds or None)
+    fleet = fleet.merge(flow_baselines()[["equipment_id", "baseline_flow_m3s", "baseline_std_m3s"]],
+                        on="equipment_id", how="left")
+    st.dataframe(fleet.round(4), use_container_width=True, hide_index=True)
+
+    if fleet.empty:
+        return
+    tower = st.selectbox("Equipment ID", fleet["equipment_id"].tolist())
+    trend = tower_trend(tower, start_s, end_s)
+    st.markdown(f"**Daily mean flow — {tower} (m³/s)**")
+    trend["day"] = pd.to_datetime(trend["day"])
+    trend = downsample_frame(trend, "day", "mean_flow_m3s")
+    st.line_chart(trend.set_index("day")[["mean_flow_m3s", "min_flow_m3s", "max_flow_m3s"]])
+    series = flow_series(tower, start_s, end_s)
+    points = downsample_frame(series, "recorded_at", "flow_m3s", method="min_max")
+    st.markdown(f"**Flow per reading — {tower} (m³/s)**")
+    st.line_chart(points, x="recorded_at", y="flow_m3s")
+    if len(points) < len(series):
+        st.caption(f"{len(points):,} of {len(series):,} readings plotted (bucket minima and maxima, so spikes stay visible).")
+    st.markdown("**Latest readings**")
+    st.dataframe(readings(tower, start_s, end_s), use_container_width=True, hide_index=True)
+    alerts = flow_anomalies(tower, start_s, end_s)
+    st.markdown(f"**⚠️ Flow anomalies — {tower}** (beyond {ANOMALY_Z:g}σ of the rolling baseline)")
+    if alerts.empty:
+        st.caption("No readings outside the baseline.")
+    else:
+        st.dataframe(alerts.round(3), use_container_width=True, hide_index=True)
+
+
+# === Compaction ===
+def export_excel(xlsx_path: str = EXCEL_PATH, path: str = DB_PATH) -> int:
+    """Rewrite the shared workbook from the log; returns the number of rows written."""
+    start = time.perf_counter()
+    try:
+        df = load_measurements(path).rename(columns=EXCEL_HEADERS)
+        tmp_path = xlsx_path + ".tmp.xlsx"
+        with exclusive_lock(xlsx_path):
+            df.to_excel(tmp_path, index=False)
+            os.replace(tmp_path, xlsx_path)
+    except Exception:
+        EXCEL_SAVE_FAILURES.inc()
+        raise
+    EXCEL_SAVE_SECONDS.observe(time.perf_counter() - start)
+    return len(df)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print(__doc__)
+        sys.exit(1)
+    target = sys.argv[2] if len(sys.argv) > 2 else EXCEL_PATH
+    print(f"Wrote {export_excel(target)} rows to {target}")
@@ -0,0 +1,328 @@
+"""
+Prometheus metrics for the calculators: calculation volume and latency,
+export and Excel-save latency, cache hit ratios and active sessions.
+
+    curl http://127.0.0.1:9464/metrics        # Streamlit apps (METRICS_PORT, 0 disables)
+    curl http://127.0.0.1:8600/metrics        # calc_api.py
+
+With METRICS_FILE set, the same text is also rewritten to that file every
+METRICS_FILE_SECONDS (for node_exporter's textfile collector).
+
+Updates take no lock. Every thread increments its own cell of a counter or
+histogram, and the cells are summed only when the metrics are read. Cells
+of threads that have finished are folded into a base total at that point,
+and whenever a new thread registers its cell.
+Histograms have fixed buckets, so an observation is one bisect and two adds.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_FILE_SECONDS = float(os.environ.get("METRICS_FILE_SECONDS", "15"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (1, 12, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+Labels = Tuple[str, ...]
+
+
+# -----------------------------
+# Per-thread cells
+# -----------------------------
+class _Cells:
+    """``size`` floats per thread; each thread writes only its own list."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._cells: List[Tuple[threading.Thread, List[float]]] = []
+        self._base = [0.0] * size
+        self._lock = threading.Lock()       # taken once per thread, and on reads
+
+    def mine(self) -> List[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0.0] * self._size
+            with self._lock:
+                self._fold()
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def _fold(self) -> None:
+        # Caller holds the lock; short-lived threads must not grow the list between reads
+        live = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                live.append((thread, cell))
+            else:
+                self._base = [a + b for a, b in zip(self._base, cell)]
+        self._cells = live
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            self._fold()
+            out = list(self._base)
+            for _, cell in self._cells:
+                out = [a + b for a, b in zip(out, cell)]
+        return out
+
+
+# -----------------------------
+# Metric types
+# -----------------------------
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+        if not self.labelnames:
+            self.labels()               # unlabelled metrics are exported from the start
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._child())
+        return child
+
+    def _child(self):
+        return None
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, n: float = 1) -> None:
+        self._cells.mine()[0] += n
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _child(self):
+        return _CounterChild()
+
+    def inc(self, n: float = 1) -> None:
+        self.labels().inc(n)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield self.name, dict(zip(self.labelnames, key)), child.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self._cells = _Cells(len(buckets) + 2)      # bucket counts, +Inf, sum
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.mine()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        """Cumulative bucket counts (last one is +Inf) and the sum."""
+        totals = self._cells.totals()
+        counts, running = [], 0.0
+        for c in totals[:-1]:
+            running += c
+            counts.append(running)
+        return counts, totals[-1]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labelnames)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            counts, total = child.snapshot()
+            for bound, count in zip([*map(_fmt, self.buckets), "+Inf"], counts):
+                yield f"{self.name}_bucket", {**labels, "le": bound}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, counts[-1]
+
+
+class Callback(_Metric):
+    """Gauge or counter whose samples are read from a function at scrape time."""
+
+    def __init__(self, name: str, doc: str, type: str, fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        super().__init__(name, doc)
+        self.type = type
+        self.fn = fn
+
+    def samples(self):
+        for labels, value in self.fn():
+            if value is not None:
+                yield self.name, labels, value
+
+
+REGISTRY: List[_Metric] = []
+
+
+# -----------------------------
+# Exposition
+# -----------------------------
+def _fmt(v: float) -> str:
+    return repr(float(v))
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for m in REGISTRY:
+        lines.append(f"# HELP {m.name} {m.doc}")
+        lines.append(f"# TYPE {m.name} {m.type}")
+        for name, labels, value in m.samples():
+            label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {_fmt(value)}" if label_text else f"{name} {_fmt(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Application metrics
+# -----------------------------
+CALCULATIONS = Counter("calculations_total", "Calculations run, by app", ["app"])
+CALCULATION_ROWS = Histogram("calculation_rows", "Rows (months, traverses) per calculation run", ["app"],
+                             buckets=ROW_BUCKETS)
+CALCULATION_SECONDS = Histogram("calculation_seconds", "Calculation latency", ["app"])
+EXPORT_SECONDS = Histogram("export_seconds", "Time to build a CSV / Excel download", ["format"])
+EXCEL_SAVE_SECONDS = Histogram("excel_save_seconds", "Time to rewrite the shared measurement workbook")
+EXCEL_SAVE_FAILURES = Counter("excel_save_failures_total", "Failed rewrites of the shared measurement workbook")
+
+# name -> function returning (hits, misses); functools.lru_cache functions work as they are
+_caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+def register_cache(name: str, cache) -> None:
+    """Export hit / miss counts of an lru_cache function, or of any object with ``stats() -> (hits, misses)``."""
+    if hasattr(cache, "cache_info"):
+        _caches[name] = lambda: tuple(cache.cache_info()[:2])
+    else:
+        _caches[name] = cache.stats
+
+def _cache_samples(index: Optional[int]):
+    for name, stats in list(_caches.items()):
+        hits, misses = stats()
+        if index is None:
+            yield {"cache": name}, hits / (hits + misses) if hits + misses else None
+        else:
+            yield {"cache": name}, (hits, misses)[index]
+
+def _active_sessions():
+    try:
+        from streamlit import runtime
+        if runtime.exists():
+            yield {}, runtime.get_instance()._session_mgr.num_active_sessions()
+    except Exception:
+        return
+
+Callback("cache_hits_total", "Cache hits", "counter", lambda: _cache_samples(0))
+Callback("cache_misses_total", "Cache misses", "counter", lambda: _cache_samples(1))
+Callback("cache_hit_ratio", "Cache hits / lookups since start", "gauge", lambda: _cache_samples(None))
+Callback("active_sessions", "Connected Streamlit sessions", "gauge", _active_sessions)
+
+
+def observe_calculation(app: str, rows: int, seconds: float) -> None:
+    CALCULATIONS.labels(app).inc()
+    CALCULATION_ROWS.labels(app).observe(rows)
+    CALCULATION_SECONDS.labels(app).observe(seconds)
+
+@contextmanager
+def timed_calculation(app: str, rows: int):
+    start = time.perf_counter()
+    yield
+    observe_calculation(app, rows, time.perf_counter() - start)
+
+
+# -----------------------------
+# Exporter
+# -----------------------------
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def write_file(path: str) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        fh.write(render())
+    os.replace(tmp_path, path)
+
+def _file_loop(path: str) -> None:
+    while True:
+        try:
+            write_file(path)
+        except OSError:
+            pass
+        time.sleep(METRICS_FILE_SECONDS)
+
+# One exporter per process, shared by every page and session
+_started = False
+_start_lock = threading.Lock()
+
+def start_exporter(port: int = METRICS_PORT, path: Optional[str] = METRICS_FILE) -> None:
+    """Serve /metrics on 127.0.0.1:port and/or keep ``path`` up to date (idempotent)."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        if port:
+            try:
+                server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+            except OSError as e:
+                logger.warning("metrics: not serving on port %d (%s)", port, e)
+            else:
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        if path:
+            threading.Thread(target=_file_loop, args=(path,), name="metrics-file", daemon=True).start()
@@ -1,25 +1,21 @@
 import streamlit as st
 import pandas as pd
 from typing import List, Tuple
+import bill_store
+from tariffs import MONTHS, constants_table, version_label
+from units import kvah_to_kwh
+from rerun_timing import start_rerun
+from metrics import observe_calculation, start_exporter
 
 # -----------------------------
 # Default Constants (reset on reload)
 # -----------------------------
-DEFAULT_CONSTANTS = {
-    "Parameter": ["DC_rate", "FAC_rate", "ToS_rate", "ED_percent"],
-    "Description": [
-        "Demand charge rate (₹ per kVA)",
-        "Fuel Adjustment Charge (₹ per kVAh)",
-        "Tax on Sale rate (₹ per kWh)",
-        "Electricity Duty (percentage %)"
-    ],
-    "Value": [600.0, 0.5, 0.18, 7.5],
-}
+DEFAULT_CONSTANTS = constants_table(ToS_rate=0.18)
 
 # -----------------------------
 # Embedded tariff keys (for dropdown)
 # -----------------------------
-TARIFF_KEYS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+TARIFF_KEYS = MONTHS
 Years = ["2020", "2021","2022","2023","2024", "2025","2026", "2027", "2028", "2029", "2030", "2031", "2032", "2033", "2034", "2035", "2036", "2037", "2038", "2039", "2040", "2041", "2042", "2043", "2044", "2045", "2046"]
 # -----------------------------
 # Fixed Old ToD Ratios & Old slab timings (from Excel)
@@ -41,6 +37,8 @@ st.set_page_config(
     page_icon="⚡",
     layout="wide",
 )
+timer = start_rerun("new_electricity_landed_rate_chatbot")
+start_exporter()
 st.title("⚡ Electricity Landed Unit Rate Calculator")
 st.markdown("### 👋 Hello! Use the form to compute the Landed Unit Rate. Constants on the right are editable and reset on reload.")
 
@@ -155,6 +153,7 @@ with left_col:
     with col2:
         year = st.selectbox("Select Year", options=Years)
         units_kvah = st.number_input("Total energy consumption (kVAh)", min_value=0.0, step=100.0, value=500000.0, format="%.2f")
+    site = st.text_input("Site", value="Main Plant")
         
 
     st.markdown("---")
@@ -208,6 +207,7 @@ with left_col:
     calculate = st.button("🚀 Calculate Landed Unit Rate")
 
     if calculate:
+        timer.mark("calculation")
         # Validate
         if units_kvah <= 0:
             st.error("Please enter a positive total energy (kVAh).")
@@ -304,9 +304,8 @@ with left_col:
             # --- 4. Other charges ---
             FAC = units_kvah * FAC_rate
             ED = (ED_percent / 100.0) * (DC + EC + FAC + ToD_charge)
-            ToS = (units_kvah*0.997) * ToS_rate
-
-            kWh = units_kvah*0.997
+            kWh = kvah_to_kwh(units_kvah)
+            ToS = kWh * ToS_rate
             
             #Incremental Consumption Rebate
             ICR = ((kWh - 4044267) * (-0.75))
@@ -339,11 +338,34 @@ with left_col:
             LandedRate = (Total + promptPaymentDiscount) /  kWh
 
             # Display output (main summary)
+            observe_calculation("new_electricity_landed_rate_chatbot", 1, timer.mark("render"))
             st.success("✅ Calculation complete")
             st.metric(label="⚡ Landed Unit Rate (₹ / kWh)", value=f"{LandedRate:,.4f}")
             st.markdown("**Total bill (₹):** {:,.2f}".format(Total))
 
+            timer.mark("save")
+            try:
+                inputs = pd.DataFrame([{
+                    "Month": month, "MaxDemand_kVA": max_demand_kva, "Units_kVAh": units_kvah,
+                    "EnergyRate_₹/kVAh": new_energy_rate, "DC_rate": DC_rate, "FAC_rate": FAC_rate,
+                    "ToS_rate": ToS_rate, "ED_percent": ED_percent,
+                    "ToD_mul_A": tod_A, "ToD_mul_B": tod_B, "ToD_mul_C": tod_C, "ToD_mul_D": tod_D,
+                    "NewRange_A": new_A_range, "NewRange_B": new_B_range,
+                    "NewRange_C": new_C_range, "NewRange_D": new_D_range,
+                }])
+                bill = pd.DataFrame([{
+                    "Month": month, "DC": DC, "EC": EC, "ToD_charge": ToD_charge, "FAC": FAC, "ED": ED,
+                    "ToS": ToS, "BCR": BCR, "ICR": ICR, "PromptPaymentDisc": promptPaymentDiscount,
+                    "Total": Total, "LandedRate": LandedRate,
+                }])
+                # The page's ToS rate (and any edited rate) differs from the registry, so the version says so
+                tariff = version_label(DC_rate=DC_rate, FAC_rate=FAC_rate, ToS_rate=ToS_rate, ED_percent=ED_percent)
+                bill_store.record_run("new_electricity_landed_rate_chatbot", site, int(year), tariff, inputs, bill)
+            except Exception as e:
+                st.warning(f"⚠️ Could not save results to history: {e}")
+
             # Collapsible detailed breakdown
+            timer.mark("render")
             with st.expander("Show detailed breakdown"):
                 st.subheader("Detailed cost breakdown")
                 st.write(f"**Month & Year:** {month}, {year}")
@@ -395,6 +417,13 @@ with left_col:
                 except Exception:
                     st.info("Reload the page to reset values.")
 
+# -----------------------------
+# History
+# -----------------------------
+timer.mark("history")
+with st.expander("📚 History (stored runs)"):
+    bill_store.render_history(default_site=site)
+
 # Footer / help
 st.markdown("---")
 st.caption(
@@ -404,6 +433,8 @@ st.caption(
     "update the ToD distribution using time overlap logic. Constants reset to defaults on page reload."
 )
 
+timer.finish()
+
 
 
 
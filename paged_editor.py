@@ -0,0 +1,103 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+# -----------------------------
+# Delta store (server side)
+# -----------------------------
+def _deltas(key: str) -> Dict[Tuple[object, str], object]:
+    """Per-session edits for one table: {(row_index, column): value}."""
+    store_key = f"{key}__deltas"
+    if store_key not in st.session_state:
+        st.session_state[store_key] = {}
+    return st.session_state[store_key]
+
+def apply_deltas(df: pd.DataFrame, deltas: Dict[Tuple[object, str], object]) -> pd.DataFrame:
+    """Return df with the recorded cell edits applied (df itself, uncopied, when there are none)."""
+    edits = [(idx, col, value) for (idx, col), value in deltas.items() if idx in df.index and col in df.columns]
+    if not edits:
+        return df
+    merged = df.copy()
+    for idx, col, value in edits:
+        merged.at[idx, col] = value
+    return merged
+
+def _changed_cells(before: pd.DataFrame, after: pd.DataFrame) -> List[Tuple[object, str, object]]:
+    """Cells that differ between the page that was sent and the page that came back."""
+    changes = []
+    for col in before.columns:
+        old = before[col].to_numpy()
+        new = after[col].to_numpy()
+        diff = old != new
+        if old.dtype.kind == "f" or new.dtype.kind == "f":
+            diff &= ~(pd.isna(old) & pd.isna(new))
+        for pos in np.flatnonzero(diff):
+            changes.append((before.index[pos], col, new[pos]))
+    return changes
+
+def filter_rows(df: pd.DataFrame, text: str, columns: List[str]) -> pd.Index:
+    """Index of rows where any of the given columns contains text (case-insensitive)."""
+    if not text or not columns:
+        return df.index
+    mask = np.zeros(len(df), dtype=bool)
+    for col in columns:
+        mask |= df[col].astype(str).str.contains(text, case=False, regex=False).to_numpy()
+    return df.index[mask]
+
+
+# -----------------------------
+# Paged editor widget
+# -----------------------------
+def paged_data_editor(
+    df: pd.DataFrame,
+    key: str,
+    page_size: int = 50,
+    filter_columns: Optional[List[str]] = None,
+    **editor_kwargs,
+) -> pd.DataFrame:
+    """
+    Editable table that only ships the visible page to the browser.
+
+    The full frame stays on the server; edits made on a page are recorded as
+    cell deltas in session state and merged back onto ``df`` on every rerun.
+    Returns the full, edited frame.
+    """
+    deltas = _deltas(key)
+    merged = apply_deltas(df, deltas)
+
+    filter_columns = filter_columns or []
+    c1, c2, c3 = st.columns([3, 1, 1])
+    with c1:
+        text = st.text_input(
+            "Filter rows", key=f"{key}__filter",
+            placeholder=f"Search in {', '.join(filter_columns)}" if filter_columns else "",
+            disabled=not filter_columns,
+        )
+    with c2:
+        default_size = PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1
+        size = st.selectbox("Rows per page", PAGE_SIZES, index=default_size, key=f"{key}__size")
+
+    visible = filter_rows(merged, text, filter_columns)
+    n_pages = max(1, -(-len(visible) // size))
+    with c3:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}__page")
+    page = min(int(page), n_pages)
+
+    page_index = visible[(page - 1) * size: page * size]
+    page_df = merged.loc[page_index]
+    edited_page = st.data_editor(page_df, key=f"{key}__editor_{page}_{size}_{text}", **editor_kwargs)
+    st.caption(f"Showing {len(page_df)} of {len(visible)} rows (page {page} of {n_pages}, {len(merged)} total)")
+
+    changes = _changed_cells(page_df, edited_page)
+    if not changes:
+        return merged
+    if merged is df:
+        merged = df.copy()
+    for idx, col, value in changes:
+        deltas[(idx, col)] = value
+        merged.at[idx, col] = value
+    return merged
@@ -0,0 +1,139 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Default worker count (override with LANDED_RATE_WORKERS)
+DEFAULT_WORKERS = int(os.environ.get("LANDED_RATE_WORKERS", os.cpu_count() or 1))
+
+# Below this many rows the pool start-up costs more than it saves
+PARALLEL_MIN_ROWS = 200_000
+
+BillingFn = Callable[[pd.DataFrame], pd.DataFrame]
+
+
+# -----------------------------
+# Shared-memory table layout
+# -----------------------------
+def _to_shared(matrix: np.ndarray) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[:] = matrix
+    return shm
+
+def _encode(df: pd.DataFrame) -> Tuple[np.ndarray, List[str], Dict[str, list]]:
+    """
+    Pack a frame into one float64 matrix. Text columns are factorized; their
+    codes go in the matrix and the (small) category lists are returned apart.
+    """
+    columns = list(df.columns)
+    matrix = np.empty((len(df), len(columns)), dtype=np.float64)
+    categories = {}
+    for j, col in enumerate(columns):
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            matrix[:, j] = values.to_numpy(dtype=np.float64)
+        else:
+            codes, uniques = pd.factorize(values.astype(str))
+            matrix[:, j] = codes
+            categories[col] = list(uniques)
+    return matrix, columns, categories
+
+def _decode(matrix: np.ndarray, columns: List[str], categories: Dict[str, list]) -> pd.DataFrame:
+    data = {}
+    for j, col in enumerate(columns):
+        if col in categories:
+            data[col] = np.asarray(categories[col], dtype=object)[matrix[:, j].astype(np.int64)]
+        else:
+            data[col] = matrix[:, j]
+    return pd.DataFrame(data)
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+_worker: dict = {}
+
+def _init_worker(in_name, in_shape, in_columns, categories, out_name, out_shape, out_columns, fn):
+    in_shm = shared_memory.SharedMemory(name=in_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    _worker.update(
+        in_shm=in_shm, out_shm=out_shm,
+        inputs=np.ndarray(in_shape, dtype=np.float64, buffer=in_shm.buf),
+        outputs=np.ndarray(out_shape, dtype=np.float64, buffer=out_shm.buf),
+        in_columns=in_columns, categories=categories, out_columns=out_columns, fn=fn,
+    )
+
+def _run_chunk(start: int, stop: int) -> int:
+    """Bill rows [start, stop) and write the numeric results in place."""
+    w = _worker
+    chunk = _decode(w["inputs"][start:stop], w["in_columns"], w["categories"])
+    result = w["fn"](chunk)
+    w["outputs"][start:stop] = result[w["out_columns"]].to_numpy(dtype=np.float64)
+    return stop - start
+
+
+# -----------------------------
+# Parent side
+# -----------------------------
+def chunk_bounds(n_rows: int, n_chunks: int) -> List[Tuple[int, int]]:
+    edges = np.linspace(0, n_rows, n_chunks + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+def parallel_billing(df: pd.DataFrame, fn: BillingFn, workers: Optional[int] = None,
+                     chunks_per_worker: int = 4, on_chunk: Optional[Callable[[int], None]] = None) -> pd.DataFrame:
+    """
+    Run a batched billing function over a large table in a process pool.
+
+    Inputs and outputs live in shared memory so workers only receive row
+    bounds; results are written in place and therefore come back in order.
+    ``on_chunk`` is called with the row count of every finished chunk; if it
+    raises, chunks that have not started yet are cancelled.
+    """
+    workers = workers or DEFAULT_WORKERS
+    df = df.reset_index(drop=True)
+
+    # Output schema from a one-row dry run
+    sample = fn(df.iloc[:1])
+    text_out = [c for c in sample.columns if not pd.api.types.is_numeric_dtype(sample[c])]
+    num_out = [c for c in sample.columns if c not in text_out]
+    missing = [c for c in text_out if c not in df.columns]
+    if missing:
+        raise ValueError(f"Text output columns must pass through from the input: {missing}")
+
+    matrix, columns, categories = _encode(df)
+    in_shm = _to_shared(matrix)
+    out_shape = (len(df), len(num_out))
+    out_shm = shared_memory.SharedMemory(create=True, size=max(8 * out_shape[0] * out_shape[1], 1))
+    try:
+        initargs = (in_shm.name, matrix.shape, columns, categories, out_shm.name, out_shape, num_out, fn)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_run_chunk, a, b) for a, b in chunk_bounds(len(df), workers * chunks_per_worker)]
+            try:
+                for fut in as_completed(futures):
+                    rows = fut.result()
+                    if on_chunk:
+                        on_chunk(rows)
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+        outputs = np.ndarray(out_shape, dtype=np.float64, buffer=out_shm.buf).copy()
+    finally:
+        for shm in (in_shm, out_shm):
+            shm.close()
+            shm.unlink()
+
+    result = pd.DataFrame(outputs, columns=num_out)
+    for col in text_out:
+        result[col] = df[col].to_numpy()
+    return result[list(sample.columns)]
+
+def run_billing(df: pd.DataFrame, fn: BillingFn, workers: Optional[int] = None) -> pd.DataFrame:
+    """Bill a table in-process when small, across a process pool when large."""
+    workers = workers or DEFAULT_WORKERS
+    if workers <= 1 or len(df) < PARALLEL_MIN_ROWS:
+        return fn(df)
+    return parallel_billing(df, fn, workers=workers)
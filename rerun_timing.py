@@ -0,0 +1,215 @@
+"""
+Per-rerun phase timing for the Streamlit pages.
+
+    timer = start_rerun("Landed_rateChatbot")      # first phase: "state init"
+    ...
+    timer.mark("calculation")                       # closes the previous phase
+    ...
+    timer.finish()
+
+Pages are flat scripts, so phases are checkpoints rather than blocks: each
+mark() ends the running phase and starts the named one, and a phase entered
+twice in one rerun adds up. Every finished rerun is appended as one JSON line
+(time, page, session, total and per-phase milliseconds) to a rotating log,
+RERUN_TIMING_LOG.
+
+The sidebar panel is shown with ``?timings=1`` in the URL (or
+RERUN_TIMING_PANEL=1). It lists the session's recent reruns and can switch
+on cProfile for the following reruns; the slowest profiled reruns are kept
+(compressed) for viewing and download. It also shows the session-state
+memory report.
+"""
+import cProfile
+import io
+import json
+import logging
+import logging.handlers
+import marshal
+import os
+import pstats
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from session_memory import render_memory_report
+
+LOG_PATH = os.environ.get(
+    "RERUN_TIMING_LOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "rerun_timings.jsonl"),
+)
+LOG_MAX_BYTES = 5 * 2**20
+LOG_BACKUPS = 3
+
+QUERY_PARAM = "timings"
+HISTORY = 20                # reruns listed in the panel
+KEEP_PROFILES = 3           # slowest profiled reruns kept per session
+PROFILE_KEY = "_rerun_profile"
+
+# One rotating log per process, shared by every page and session
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+def get_logger() -> logging.Logger:
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            logger = logging.getLogger("rerun_timing")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = logging.handlers.RotatingFileHandler(
+                LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _logger = logger
+        return _logger
+
+
+# Phase-name tuples are shared by every record with the same phases
+_phase_names: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+class Rerun:
+    """One entry of the session's rerun history: phase names shared, milliseconds in a float array."""
+
+    __slots__ = ("when", "page", "total_ms", "names", "ms")
+
+    def __init__(self, when: float, page: str, total_ms: float, phases_ms: Dict[str, float]):
+        names = tuple(phases_ms)
+        self.when = when
+        self.page = page
+        self.total_ms = total_ms
+        self.names = _phase_names.setdefault(names, names)
+        self.ms = array("d", phases_ms.values())
+
+    @property
+    def phases(self) -> Dict[str, float]:
+        return dict(zip(self.names, self.ms))
+
+    @property
+    def clock(self) -> str:
+        return datetime.fromtimestamp(self.when).strftime("%H:%M:%S.%f")[:-3]
+
+class Profile:
+    """cProfile stats of one rerun, marshalled and zlib-compressed."""
+
+    __slots__ = ("rerun", "stats")
+
+    def __init__(self, rerun: Rerun, stats: bytes):
+        self.rerun = rerun
+        self.stats = stats
+
+    def raw(self) -> bytes:
+        """The stats as pstats / snakeviz read them from a .prof file."""
+        return zlib.decompress(self.stats)
+
+
+class RerunTimer:
+    """Wall time of the named phases of one script rerun."""
+
+    def __init__(self, page: str, first_phase: str = "state init"):
+        self.page = page
+        self.phases: Dict[str, float] = {}
+        self.start = time.perf_counter()
+        self._phase = first_phase
+        self._phase_start = self.start
+        self.profiler: Optional[cProfile.Profile] = None
+        if st.session_state.get(PROFILE_KEY):
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:          # another profiler is active on this thread
+                self.profiler = None
+
+    def mark(self, phase: str) -> float:
+        """Start ``phase``; returns the seconds spent in the phase that just ended."""
+        now = time.perf_counter()
+        elapsed = now - self._phase_start
+        self.phases[self._phase] = self.phases.get(self._phase, 0.0) + elapsed
+        self._phase, self._phase_start = phase, now
+        return elapsed
+
+    def finish(self) -> dict:
+        """Close the last phase, log the rerun and draw the panel if it is enabled."""
+        self.mark("")
+        if self.profiler is not None:
+            self.profiler.disable()
+        ctx = get_script_run_ctx()
+        now = time.time()
+        record = {
+            "time": datetime.fromtimestamp(now).isoformat(timespec="milliseconds"),
+            "page": self.page,
+            "session": ctx.session_id if ctx else "",
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "phases_ms": {k: round(v * 1000, 3) for k, v in self.phases.items()},
+        }
+        get_logger().info(json.dumps(record))
+
+        rerun = Rerun(now, self.page, record["total_ms"], record["phases_ms"])
+        history = st.session_state.setdefault("_rerun_timings", [])
+        history.append(rerun)
+        del history[:-HISTORY]
+        if self.profiler is not None:
+            _keep_profile(rerun, self.profiler)
+        if panel_enabled():
+            render_timing_panel()
+        return record
+
+
+def start_rerun(page: str) -> RerunTimer:
+    return RerunTimer(page)
+
+def panel_enabled() -> bool:
+    return bool(st.query_params.get(QUERY_PARAM)) or os.environ.get("RERUN_TIMING_PANEL") == "1"
+
+def _keep_profile(rerun: Rerun, profiler: cProfile.Profile) -> None:
+    profiles = st.session_state.setdefault("_rerun_profiles", [])
+    profiler.create_stats()
+    profiles.append(Profile(rerun, zlib.compress(marshal.dumps(profiler.stats))))
+    profiles.sort(key=lambda p: p.rerun.total_ms, reverse=True)
+    del profiles[KEEP_PROFILES:]
+
+def profile_text(stats: bytes, limit: int = 30) -> str:
+    """Top functions by cumulative time, as printed by pstats."""
+    out = io.StringIO()
+    pstats.Stats(_Loaded(stats), stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+class _Loaded:
+    """Adapter letting pstats.Stats read marshalled stats from memory."""
+
+    def __init__(self, stats: bytes):
+        self.stats = marshal.loads(stats)
+
+    def create_stats(self) -> None:
+        pass
+
+
+def render_timing_panel() -> None:
+    with st.sidebar.expander("⏱️ Rerun timings", expanded=True):
+        history = st.session_state.get("_rerun_timings", [])
+        if history:
+            st.metric("Last rerun", f"{history[-1].total_ms:,.1f} ms")
+            table = pd.DataFrame([{"time": r.clock, "total": r.total_ms, **r.phases}
+                                  for r in reversed(history)])
+            st.dataframe(table.round(1), hide_index=True, use_container_width=True)
+        st.checkbox("Profile the next reruns (cProfile)", key=PROFILE_KEY)
+        profiles = st.session_state.get("_rerun_profiles", [])
+        if profiles:
+            options = list(range(len(profiles)))
+            i = st.selectbox(
+                "Slowest profiled reruns", options,
+                format_func=lambda i: f"{profiles[i].rerun.total_ms:,.1f} ms at {profiles[i].rerun.clock[:8]}",
+            )
+            raw = profiles[i].raw()
+            st.code(profile_text(raw), language=None)
+            st.download_button("Download .prof", raw, f"rerun_{profiles[i].rerun.page}.prof")
+        st.caption(f"Log: {LOG_PATH}")
+    with st.sidebar.expander("🧠 Session memory"):
+        render_memory_report()
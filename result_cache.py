@@ -0,0 +1,153 @@
+"""
+Process-wide cache of billing and air-flow results, shared by every page
+and session (and by calc_api.py).
+
+    billing_df = cached_billing(selected, compute_billing)
+    avg_m, flow_m3s = cached_flow(vels_m, area_m2)
+
+Entries are keyed by the calculation, the tariff version and a digest of the
+normalized inputs: column order, index and int/float differences do not
+change the key. The cache holds at most RESULT_CACHE_SIZE entries, evicts
+the least recently used one first and drops entries older than
+RESULT_CACHE_TTL seconds. Tables larger than RESULT_CACHE_MAX_ROWS are not
+cached: hashing them costs about as much as billing them. When a
+calculation is asked for a tariff version the cache has not seen before,
+entries of the other versions are dropped; invalidate() clears them
+explicitly.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from air_flow import calc_flow
+from metrics import register_cache
+from parallel_billing import BillingFn, run_billing
+from tariffs import TARIFF_VERSION
+from traverse_grid import grid_flow
+
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_MAX_ROWS = int(os.environ.get("RESULT_CACHE_MAX_ROWS", "20000"))
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a time-to-live. Keys are tuples whose second
+    item is the tariff version ("" for results that do not depend on it).
+    """
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE, ttl: float = RESULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        """The cached value, or None when it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]):
+        """Cached value of key, computing and storing it on a miss (the computation runs outside the lock)."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def use_version(self, version: str) -> None:
+        """Drop the entries of other tariff versions the first time ``version`` is used."""
+        if version != self.version:
+            with self._lock:
+                for key in [k for k in self._entries if k[1] and k[1] != version]:
+                    del self._entries[key]
+                self.version = version
+
+    def invalidate(self, version: Optional[str] = None) -> None:
+        """Drop every entry, or only those computed with ``version``."""
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[1] == version]:
+                    del self._entries[key]
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+RESULTS = ResultCache()
+register_cache("results", RESULTS)
+
+def invalidate(version: Optional[str] = None) -> None:
+    RESULTS.invalidate(version)
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+def frame_digest(df: pd.DataFrame) -> str:
+    """Digest of a table's values by column name; ignores column order, the index and int/float dtypes."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(df)).encode())
+    for col in sorted(df.columns, key=str):
+        values = df[col].to_numpy()
+        kind = "f" if values.dtype.kind in "iuf" else values.dtype.kind
+        h.update(f"\x00{col}\x00{kind}".encode("utf-8"))
+        if kind == "f":
+            h.update(values.astype(np.float64, copy=False).tobytes())
+        elif kind == "b":
+            h.update(values.tobytes())
+        else:
+            h.update("\x1f".join(map(str, values)).encode("utf-8"))
+    return h.hexdigest()
+
+
+# -----------------------------
+# Cached calculations
+# -----------------------------
+def cached_billing(df: pd.DataFrame, fn: BillingFn, version: str = TARIFF_VERSION) -> pd.DataFrame:
+    """run_billing(df, fn) through the shared cache; returns a copy the caller may modify."""
+    if len(df) > RESULT_CACHE_MAX_ROWS:
+        return run_billing(df, fn)
+    RESULTS.use_version(version)
+    key = (f"{fn.__module__}.{fn.__name__}", version, frame_digest(df))
+    return RESULTS.get_or_compute(key, lambda: run_billing(df, fn)).copy()
+
+def cached_flow(vels_m, area_m2: float, shape: Optional[str] = None, method: Optional[str] = None,
+                points: Optional[int] = None) -> Tuple[float, float]:
+    """(average velocity, flow) through the shared cache; area-weighted on a traverse grid when method is given."""
+    vels = np.asarray(vels_m, dtype=np.float64).ravel()
+    key = ("air_flow", "", float(area_m2), hashlib.blake2b(vels.tobytes(), digest_size=16).hexdigest(),
+           shape if method else None, method, points)
+    if method:
+        return RESULTS.get_or_compute(key, lambda: grid_flow(vels, area_m2, shape, method, points))
+    return RESULTS.get_or_compute(key, lambda: calc_flow(vels.tolist(), area_m2))
@@ -0,0 +1,56 @@
+"""
+Memory held by one session's state, key by key.
+
+deep_size() follows containers, ``__slots__`` records, NumPy arrays, typed
+arrays and DataFrames, counting shared objects once. It is meant for
+comparing footprints (the rerun-timing panel and
+benchmarks/session_footprint.py), not for exact accounting.
+"""
+import sys
+from array import array
+from typing import Optional, Set
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+def deep_size(obj, seen: Optional[Set[int]] = None) -> int:
+    """Approximate bytes reachable from obj."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(np.sum(obj.memory_usage(index=True, deep=True)))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj)           # includes the buffer unless obj is a view
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, array, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_size(v, seen) for v in obj)
+    slots = getattr(type(obj), "__slots__", ())
+    if slots:
+        return size + sum(deep_size(getattr(obj, s, None), seen) for s in slots)
+    if hasattr(obj, "__dict__"):
+        return size + deep_size(vars(obj), seen)
+    return size
+
+
+def session_report(state=None) -> pd.DataFrame:
+    """Bytes per session-state key, largest first."""
+    state = st.session_state if state is None else state
+    seen: Set[int] = set()
+    rows = [{"key": str(k), "type": type(v).__name__, "bytes": deep_size(v, seen)} for k, v in state.items()]
+    report = pd.DataFrame(rows, columns=["key", "type", "bytes"])
+    return report.sort_values("bytes", ascending=False, ignore_index=True)
+
+def render_memory_report() -> None:
+    report = session_report()
+    st.metric("Session state", f"{report['bytes'].sum() / 1024:,.1f} KiB", f"{len(report)} keys", delta_color="off")
+    st.dataframe(report, hide_index=True, use_container_width=True)
@@ -0,0 +1,51 @@
+"""
+Tariff registry shared by the landed-rate pages.
+
+The module is imported once per server process, so every page and session
+of the multipage app reads the same tables. Add a new entry to TARIFFS and
+bump TARIFF_VERSION when the utility revises its rates; stored runs record
+the version they were billed with (see version_label for overridden rates).
+"""
+from typing import Dict, List
+
+TARIFF_VERSION = "2025.1"
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+
+RATE_DESCRIPTIONS = {
+    "DC_rate": "Demand charge rate (₹ per kVA)",
+    "FAC_rate": "Fuel Adjustment Charge (₹ per kVAh)",
+    "ToS_rate": "Tax on Sale rate (₹ per kWh)",
+    "ED_percent": "Electricity Duty (percentage %)",
+}
+
+TARIFFS: Dict[str, Dict[str, float]] = {
+    "2025.1": {"DC_rate": 600.0, "FAC_rate": 0.5, "ToS_rate": 0.2894, "ED_percent": 7.5},
+}
+
+
+def rates(version: str = TARIFF_VERSION, **overrides: float) -> Dict[str, float]:
+    """Rates of one tariff version, with optional per-page overrides."""
+    return {**TARIFFS[version], **overrides}
+
+def constants_table(version: str = TARIFF_VERSION, descriptions: bool = True,
+                    **overrides: float) -> Dict[str, List]:
+    """Rates in the Parameter / Description / Value layout of the constants editors."""
+    r = rates(version, **overrides)
+    table = {"Parameter": list(r)}
+    if descriptions:
+        table["Description"] = [RATE_DESCRIPTIONS[p] for p in r]
+    table["Value"] = list(r.values())
+    return table
+
+def version_label(version: str = TARIFF_VERSION, **used: float) -> str:
+    """
+    Tariff version to store for a run billed with the ``used`` rates: the
+    version itself, or e.g. "2025.1+ToS_rate=0.18" when rates differ from it.
+    """
+    base = TARIFFS[version]
+    changed = [f"{k}={float(v):g}" for k, v in used.items() if k in base and float(v) != base[k]]
+    return "+".join([version] + changed)
@@ -0,0 +1,148 @@
+"""
+Cooling-tower performance indicators from a measured air flow.
+
+Given the fan-stack air flow and (optionally) water flow, hot/cold water
+temperatures, wet-bulb temperature and fan power, computes:
+
+    range_c          hot water - cold water
+    approach_c       cold water - wet bulb
+    effectiveness    range / (hot water - wet bulb)
+    lg_ratio         water mass flow / dry-air mass flow
+    heat_rejection_kw
+    sfp_kw_per_m3s   fan power per m³/s of air (specific fan power)
+
+Everything works element-wise on arrays, so one call scores a single
+measurement or a whole fleet; a missing input only blanks (NaN) the
+indicators that need it.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from air_flow import ArrayLike
+
+STD_PRESSURE_KPA = 101.325
+WATER_DENSITY = 997.0        # kg/m³ at ~25 °C
+WATER_CP = 4.186             # kJ/(kg·K)
+
+# Optional inputs, in the order the form asks for them
+KPI_INPUTS = {
+    "water_flow_m3hr": "Water flow (m³/hr)",
+    "t_water_in_c": "Hot water in (°C)",
+    "t_water_out_c": "Cold water out (°C)",
+    "t_wet_bulb_c": "Ambient wet bulb (°C)",
+    "fan_power_kw": "Fan power (kW)",
+}
+KPI_OUTPUTS = {
+    "range_c": "Range (°C)",
+    "approach_c": "Approach (°C)",
+    "effectiveness": "Effectiveness",
+    "lg_ratio": "L/G ratio",
+    "heat_rejection_kw": "Heat rejection (kW)",
+    "sfp_kw_per_m3s": "Specific fan power (kW per m³/s)",
+}
+
+
+# === Psychrometrics (ASHRAE Fundamentals, SI) ===
+def saturation_pressure(t_c: ArrayLike) -> np.ndarray:
+    """Saturation vapour pressure over water in kPa (Magnus form, -40..60 °C)."""
+    t_c = np.asarray(t_c, dtype=float)
+    return 0.61094 * np.exp(17.625 * t_c / (t_c + 243.04))
+
+def humidity_ratio(t_dry_c: ArrayLike, t_wet_c: ArrayLike, pressure_kpa: ArrayLike = STD_PRESSURE_KPA) -> np.ndarray:
+    """kg water per kg dry air from dry- and wet-bulb temperatures."""
+    t_dry_c = np.asarray(t_dry_c, dtype=float)
+    t_wet_c = np.asarray(t_wet_c, dtype=float)
+    p_ws = saturation_pressure(t_wet_c)
+    w_s = 0.621945 * p_ws / (pressure_kpa - p_ws)
+    return ((2501 - 2.326 * t_wet_c) * w_s - 1.006 * (t_dry_c - t_wet_c)) / (2501 + 1.86 * t_dry_c - 4.186 * t_wet_c)
+
+def specific_volume(t_dry_c: ArrayLike, w: ArrayLike, pressure_kpa: ArrayLike = STD_PRESSURE_KPA) -> np.ndarray:
+    """Moist-air volume in m³ per kg of dry air."""
+    t_dry_c = np.asarray(t_dry_c, dtype=float)
+    return 0.287042 * (t_dry_c + 273.15) * (1 + 1.607858 * np.asarray(w, dtype=float)) / pressure_kpa
+
+
+# === KPIs ===
+def tower_kpis(flow_m3s: ArrayLike, water_flow_m3hr: ArrayLike = np.nan, t_water_in_c: ArrayLike = np.nan,
+               t_water_out_c: ArrayLike = np.nan, t_wet_bulb_c: ArrayLike = np.nan, fan_power_kw: ArrayLike = np.nan,
+               t_dry_bulb_c: Optional[ArrayLike] = None,
+               pressure_kpa: ArrayLike = STD_PRESSURE_KPA) -> Dict[str, np.ndarray]:
+    """
+    KPI arrays keyed by KPI_OUTPUTS. Without a dry-bulb temperature the air
+    is taken as saturated at the wet bulb when converting the measured
+    volume flow to dry-air mass flow.
+    """
+    flow, water, t_in, t_out, t_wb, fan = np.broadcast_arrays(*(
+        np.asarray(a, dtype=float)
+        for a in (flow_m3s, water_flow_m3hr, t_water_in_c, t_water_out_c, t_wet_bulb_c, fan_power_kw)
+    ))
+    t_db = t_wb if t_dry_bulb_c is None else np.asarray(t_dry_bulb_c, dtype=float)
+
+    w = humidity_ratio(t_db, t_wb, pressure_kpa)
+    dry_air_kgs = flow / specific_volume(t_db, w, pressure_kpa)
+    water_kgs = water * WATER_DENSITY / 3600
+    range_c = t_in - t_out
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "range_c": range_c,
+            "approach_c": t_out - t_wb,
+            "effectiveness": range_c / (t_in - t_wb),
+            "lg_ratio": water_kgs / dry_air_kgs,
+            "heat_rejection_kw": water_kgs * WATER_CP * range_c,
+            "sfp_kw_per_m3s": fan / flow,
+        }
+
+def tower_kpi_record(flow_m3s: float, inputs: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+    """Inputs and KPIs of one measurement as plain floats, None where unavailable."""
+    kpis = tower_kpis(flow_m3s, **{k: np.nan if v is None else v for k, v in inputs.items()})
+    record = {**inputs, **{k: float(v) for k, v in kpis.items()}}
+    return {k: None if v is None or not np.isfinite(v) else round(float(v), 4) for k, v in record.items()}
+
+def tower_kpi_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    KPI inputs and outputs for a fleet table with a ``flow_m3s`` column and
+    any of the KPI_INPUTS columns. Rows whose ``equipment`` is not a cooling
+    tower get NaN.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    inputs = {
+        c: pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) if c in df.columns else np.nan
+        for c in list(KPI_INPUTS) + ["t_dry_bulb_c"]
+    }
+    t_dry = inputs.pop("t_dry_bulb_c")
+    if np.ndim(t_dry):
+        t_dry = np.where(np.isnan(t_dry), inputs["t_wet_bulb_c"], t_dry)
+    else:
+        t_dry = None
+    kpis = tower_kpis(df["flow_m3s"].to_numpy(dtype=float), t_dry_bulb_c=t_dry, **inputs)
+    out = pd.DataFrame({**{c: np.broadcast_to(v, len(df)) for c, v in inputs.items()}, **kpis}, index=df.index)
+    if "equipment" in df.columns:
+        out[df["equipment"].astype(str) != "Cooling Tower"] = np.nan
+    return out
+
+
+# === Streamlit helpers ===
+def render_kpi_inputs() -> Dict[str, Optional[float]]:
+    """Optional KPI inputs; blank fields are returned as None."""
+    import streamlit as st
+
+    st.write("Optional: enter tower operating data for performance KPIs (leave blank to skip).")
+    values = {}
+    cols = st.columns(2)
+    for i, (key, label) in enumerate(KPI_INPUTS.items()):
+        with cols[i % 2]:
+            values[key] = st.number_input(label, value=None, step=0.1, key=f"kpi_{key}")
+    return values
+
+def render_kpis(kpis: Dict[str, float]) -> None:
+    import streamlit as st
+
+    shown = {KPI_OUTPUTS[k]: v for k, v in kpis.items() if k in KPI_OUTPUTS and v is not None and np.isfinite(v)}
+    if not shown:
+        return
+    st.markdown("**🌡️ Cooling-tower KPIs**")
+    cols = st.columns(3)
+    for i, (label, v) in enumerate(shown.items()):
+        cols[i % 3].metric(label, f"{v:,.3f}" if abs(v) < 100 else f"{v:,.1f}")
@@ -0,0 +1,179 @@
+"""
+Standard traverse grids for Round and Square sections.
+
+A grid is a fixed set of measurement positions together with the share of
+the section area each position stands for. Positions and weights are built
+once per (shape, method, points) and cached, so scoring a traverse, or a
+whole batch of them, is a single weighted sum over the readings.
+
+Positions are fractions of the traverse line measured from the wall: along
+two perpendicular diameters (A, B) for Round sections and on a rows x
+columns grid (A1 ... for row A) for Square sections.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from metrics import register_cache
+
+METHODS = {
+    "equal_area": "Equal area",
+    "log_tchebycheff": "Log-Tchebycheff",
+    "equal_spacing": "Equal spacing",
+}
+
+# Round sections are traversed along this many perpendicular diameters
+ROUND_DIAMETERS = 2
+
+# Log-Tchebycheff positions as a fraction of the traverse line (ISO 3966 / ASHRAE 111)
+LOG_TCHEBYCHEFF = {
+    "Round": {
+        6: (0.032, 0.135, 0.321, 0.679, 0.865, 0.968),
+        8: (0.021, 0.117, 0.184, 0.345, 0.655, 0.816, 0.883, 0.979),
+        10: (0.019, 0.077, 0.153, 0.217, 0.361, 0.639, 0.783, 0.847, 0.923, 0.981),
+    },
+    "Square": {
+        5: (0.074, 0.288, 0.500, 0.712, 0.926),
+        6: (0.061, 0.235, 0.437, 0.563, 0.765, 0.939),
+        7: (0.053, 0.203, 0.366, 0.500, 0.634, 0.797, 0.947),
+    },
+}
+
+
+# -----------------------------
+# Grid construction (cached)
+# -----------------------------
+def grid_sizes(shape: str, method: str) -> List[int]:
+    """Allowed points per diameter (Round) or per side (Square)."""
+    if method == "log_tchebycheff":
+        return sorted(LOG_TCHEBYCHEFF[shape])
+    if shape == "Round":
+        return list(range(4, 22, 2))
+    return list(range(3, 11))
+
+def _line_positions(shape: str, method: str, n: int) -> np.ndarray:
+    if n not in grid_sizes(shape, method):
+        raise ValueError(f"{METHODS.get(method, method)} grid for {shape} does not support {n} points")
+    if method == "log_tchebycheff":
+        return np.array(LOG_TCHEBYCHEFF[shape][n])
+    if method == "equal_area" and shape == "Round":
+        # Centroids of n/2 equal-area rings, mirrored across the centre
+        rings = n // 2
+        r = 0.5 * np.sqrt((2 * np.arange(1, rings + 1) - 1) / (2 * rings))
+        return np.concatenate([0.5 - r[::-1], 0.5 + r])
+    return (np.arange(n) + 0.5) / n
+
+def _annulus_weights(positions: np.ndarray, lines: int) -> np.ndarray:
+    """Share of a circle each diameter position stands for, ring bounds halfway between radii."""
+    radii = np.abs(positions - 0.5)
+    unique, inverse, counts = np.unique(radii, return_inverse=True, return_counts=True)
+    bounds = np.concatenate([[0.0], (unique[1:] + unique[:-1]) / 2, [0.5]])
+    ring_area = bounds[1:] ** 2 - bounds[:-1] ** 2
+    return np.tile(ring_area[inverse] / counts[inverse], lines) / (0.25 * lines)
+
+@lru_cache(maxsize=None)
+def _grid(shape: str, method: str, n: int) -> Tuple[Tuple[str, ...], np.ndarray, np.ndarray, np.ndarray]:
+    line = _line_positions(shape, method, n)
+    if shape == "Round":
+        labels = tuple(f"{chr(65 + d)}{i + 1}" for d in range(ROUND_DIAMETERS) for i in range(n))
+        x = np.concatenate([line if d % 2 == 0 else np.full(n, 0.5) for d in range(ROUND_DIAMETERS)])
+        y = np.concatenate([np.full(n, 0.5) if d % 2 == 0 else line for d in range(ROUND_DIAMETERS)])
+        if method == "equal_spacing":
+            weights = _annulus_weights(line, ROUND_DIAMETERS)
+        else:
+            weights = np.full(x.size, 1.0 / x.size)
+    elif shape == "Square":
+        labels = tuple(f"{chr(65 + r)}{c + 1}" for r in range(n) for c in range(n))
+        y, x = (a.ravel() for a in np.meshgrid(line, line, indexing="ij"))
+        weights = np.full(x.size, 1.0 / x.size)
+    else:
+        raise ValueError(f"Unknown shape {shape!r}")
+    for a in (x, y, weights):
+        a.setflags(write=False)
+    return labels, x, y, weights
+
+register_cache("traverse_grid", _grid)
+
+def grid_weights(shape: str, method: str, n: int) -> np.ndarray:
+    """Area weights (summing to 1) in grid order; read-only and shared between callers."""
+    return _grid(shape, method, n)[3]
+
+def traverse_grid(shape: str, method: str, n: int) -> pd.DataFrame:
+    """Measurement positions of a standard grid, one row per reading."""
+    labels, x, y, weights = _grid(shape, method, n)
+    if shape == "Round":
+        along = np.where(np.arange(len(labels)) < n, x, y)
+        where = [f"{a:.3f} D from wall" for a in along]
+    else:
+        where = [f"{a:.3f} L, {b:.3f} W" for a, b in zip(x, y)]
+    return pd.DataFrame({"point": labels, "x": x, "y": y, "weight": weights, "position": where})
+
+
+# -----------------------------
+# Scoring
+# -----------------------------
+def grid_average(vels: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Area-weighted mean velocity per traverse. ``vels`` is one traverse
+    (points,) or a batch (traverses, points) in grid order; NaN marks a
+    missing reading, whose area is shared out over the remaining points.
+    """
+    vels = np.atleast_2d(np.asarray(vels, dtype=float))
+    present = ~np.isnan(vels)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(present, vels, 0.0) @ weights / (present @ weights)
+
+def grid_flow(vels_m: Sequence[float], area_m2: float, shape: str, method: str, n: int) -> Tuple[float, float]:
+    """Area-weighted average velocity and flow for one traverse, readings in grid order."""
+    weights = grid_weights(shape, method, n)
+    if len(vels_m) != weights.size:
+        raise ValueError(f"Expected {weights.size} readings for this grid, got {len(vels_m)}")
+    avg_vel = float(grid_average(vels_m, weights)[0])
+    return avg_vel, avg_vel * area_m2
+
+def align_readings(points: Sequence, values: Sequence[float], shape: str, method: str, n: int) -> np.ndarray:
+    """
+    Put readings tagged by point (grid labels such as "A3", or 1-based
+    numbers in grid order) into grid order. Points without a reading are NaN.
+    """
+    labels = _grid(shape, method, n)[0]
+    index: Dict[str, int] = {label: i for i, label in enumerate(labels)}
+    out = np.full(len(labels), np.nan)
+    for point, value in zip(points, values):
+        key = str(point).strip().upper()
+        if key in index:
+            out[index[key]] = value
+        elif key.isdigit() and 1 <= int(key) <= len(labels):
+            out[int(key) - 1] = value
+        else:
+            raise ValueError(f"Point {point!r} is not on the {METHODS[method]} grid ({labels[0]}…{labels[-1]})")
+    return out
+
+
+# -----------------------------
+# Streamlit helper
+# -----------------------------
+def render_grid_picker(shape: str) -> Tuple[Optional[dict], int]:
+    """
+    Let the user choose free readings or a standard grid. Returns the grid
+    (method and points) or None, and the number of readings to take.
+    """
+    import streamlit as st
+
+    choice = st.radio(
+        "Reading positions",
+        ["free"] + list(METHODS),
+        format_func=lambda m: "Free readings (simple average)" if m == "free" else f"{METHODS[m]} grid",
+        horizontal=True,
+    )
+    if choice == "free":
+        count = st.number_input("Enter how many velocity readings you will provide", min_value=1, step=1)
+        return None, int(count)
+    per = "diameter" if shape == "Round" else "side"
+    n = st.selectbox(f"Points per {per}", grid_sizes(shape, choice))
+    grid = traverse_grid(shape, choice, n)
+    st.caption(f"{len(grid)} readings; take them in this order:")
+    st.dataframe(grid[["point", "position", "weight"]].round(4), use_container_width=True, hide_index=True)
+    return {"method": choice, "points": n}, len(grid)
@@ -0,0 +1,111 @@
+"""
+Unit registry shared by the air-flow and landed-rate calculators.
+
+Each unit belongs to a quantity and has a factor to that quantity's base
+unit (m, m², m/s, m³/s, kWh, kW). Energy and demand also carry a kind, real
+(kWh, kW) or apparent (kVAh, kVA); converting between kinds needs a power
+factor, which may be a scalar or one value per element.
+
+Conversions multiply whole arrays, Series or DataFrame columns at once.
+The factor for a (from, to) pair is computed once and cached; arrays with a
+different unit per element are resolved with one lookup per distinct unit.
+"""
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from metrics import register_cache
+
+# Contracted power factor used when a bill only states kVAh / kVA
+DEFAULT_PF = 0.997
+
+FT = 0.3048
+INCH = 0.0254
+
+# quantity -> unit -> factor to the base unit
+QUANTITIES: Dict[str, Dict[str, float]] = {
+    "length": {"m": 1, "cm": 0.01, "foot": FT, "inches": INCH},
+    "area": {"m²": 1, "cm²": 1e-4, "ft²": FT ** 2, "in²": INCH ** 2},
+    "velocity": {
+        "m/s": 1, "cm/s": 0.01, "ft/s": FT, "inch/s": INCH,
+        "m/min": 1 / 60, "cm/min": 0.01 / 60, "ft/min": FT / 60, "inches/min": INCH / 60,
+    },
+    "flow": {"m³/s": 1, "m³/min": 1 / 60, "m³/hr": 1 / 3600, "L/s": 1e-3, "CFM": FT ** 3 / 60},
+    "energy": {"kWh": 1, "MWh": 1000, "Wh": 1e-3, "kVAh": 1, "MVAh": 1000},
+    "demand": {"kW": 1, "MW": 1000, "kVA": 1, "MVA": 1000},
+}
+APPARENT = {"kVAh", "MVAh", "kVA", "MVA"}
+
+Values = Union[float, np.ndarray, pd.Series]
+
+# unit -> (quantity, factor to base)
+_UNITS: Dict[str, Tuple[str, float]] = {
+    unit: (quantity, float(f)) for quantity, table in QUANTITIES.items() for unit, f in table.items()
+}
+
+
+def quantity_of(unit: str) -> str:
+    try:
+        return _UNITS[unit][0]
+    except KeyError:
+        raise ValueError(f"Unknown unit {unit!r}") from None
+
+def units_of(quantity: str) -> Dict[str, float]:
+    """Unit -> factor to base for one quantity, in display order."""
+    return dict(QUANTITIES[quantity])
+
+@lru_cache(maxsize=None)
+def factor(from_unit: str, to_unit: str) -> float:
+    """Multiplier taking values in from_unit to to_unit (power factor not included)."""
+    q_from, f_from = _UNITS.get(from_unit, (None, None))
+    q_to, f_to = _UNITS.get(to_unit, (None, None))
+    if q_from is None or q_to is None:
+        raise ValueError(f"Unknown unit {from_unit if q_from is None else to_unit!r}")
+    if q_from != q_to:
+        raise ValueError(f"Cannot convert {q_from} ({from_unit}) to {q_to} ({to_unit})")
+    return f_from / f_to
+
+register_cache("unit_factor", factor)
+
+def _pf_exponent(from_unit: str, to_unit: str) -> int:
+    """+1 multiplies by PF (apparent -> real), -1 divides (real -> apparent), 0 none."""
+    return (from_unit in APPARENT) - (to_unit in APPARENT)
+
+def factors(from_units, to_unit: str) -> np.ndarray:
+    """Per-element factors for an array of source units (one lookup per distinct unit)."""
+    uniques, inverse = np.unique(np.asarray(from_units, dtype=str), return_inverse=True)
+    return np.array([factor(str(u), to_unit) for u in uniques])[inverse]
+
+def convert(values: Values, from_unit, to_unit: str, pf: Optional[Values] = None) -> Values:
+    """
+    Convert values to to_unit. ``from_unit`` is one unit or one unit per
+    value. Real <-> apparent energy/demand conversions use ``pf``.
+    Series keep their index; everything else comes back as float/ndarray.
+    """
+    if isinstance(from_unit, str):
+        f = factor(from_unit, to_unit)
+        pf_exp = _pf_exponent(from_unit, to_unit)
+    else:
+        from_unit = np.asarray(from_unit, dtype=str)
+        f = factors(from_unit, to_unit)
+        pf_exp = np.isin(from_unit, list(APPARENT)).astype(int) - int(to_unit in APPARENT)
+    if not isinstance(values, pd.Series):
+        values = np.asarray(values, dtype=float) if np.ndim(values) else float(values)
+    out = values * f
+    if np.any(pf_exp != 0):
+        if pf is None:
+            raise ValueError(f"A power factor is needed to convert {from_unit} to {to_unit}")
+        out = out * np.power(pf, pf_exp) if np.ndim(pf_exp) else (out * pf if pf_exp > 0 else out / pf)
+    return out
+
+def convert_columns(df: pd.DataFrame, columns: Dict[str, Tuple[str, str]], pf: Optional[Values] = None) -> pd.DataFrame:
+    """Copy of df with each listed column converted: {column: (from_unit, to_unit)}."""
+    out = df.copy()
+    for col, (from_unit, to_unit) in columns.items():
+        out[col] = convert(pd.to_numeric(out[col], errors="coerce"), from_unit, to_unit, pf)
+    return out
+
+def kvah_to_kwh(kvah: Values, pf: Values = DEFAULT_PF) -> Values:
+    return convert(kvah, "kVAh", "kWh", pf)
@@ -0,0 +1,40 @@
+"""
+Session state of the chiller air-flow wizard.
+
+Both chiller pages use the same keys. Restarting a calculation clears only
+these keys (and the wizard's keyed widgets), so the other pages of the
+multipage app keep their state.
+
+Readings are kept as a typed float64 array (8 bytes per reading instead of
+a list of float objects); use readings() whenever they are replaced.
+"""
+import copy
+from array import array
+from typing import Sequence
+
+import numpy as np
+import streamlit as st
+
+DEFAULTS = {
+    "step": "start", "equipment": None, "equipment_id": None, "shape": None, "unit": None,
+    "dimensions": {}, "velocities": array("d"), "vel_unit": None, "vel_count": 0, "grid": None,
+    "kpi_inputs": {}, "result": None,
+}
+
+# Keyed widgets owned by the wizard
+WIDGET_PREFIXES = ("vel_edit", "kpi_", "logger_file")
+
+
+def readings(values: Sequence[float] = ()) -> array:
+    """Velocity readings in their session-state form; missing values become NaN."""
+    return array("d", np.asarray(values, dtype=float).ravel().tobytes())
+
+def init_wizard() -> None:
+    for k, v in DEFAULTS.items():
+        if k not in st.session_state:
+            st.session_state[k] = copy.copy(v)
+
+def reset_wizard() -> None:
+    for key in list(st.session_state.keys()):
+        if key in DEFAULTS or str(key).startswith(WIDGET_PREFIXES):
+            del st.session_state[key]
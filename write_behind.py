@@ -0,0 +1,210 @@
+"""
+Write-behind persistence for chiller results.
+
+Streamlit sessions hand results to a single background writer and return
+immediately. The writer drains the queue in batches, holds an exclusive file
+lock while writing, retries on I/O errors and spools batches it could not
+write to a JSONL file that is replayed with the next batch, or after
+WRITE_BEHIND_RETRY_SECONDS (doubling up to MAX_RETRY_SECONDS) when no new
+results arrive. Every result
+carries an idempotency key (``calc_key``), so retries and replays never
+duplicate rows. Spool lines that cannot be parsed are moved to
+``<spool>.bad`` instead of blocking the replay.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+import measurement_store
+from file_lock import exclusive_lock
+
+MAX_TRACKED_KEYS = 10_000
+
+# Wait before replaying the spool when the queue is idle, doubled after every failed replay
+RETRY_SECONDS = float(os.environ.get("WRITE_BEHIND_RETRY_SECONDS", "5"))
+MAX_RETRY_SECONDS = 300.0
+
+logger = logging.getLogger(__name__)
+
+
+def new_calc_key() -> str:
+    return uuid.uuid4().hex
+
+
+class WriteBehindWriter:
+    def __init__(self, path: str = measurement_store.DB_PATH, batch_size: int = 200,
+                 max_wait: float = 0.2, retries: int = 5, backoff: float = 0.1,
+                 retry_seconds: float = RETRY_SECONDS):
+        self.path = path
+        self.spool_path = path + ".pending.jsonl"
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.retry_seconds = retry_seconds
+        self.last_error: Optional[str] = None
+        self._queue: "queue.Queue[dict]" = queue.Queue()
+        self._status: "OrderedDict[str, str]" = OrderedDict()
+        self._status_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # --- Producer side ---
+    def submit(self, record: dict) -> str:
+        """Queue a result for saving and return its idempotency key."""
+        record = dict(record)
+        record.setdefault("calc_key", new_calc_key())
+        key = record["calc_key"]
+        with self._status_lock:
+            if self._status.get(key) in ("queued", "saved"):
+                return key
+            self._set_status(key, "queued")
+        self._queue.put(record)
+        return key
+
+    def status(self, key: str) -> Optional[str]:
+        """'queued', 'saved', 'spooled' (waiting for a retry) or 'failed' (lost), None if unknown."""
+        with self._status_lock:
+            return self._status.get(key)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until everything queued so far has been handled."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _set_status(self, key: str, status: str) -> None:
+        self._status[key] = status
+        self._status.move_to_end(key)
+        while len(self._status) > MAX_TRACKED_KEYS:
+            self._status.popitem(last=False)
+
+    # --- Writer thread ---
+    def _loop(self) -> None:
+        if os.path.exists(self.spool_path):
+            self._handle([])
+        failed_replays = 0
+        while True:
+            # Without a spool there is nothing to retry, so wait for the next result
+            timeout = None
+            if os.path.exists(self.spool_path):
+                timeout = min(self.retry_seconds * 2 ** min(failed_replays, 16), MAX_RETRY_SECONDS)
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                self._handle([])            # replay the spool on its own
+                failed_replays = failed_replays + 1 if os.path.exists(self.spool_path) else 0
+                continue
+            failed_replays = 0
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._handle(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _handle(self, batch: List[dict]) -> None:
+        """Write a batch; any error is logged and the batch spooled, so the thread keeps running."""
+        try:
+            self._write(batch)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.exception("write-behind: could not save %d result(s)", len(batch))
+            try:
+                self._spool(batch)
+            except Exception:
+                logger.exception("write-behind: could not spool %d result(s)", len(batch))
+                self._mark(batch, "failed")
+
+    def _mark(self, records: List[dict], status: str) -> None:
+        with self._status_lock:
+            for record in records:
+                if "calc_key" in record:
+                    self._set_status(record["calc_key"], status)
+
+    def _read_spool(self) -> List[dict]:
+        """Spooled records; lines that do not parse are moved to the .bad file (caller holds the spool lock)."""
+        if not os.path.exists(self.spool_path):
+            return []
+        records, bad = [], []
+        with open(self.spool_path, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                if isinstance(record, dict):
+                    records.append(record)
+                else:
+                    bad.append(line)
+        if bad:
+            logger.error("write-behind: moved %d unreadable spool line(s) to %s.bad", len(bad), self.spool_path)
+            with open(self.spool_path + ".bad", "a", encoding="utf-8") as fh:
+                fh.writelines(line if line.endswith("\n") else line + "\n" for line in bad)
+            tmp_path = self.spool_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.writelines(json.dumps(r) + "\n" for r in records)
+            os.replace(tmp_path, self.spool_path)
+        return records
+
+    def _spool(self, batch: List[dict]) -> None:
+        """Keep the rows on disk so the next batch replays them."""
+        if not batch:
+            return
+        with exclusive_lock(self.spool_path), open(self.spool_path, "a", encoding="utf-8") as fh:
+            for record in batch:
+                fh.write(json.dumps(record) + "\n")
+        self._mark(batch, "spooled")
+
+    def _write(self, batch: List[dict]) -> None:
+        for attempt in range(self.retries):
+            try:
+                # Lock order is always store, then spool
+                with exclusive_lock(self.path), exclusive_lock(self.spool_path):
+                    spooled = self._read_spool()
+                    measurement_store.append_measurements(spooled + batch, self.path)
+                    if os.path.exists(self.spool_path):
+                        os.remove(self.spool_path)
+                self.last_error = None
+                self._mark(spooled + batch, "saved")
+                return
+            except (sqlite3.OperationalError, OSError, TimeoutError) as e:
+                self.last_error = str(e)
+                time.sleep(self.backoff * 2 ** attempt)
+
+        # Out of retries
+        self._spool(batch)
+
+
+_writer: Optional[WriteBehindWriter] = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> WriteBehindWriter:
+    """Process-wide writer shared by every session."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = WriteBehindWriter()
+            atexit.register(_writer.flush)
+        return _writer